@@ -1,3 +1,15 @@
 from .loader import *
+from .columnstore import *
+from .lca import *
+from .ancestry import *
+from .cache import *
+from .compact import *
+from .store import *
+from .exporter import *
+from .index import *
+from .lifespans import *
+from .lineage import *
+from .tracker import *
+from .validation import *
 from .utils import *
 from .metrics import *
\ No newline at end of file
@@ -0,0 +1,175 @@
+import numpy as np
+
+# Number of query taxa whose ancestor sets are propagated together, as
+# bitsets of this many bits per taxon
+_BITSET_TAXA = 256
+
+
+def _csr_gather(offsets, values, rows):
+    # Entries of the given rows of a CSR array, one row after the other
+    starts = offsets[rows]
+    counts = offsets[rows + 1] - starts
+    positions = np.repeat(starts - (np.cumsum(counts) - counts), counts) \
+        + np.arange(counts.sum())
+    return values[positions]
+
+
+class AncestryIndex:
+    """Ancestry index over the ancestor DAG of a phylogeny (every ancestor of
+    every taxon, so it also covers sexual phylogenies), for ancestor sets,
+    lowest common ancestors and ancestor counts.
+
+    Taxa are sorted into generations once (a taxon's generation is the length
+    of the longest path to it from a root), in O(n log n). After that, the
+    ancestor sets of many query taxa are propagated together as bitsets, from
+    the deepest generation up, one vectorized step per generation: k query
+    taxa take O((n + m) k / 64) time for m ancestor edges.
+
+    Build one with CompactPhylogeny.ancestry_index(), which keeps it for
+    later queries.
+    """
+
+    def __init__(self, ancestor_offsets, ancestor_indices):
+        """
+        Args:
+            ancestor_offsets (array-like): CSR offsets into ancestor_indices
+                (number of taxa + 1)
+            ancestor_indices (array-like): dense indices of each taxon's
+                ancestors
+        """
+        self.ancestor_offsets = np.asarray(ancestor_offsets, dtype=np.int64)
+        self.ancestor_indices = np.asarray(ancestor_indices, dtype=np.int64)
+        num_taxa = len(self.ancestor_offsets) - 1
+        num_ancestors = np.diff(self.ancestor_offsets)
+        edge_child = np.repeat(np.arange(num_taxa), num_ancestors)
+        order = np.argsort(self.ancestor_indices, kind="stable")
+        child_indices = edge_child[order]
+        child_offsets = np.zeros(num_taxa + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.ancestor_indices, minlength=num_taxa),
+                  out=child_offsets[1:])
+
+        # Peel off taxa whose ancestors have all been peeled, one generation
+        # at a time
+        self.generations = np.full(num_taxa, -1, dtype=np.int64)
+        remaining = num_ancestors.copy()
+        frontier = np.flatnonzero(remaining == 0)
+        generation = 0
+        while len(frontier):
+            self.generations[frontier] = generation
+            children, num_edges = np.unique(
+                _csr_gather(child_offsets, child_indices, frontier),
+                return_counts=True)
+            remaining[children] -= num_edges
+            frontier = children[remaining[children] == 0]
+            generation += 1
+        if np.any(self.generations < 0):
+            raise Exception("phylogeny contains a cycle")
+
+        # Edges grouped by the generation of their child, and by parent
+        # within each generation
+        edge_generation = self.generations[edge_child]
+        order = np.lexsort((self.ancestor_indices, edge_generation))
+        self._edge_child = edge_child[order]
+        self._edge_parent = self.ancestor_indices[order]
+        self._edge_bounds = np.searchsorted(edge_generation[order],
+                                            np.arange(generation + 1))
+
+    def __len__(self):
+        return len(self.generations)
+
+    def ancestor_mask(self, indices):
+        """Which taxa are ancestors of any of the given taxa, or are one of
+        them? (bool array)
+        """
+        mask = np.zeros(len(self), dtype=bool)
+        frontier = np.unique(np.asarray(indices, dtype=np.int64))
+        while len(frontier):
+            frontier = frontier[~mask[frontier]]
+            mask[frontier] = True
+            frontier = np.unique(_csr_gather(
+                self.ancestor_offsets, self.ancestor_indices, frontier))
+        return mask
+
+    def ancestor_bits(self, indices):
+        """Bitsets of the given taxa each taxon is an ancestor of (or is).
+
+        Args:
+            indices (array-like): dense indices of query taxa
+
+        Returns:
+            uint64 array with one row per taxon and one bit per query taxon:
+            bit j % 64 of word j // 64 is set for the ancestors of
+            indices[j] (and for indices[j] itself).
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        query = np.arange(len(indices))
+        bits = np.zeros((len(self), (len(indices) + 63) // 64),
+                        dtype=np.uint64)
+        np.bitwise_or.at(bits, (indices, query // 64), np.left_shift(
+            np.uint64(1), (query % 64).astype(np.uint64)))
+        # Children are done before their parents, which are in earlier
+        # generations; nothing above the deepest query taxon needs updating
+        deepest = self.generations[indices].max() if len(indices) else 0
+        for generation in range(deepest, 0, -1):
+            lo = self._edge_bounds[generation]
+            hi = self._edge_bounds[generation + 1]
+            # Only edges from children with bits set carry anything
+            children = self._edge_child[lo:hi]
+            active = np.any(bits[children] != 0, axis=1)
+            if not np.any(active):
+                continue
+            children = children[active]
+            parents = self._edge_parent[lo:hi][active]
+            starts = np.flatnonzero(np.diff(parents, prepend=-1))
+            bits[parents[starts]] |= np.bitwise_or.reduceat(
+                bits[children], starts, axis=0)
+        return bits
+
+    def common_ancestor_mask(self, indices):
+        """Which taxa are ancestors of all of the given taxa (or one of them,
+        and an ancestor of all others)? (bool array, all False if none are
+        given)
+        """
+        indices = np.unique(np.asarray(indices, dtype=np.int64))
+        common = np.full(len(self), len(indices) > 0)
+        for start in range(0, len(indices), _BITSET_TAXA):
+            chunk = indices[start:start + _BITSET_TAXA]
+            # Only taxa that are still common ancestors need checking
+            candidates = np.flatnonzero(common)
+            bits = self.ancestor_bits(chunk)[candidates]
+            full = np.full(bits.shape[1], np.iinfo(np.uint64).max,
+                           dtype=np.uint64)
+            if len(chunk) % 64:
+                full[-1] = np.uint64((1 << (len(chunk) % 64)) - 1)
+            common[candidates] = np.all(bits == full, axis=1)
+        return common
+
+    def lowest_common_ancestors(self, indices):
+        """Dense indices of the lowest common ancestors of the given taxa:
+        their common ancestors (see common_ancestor_mask) that have no
+        descendant that is also one. Empty if they share no ancestor.
+        """
+        common = self.common_ancestor_mask(indices)
+        # A common ancestor with a descendant that is one has a child that is
+        # one (every taxon on the path between them is one)
+        edges = common[self._edge_parent] & common[self._edge_child]
+        common[self._edge_parent[edges]] = False
+        return np.flatnonzero(common)
+
+    def num_ancestors(self, indices):
+        """Number of distinct ancestors of each of the given taxa (not
+        counting the taxon itself).
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        counts = np.zeros(len(indices), dtype=np.int64)
+        for start in range(0, len(indices), _BITSET_TAXA):
+            bits = self.ancestor_bits(indices[start:start + _BITSET_TAXA])
+            bits = bits[np.any(bits != 0, axis=1)]
+            # Count set bits one bit position at a time
+            chunk_counts = np.zeros(bits.shape[1] * 64, dtype=np.int64)
+            for bit in range(64):
+                chunk_counts[bit::64] = np.count_nonzero(
+                    (bits >> np.uint64(bit)) & np.uint64(1), axis=0)
+            stop = min(start + _BITSET_TAXA, len(indices))
+            counts[start:stop] = chunk_counts[:stop - start] - 1
+        return counts
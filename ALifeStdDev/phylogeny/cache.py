@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .columnstore import _compact_column, _column_values
+
+# Bumped whenever the layout of cache files changes
+_CACHE_VERSION = 1
+
+
+def phylogeny_cache_path(filename):
+    """Path of the binary cache kept next to a phylogeny file."""
+    return filename + ".cache.npz"
+
+
+def clear_phylogeny_cache(filename):
+    """Delete the binary cache of a phylogeny file, if there is one.
+
+    Args:
+        filename (str): path to phylogeny file
+
+    Returns:
+        True if a cache was deleted.
+    """
+    path = phylogeny_cache_path(filename)
+    if os.path.exists(path):
+        os.remove(path)
+        return True
+    return False
+
+
+def _file_hash(filename):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filename, "rb") as phylogeny_file:
+        for block in iter(lambda: phylogeny_file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _encode_text(values):
+    missing = pd.isna(values)
+    strings = pd.Series(values, dtype=object).where(~missing, "").astype(str)
+    text = "\0".join(strings)
+    if text.count("\0") != max(len(strings) - 1, 0):
+        raise Exception("cannot cache text values that contain null bytes")
+    return np.frombuffer(text.encode(), dtype=np.uint8), missing
+
+
+def _decode_text(buf, missing):
+    values = np.empty(len(missing), dtype=object)
+    if len(missing):
+        values[:] = buf.tobytes().decode().split("\0")
+        values[missing] = np.nan
+    return values
+
+
+def _write_cache(filename, data, parsed):
+    # Caches a dataframe as read from a csv file (indexed by id) along with
+    # its parsed ancestor lists
+    stat = os.stat(filename)
+    arrays = {"index": data.index.to_numpy(),
+              "parsed_ancestor_id": parsed.ancestor_id,
+              "parsed_offsets": parsed.offsets,
+              "parsed_values": parsed.values}
+    arrays["parsed_origin"], arrays["parsed_origin_missing"] = \
+        _encode_text(parsed.origin)
+    kinds = {}
+    for i, col in enumerate(data.columns):
+        values = data[col].to_numpy()
+        if values.dtype.kind in "biuf":
+            kinds[col] = "numeric"
+            arrays[f"column_{i}"] = values
+        else:
+            kinds[col] = "text"
+            arrays[f"column_{i}"], arrays[f"missing_{i}"] = \
+                _encode_text(values)
+    meta = {"version": _CACHE_VERSION, "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns, "hash": _file_hash(filename),
+            "columns": list(data.columns), "kinds": kinds}
+    arrays["meta"] = np.array(json.dumps(meta))
+    _save_cache(phylogeny_cache_path(filename), arrays)
+
+
+def _save_cache(path, arrays):
+    # Write to a temporary file of our own first, so readers never see a
+    # partial cache and processes writing the same cache do not collide
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".",
+                                         suffix=".npz")
+    try:
+        with os.fdopen(handle, "wb") as temp_file:
+            np.savez(temp_file, **arrays)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class _PhylogenyCache:
+    # Open cache file; arrays are only read from disk when requested
+
+    def __init__(self, path):
+        self.path = path
+        self.npz = np.load(path, allow_pickle=False)
+        self.meta = json.loads(str(self.npz["meta"]))
+
+    def matches(self, filename):
+        # Size and mtime are checked first; the (slower) content hash is
+        # only checked when the file was touched without changing size
+        if self.meta["version"] != _CACHE_VERSION:
+            return False
+        stat = os.stat(filename)
+        if stat.st_size != self.meta["size"]:
+            return False
+        if stat.st_mtime_ns == self.meta["mtime_ns"]:
+            return True
+        if _file_hash(filename) != self.meta["hash"]:
+            return False
+        self._update_mtime(stat.st_mtime_ns)
+        return True
+
+    def _update_mtime(self, mtime_ns):
+        # Record the new mtime of a touched (but unchanged) file, so later
+        # loads do not hash it again. The cache stays valid if this fails.
+        self.meta["mtime_ns"] = mtime_ns
+        arrays = {name: self.npz[name] for name in self.npz.files}
+        arrays["meta"] = np.array(json.dumps(self.meta))
+        self.npz.close()
+        try:
+            _save_cache(self.path, arrays)
+        except OSError:
+            pass
+        self.npz = np.load(self.path, allow_pickle=False)
+
+    def column(self, name):
+        i = self.meta["columns"].index(name)
+        if self.meta["kinds"][name] == "numeric":
+            return self.npz[f"column_{i}"]
+        return _decode_text(self.npz[f"column_{i}"], self.npz[f"missing_{i}"])
+
+    def parsed(self):
+        # Fields of ParsedAncestorLists, in order
+        missing = self.npz["parsed_origin_missing"]
+        origin = _decode_text(self.npz["parsed_origin"], missing)
+        origin[missing] = None
+        return (self.npz["parsed_ancestor_id"], self.npz["parsed_offsets"],
+                self.npz["parsed_values"], origin)
+
+    def dataframe(self, columns=None):
+        # The ancestor_list column is always included
+        names = [col for col in self.meta["columns"] if columns is None
+                 or col == "ancestor_list" or col in columns]
+        data = pd.DataFrame({col: self.column(col) for col in names},
+                            columns=names, index=self.npz["index"])
+        data.index.name = "id"
+        return data
+
+
+def _open_cache(filename):
+    # The cache of filename, or None if there is no valid cache
+    path = phylogeny_cache_path(filename)
+    if not os.path.exists(path):
+        return None
+    try:
+        cache = _PhylogenyCache(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    return cache if cache.matches(filename) else None
+
+
+class CachedColumnStore:
+    """Read-only column store backed by the binary cache of a phylogeny
+    file. Each column is read from the cache when first requested.
+    """
+
+    random_access = False
+
+    def __init__(self, filename, compact_dtypes=False, cache=None):
+        """
+        Args:
+            filename (str): path to phylogeny file (which must have a valid
+                cache)
+            compact_dtypes (bool): convert columns as with
+                load_phylogeny_to_pandas_df(..., compact_dtypes=True)
+            cache: the file's cache, if it is already open
+        """
+        self.filename = filename
+        self.compact_dtypes = compact_dtypes
+        self._cache = cache
+        meta = self._open().meta
+        self._names = [col for col in meta["columns"]
+                       if col != "ancestor_list"]
+        self._num_rows = len(self._cache.npz["index"])
+
+    def _open(self):
+        if self._cache is None:
+            self._cache = _open_cache(self.filename)
+            if self._cache is None:
+                raise Exception(f"{self.filename} has no valid cache")
+        return self._cache
+
+    def __getstate__(self):
+        # Open cache files cannot be pickled (e.g., to send a phylogeny back
+        # from a worker process); the cache is reopened when next needed
+        state = self.__dict__.copy()
+        state["_cache"] = None
+        return state
+
+    @property
+    def columns(self):
+        return list(self._names)
+
+    @property
+    def num_rows(self):
+        return self._num_rows
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __len__(self):
+        return self.num_rows
+
+    def __repr__(self):
+        return f"CachedColumnStore({self.filename!r}, columns={self.columns})"
+
+    def __getitem__(self, name):
+        if name not in self._names:
+            raise KeyError(name)
+        values = self._open().column(name)
+        if self.compact_dtypes:
+            return _column_values(_compact_column(pd.Series(values)))
+        return values
+
+    def take(self, name, rows):
+        return self[name][np.asarray(rows, dtype=np.int64)]
@@ -0,0 +1,352 @@
+import json
+import os
+from collections.abc import MutableMapping
+
+import numpy as np
+import pandas as pd
+
+
+class ColumnStore:
+    """Append-only on-disk store of per-taxon attribute columns.
+
+    Every column lives in its own file(s) inside a directory. Numeric and
+    boolean columns are flat binary arrays that are memory-mapped on access;
+    all other columns are stored as utf-8 text (a bytes file plus an int64
+    file of end offsets) and decoded on access. Column types are fixed by the
+    first rows appended and widened as needed (e.g., an integer column that
+    later sees floats becomes a float column, and a numeric column that later
+    sees text becomes a text column).
+    """
+
+    # Single values can be read without reading the whole column
+    random_access = True
+
+    def __init__(self, directory):
+        """
+        Args:
+            directory (str): directory holding the store. Created if it does
+                not exist; an existing store in it is reopened.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self._path("columns.json")):
+            with open(self._path("columns.json")) as metadata_file:
+                metadata = json.load(metadata_file)
+            self.num_rows = metadata["num_rows"]
+            self._columns = metadata["columns"]
+        else:
+            self.num_rows = 0
+            self._columns = {}
+
+    def _path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def _write_metadata(self):
+        with open(self._path("columns.json"), "w") as metadata_file:
+            json.dump({"num_rows": self.num_rows, "columns": self._columns},
+                      metadata_file)
+
+    @property
+    def columns(self):
+        """Names of the stored columns, in the order they were added."""
+        return list(self._columns)
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __len__(self):
+        return self.num_rows
+
+    def __repr__(self):
+        return (f"ColumnStore({self.directory!r}, {self.num_rows} rows, "
+                f"columns={self.columns})")
+
+    def append(self, data):
+        """Append rows to the store.
+
+        Args:
+            data (pandas.DataFrame): rows to append. Must have the same columns
+                as previously appended rows.
+        """
+        if self._columns and set(data.columns) != set(self._columns):
+            raise Exception("appended rows must have the same columns as the "
+                            "rows already in the store")
+        for name in data.columns:
+            values = data[name].to_numpy()
+            if name not in self._columns:
+                self._columns[name] = _column_spec(values)
+            spec = self._columns[name]
+            if spec["kind"] == "numeric" and not _is_numeric(values):
+                self._numeric_to_text(name)
+                spec = self._columns[name]
+            if spec["kind"] == "numeric":
+                dtype = np.dtype(spec["dtype"])
+                if not np.can_cast(values.dtype, dtype, casting="safe"):
+                    self._widen(name, np.promote_types(dtype, values.dtype))
+                    dtype = np.dtype(spec["dtype"])
+                with open(self._path(f"{name}.bin"), "ab") as column_file:
+                    column_file.write(values.astype(dtype).tobytes())
+            else:
+                self._append_text(name, values)
+        self.num_rows += len(data)
+        self._write_metadata()
+
+    def _append_text(self, name, values):
+        encoded = [value.encode() for value in _as_text(values)]
+        ends = np.cumsum([len(value) for value in encoded], dtype=np.int64)
+        path = self._path(f"{name}.bytes")
+        start = os.path.getsize(path) if os.path.exists(path) else 0
+        with open(path, "ab") as column_file:
+            column_file.write(b"".join(encoded))
+        with open(self._path(f"{name}.offsets"), "ab") as offsets_file:
+            offsets_file.write((ends + start).tobytes())
+
+    def _widen(self, name, dtype):
+        values = np.array(self[name]).astype(dtype)
+        with open(self._path(f"{name}.bin"), "wb") as column_file:
+            column_file.write(values.tobytes())
+        self._columns[name]["dtype"] = dtype.str
+
+    def _numeric_to_text(self, name):
+        # Missing (NaN) rows written so far become empty strings, like
+        # missing values appended as text
+        values = np.array(self[name]).astype(object)
+        values[pd.isna(values)] = None
+        os.remove(self._path(f"{name}.bin"))
+        self._columns[name] = {"kind": "text"}
+        self._append_text(name, values)
+
+    def __getitem__(self, name):
+        """Get a whole column: a read-only memory map for numeric columns, or
+        an object array of strings for text columns.
+        """
+        spec = self._columns[name]
+        if spec["kind"] == "numeric":
+            dtype = np.dtype(spec["dtype"])
+            if self.num_rows == 0:
+                return np.zeros(0, dtype=dtype)
+            return np.memmap(self._path(f"{name}.bin"), dtype=dtype,
+                             mode="r", shape=(self.num_rows,))
+        return self.take(name, np.arange(self.num_rows))
+
+    def take(self, name, rows):
+        """Get the values of a column at the given row indices, reading only
+        what is needed.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if self._columns[name]["kind"] == "numeric":
+            return np.asarray(self[name][rows])
+        values = np.empty(len(rows), dtype=object)
+        if self.num_rows == 0:
+            return values
+        all_ends = np.memmap(self._path(f"{name}.offsets"), dtype=np.int64,
+                             mode="r", shape=(self.num_rows,))
+        ends = np.asarray(all_ends[rows])
+        starts = np.where(rows > 0, all_ends[np.maximum(rows - 1, 0)], 0)
+        with open(self._path(f"{name}.bytes"), "rb") as column_file:
+            if len(rows) > self.num_rows // 8:
+                # Reading everything is cheaper than seeking to every row
+                text = column_file.read()
+                for i, (start, end) in enumerate(zip(starts.tolist(),
+                                                     ends.tolist())):
+                    values[i] = text[start:end].decode()
+            else:
+                for i, (start, end) in enumerate(zip(starts.tolist(),
+                                                     ends.tolist())):
+                    column_file.seek(start)
+                    values[i] = column_file.read(end - start).decode()
+        return values
+
+
+class CsvColumnStore:
+    """Read-only column store backed by a standard phylogeny csv file.
+
+    Each column is parsed from the file only when it is first requested, so
+    columns that are never used are never parsed. The id and ancestor_list
+    columns are not included.
+    """
+
+    random_access = False
+
+    def __init__(self, filename, num_rows=None, compact_dtypes=False):
+        """
+        Args:
+            filename (str): path to phylogeny file
+            num_rows (int): number of taxa in the file, if already known
+            compact_dtypes (bool): convert columns as with
+                load_phylogeny_to_pandas_df(..., compact_dtypes=True)
+        """
+        self.filename = filename
+        self.compact_dtypes = compact_dtypes
+        header = pd.read_csv(filename, nrows=0).columns
+        self._names = {col.replace(' ', ''): col for col in header}
+        for name in ("id", "ancestor_list"):
+            self._names.pop(name, None)
+        self._num_rows = num_rows
+
+    @property
+    def columns(self):
+        return list(self._names)
+
+    @property
+    def num_rows(self):
+        if self._num_rows is None:
+            self._num_rows = len(pd.read_csv(self.filename,
+                                             usecols=[self.columns[0]]))
+        return self._num_rows
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __len__(self):
+        return self.num_rows
+
+    def __repr__(self):
+        return f"CsvColumnStore({self.filename!r}, columns={self.columns})"
+
+    def __getitem__(self, name):
+        column = pd.read_csv(self.filename, usecols=[self._names[name]])
+        column = column[self._names[name]]
+        if self.compact_dtypes:
+            column = _compact_column(column)
+        return _column_values(column)
+
+    def take(self, name, rows):
+        return self[name][np.asarray(rows, dtype=np.int64)]
+
+
+def _compact_column(column):
+    """Convert a column to a compact dtype: integers that fit become int32,
+    floats become float32 and text columns with many repeated values become
+    categorical.
+
+    Args:
+        column (pandas.Series): column to convert
+
+    Returns:
+        pandas.Series
+    """
+    if pd.api.types.is_integer_dtype(column.dtype):
+        info = np.iinfo(np.int32)
+        if len(column) == 0 or (column.min() >= info.min
+                                and column.max() <= info.max):
+            return column.astype(np.int32)
+    elif pd.api.types.is_float_dtype(column.dtype):
+        return column.astype(np.float32)
+    elif column.dtype == object and column.nunique() <= len(column) // 2:
+        return column.astype("category")
+    return column
+
+
+def _column_values(column):
+    """Get the values of a column as a numpy array (or pandas.Categorical,
+    for categorical columns, to keep them compact).
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.array
+    return column.to_numpy()
+
+
+def _is_numeric(values):
+    return values.dtype.kind in "biuf"
+
+
+def _column_spec(values):
+    if _is_numeric(values):
+        return {"kind": "numeric", "dtype": values.dtype.str}
+    return {"kind": "text"}
+
+
+def _as_text(values):
+    # Missing values are stored as empty strings
+    return pd.Series(values, dtype=object).fillna("").astype(str)
+
+
+class LazyColumns(MutableMapping):
+    """Mapping of attribute name to per-taxon column that reads each column
+    from a column store (ColumnStore or CsvColumnStore) the first time it is
+    accessed.
+
+    Columns can also be assigned directly (these are kept in memory) or
+    deleted, like a regular dictionary.
+    """
+
+    def __init__(self, store, rows=None):
+        """
+        Args:
+            store (ColumnStore or CsvColumnStore): backing store
+            rows (array-like): store rows backing each taxon (default: all
+                rows, in order)
+        """
+        self.store = store
+        self.rows = None if rows is None else np.asarray(rows, dtype=np.int64)
+        self._loaded = {}
+        self._deleted = set()
+
+    @property
+    def num_rows(self):
+        return self.store.num_rows if self.rows is None else len(self.rows)
+
+    def is_loaded(self, name):
+        """True if the column is held in memory."""
+        return name in self._loaded
+
+    def value(self, name, index):
+        """Get a single taxon's value, without loading the whole column if
+        the store allows it.
+        """
+        if name in self._loaded or not self.store.random_access:
+            return self[name][index]
+        if name in self._deleted or name not in self.store:
+            raise KeyError(name)
+        row = index if self.rows is None else self.rows[index]
+        return self.store.take(name, [row])[0]
+
+    def take(self, indices):
+        """Lazy columns for the taxa at the given indices."""
+        indices = np.asarray(indices, dtype=np.int64)
+        subset = LazyColumns(self.store,
+                             indices if self.rows is None
+                             else self.rows[indices])
+        subset._loaded = {name: values[indices]
+                          for name, values in self._loaded.items()}
+        subset._deleted = set(self._deleted)
+        return subset
+
+    def __getitem__(self, name):
+        if name not in self._loaded:
+            if name in self._deleted or name not in self.store:
+                raise KeyError(name)
+            if self.rows is None:
+                self._loaded[name] = self.store[name]
+            else:
+                self._loaded[name] = self.store.take(name, self.rows)
+        return self._loaded[name]
+
+    def __setitem__(self, name, values):
+        self._loaded[name] = values
+        self._deleted.discard(name)
+
+    def __delitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        self._loaded.pop(name, None)
+        self._deleted.add(name)
+
+    def __contains__(self, name):
+        return name in self._loaded or (name in self.store
+                                        and name not in self._deleted)
+
+    def __iter__(self):
+        for name in self.store.columns:
+            if name not in self._deleted:
+                yield name
+        for name in self._loaded:
+            if name not in self.store:
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"LazyColumns({list(self)})"
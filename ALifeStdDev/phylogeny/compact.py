@@ -0,0 +1,698 @@
+import glob
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import chain
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from .ancestry import AncestryIndex
+from .columnstore import ColumnStore, LazyColumns, _column_values
+from .lca import LCAIndex
+from .loader import (parse_ancestor_lists, _check_ancestors_present,
+                     _iter_phylogeny_csv_chunks, _read_phylogeny_csv_columns,
+                     _project_columns, _compact_dtypes,
+                     _compression, _file_format,
+                     ParsedAncestorLists)
+
+
+def _raise_missing(taxon_id):
+    # Same error as the networkx path of the utilities
+    raise Exception(f"Failed to find given taxa ({taxon_id}) in phylogeny")
+
+
+def _pointer_jump(parents):
+    """Get the depth and root of every taxon from a dense parent array (-1
+    for roots) by pointer jumping, in O(n log(tree depth)).
+    """
+    num_taxa = len(parents)
+    jump = np.where(parents < 0, np.arange(num_taxa), parents)
+    depth = (parents >= 0).astype(np.int64)
+    active = np.flatnonzero(jump[jump] != jump)
+    rounds = 0
+    while len(active):
+        rounds += 1
+        if rounds > num_taxa.bit_length() + 1:
+            raise Exception("phylogeny contains a cycle")
+        nxt = jump[active]
+        depth[active] += depth[nxt]
+        jump[active] = jump[nxt]
+        active = active[jump[jump[active]] != jump[active]]
+    if np.any(parents[jump] >= 0):
+        raise Exception("phylogeny contains a cycle")
+    return depth, jump
+
+
+class CompactPhylogeny:
+    """Array-backed phylogeny.
+
+    Taxa are addressed by a dense index (0 to n-1) and all structure is held
+    in numpy arrays instead of per-taxon python objects:
+
+    - ids: int64 taxon id of each dense index
+    - ancestor_offsets, ancestor_indices: CSR lists of (dense) ancestors
+    - parents: dense index of each taxon's (first) ancestor, -1 for roots
+    - child_offsets, child_indices: CSR lists of (dense) descendants
+    - attributes: dictionary of per-taxon attribute columns
+    - origin: special ancestor value of each taxon (e.g., "none"), or None
+
+    Every function in phylogeny.utils and phylogeny.metrics accepts a
+    CompactPhylogeny. Functions that return lists of ids for networkx
+    phylogenies return numpy arrays of ids, and functions that return
+    subgraphs return CompactPhylogeny objects.
+    """
+
+    def __init__(self, ids, ancestor_offsets, ancestor_indices,
+                 attributes=None, origin=None):
+        """
+        Args:
+            ids (array-like): taxon ids, one per taxon
+            ancestor_offsets (array-like): CSR offsets into ancestor_indices
+                (length len(ids) + 1)
+            ancestor_indices (array-like): dense indices of each taxon's
+                ancestors
+            attributes (dict or LazyColumns): attribute name to array of
+                per-taxon values
+            origin (array-like): special ancestor value of each taxon, or None
+        """
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.ancestor_offsets = np.asarray(ancestor_offsets, dtype=np.int64)
+        self.ancestor_indices = np.asarray(ancestor_indices, dtype=np.int64)
+        num_taxa = len(self.ids)
+        if len(self.ancestor_offsets) != num_taxa + 1:
+            raise Exception("ancestor_offsets must have one more entry than ids")
+
+        if isinstance(attributes, LazyColumns):
+            if attributes.num_rows != num_taxa:
+                raise Exception("column store does not have one row per taxon")
+            self.attributes = attributes
+        else:
+            # Categorical columns are kept as they are, to stay compact
+            self.attributes = {
+                name: values if isinstance(values, pd.Categorical)
+                else np.asarray(values)
+                for name, values in (attributes or {}).items()}
+        for name in self.attributes:
+            if self._attribute_loaded(name) and \
+                    len(self.attributes[name]) != num_taxa:
+                raise Exception(f"attribute '{name}' does not have one value "
+                                "per taxon")
+        if origin is None:
+            origin = np.full(num_taxa, None, dtype=object)
+        self.origin = np.asarray(origin, dtype=object)
+
+        num_ancestors = self.num_ancestors
+        has_ancestor = num_ancestors > 0
+        self.parents = np.full(num_taxa, -1, dtype=np.int64)
+        self.parents[has_ancestor] = \
+            self.ancestor_indices[self.ancestor_offsets[:-1][has_ancestor]]
+
+        # Descendant lists are the ancestor lists transposed
+        edge_child = np.repeat(np.arange(num_taxa), num_ancestors)
+        order = np.argsort(self.ancestor_indices, kind="stable")
+        self.child_indices = edge_child[order]
+        self.child_offsets = np.zeros(num_taxa + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.ancestor_indices, minlength=num_taxa),
+                  out=self.child_offsets[1:])
+
+        if np.all(self.ids[1:] > self.ids[:-1]):
+            self._sorter = None
+        else:
+            self._sorter = np.argsort(self.ids, kind="stable")
+        self._depths = None
+        self._root_labels = None
+        self._is_asexual = None
+        self._lca_index = None
+        self._ancestry_index = None
+
+    # ===== construction and conversion =====
+
+    @classmethod
+    def _from_structure(cls, ids, ancestor_offsets, ancestor_indices, parents,
+                        child_offsets, child_indices, attributes, origin,
+                        depths=None, root_labels=None, is_asexual=None):
+        # Wrap already computed structure arrays (e.g., memory maps) without
+        # reading them. ids must be sorted.
+        phylogeny = cls.__new__(cls)
+        phylogeny.ids = ids
+        phylogeny.ancestor_offsets = ancestor_offsets
+        phylogeny.ancestor_indices = ancestor_indices
+        phylogeny.parents = parents
+        phylogeny.child_offsets = child_offsets
+        phylogeny.child_indices = child_indices
+        phylogeny.attributes = attributes
+        phylogeny.origin = origin
+        phylogeny._sorter = None
+        phylogeny._depths = depths
+        phylogeny._root_labels = root_labels
+        phylogeny._is_asexual = is_asexual
+        phylogeny._lca_index = None
+        phylogeny._ancestry_index = None
+        return phylogeny
+
+    @classmethod
+    def from_parents(cls, ids, parents, attributes=None, origin=None):
+        """Build an asexual phylogeny from a dense parent array.
+
+        Args:
+            ids (array-like): taxon ids, one per taxon
+            parents (array-like): dense index of each taxon's ancestor, or -1
+                for roots
+            attributes (dict): attribute name to array of per-taxon values
+            origin (array-like): special ancestor value of each taxon, or None
+
+        Returns:
+            CompactPhylogeny
+        """
+        parents = np.asarray(parents, dtype=np.int64)
+        has_parent = parents >= 0
+        offsets = np.zeros(len(parents) + 1, dtype=np.int64)
+        np.cumsum(has_parent, out=offsets[1:])
+        return cls(ids, offsets, parents[has_parent], attributes, origin)
+
+    @classmethod
+    def from_pandas_df(cls, data):
+        """Build a compact phylogeny from a pandas dataframe (e.g., loaded via
+        load_phylogeny_to_pandas_df).
+
+        Taxon ids are taken from the "id" column if there is one, and from the
+        index otherwise. All columns other than id, ancestor_list and
+        ancestor_id become attribute columns.
+
+        Args:
+            data (pandas.DataFrame): phylogeny in standard format
+
+        Returns:
+            CompactPhylogeny
+        """
+        return cls._from_parsed(data,
+                                parse_ancestor_lists(data["ancestor_list"]))
+
+    @classmethod
+    def _from_parsed(cls, data, parsed, lazy_columns=None):
+        if "id" in data.columns:
+            taxon_ids = data["id"].to_numpy()
+        else:
+            taxon_ids = data.index.to_numpy()
+        taxon_ids = taxon_ids.astype(np.int64)
+        _check_ancestors_present(parsed, taxon_ids)
+
+        attributes = {} if lazy_columns is None else lazy_columns
+        for col in data.columns:
+            if col not in ("id", "ancestor_list", "ancestor_id"):
+                attributes[col] = _column_values(data[col])
+        sorter = np.argsort(taxon_ids, kind="stable")
+        ancestors = sorter[np.searchsorted(taxon_ids, parsed.values,
+                                           sorter=sorter)]
+        return cls(taxon_ids, parsed.offsets, ancestors, attributes,
+                   parsed.origin)
+
+    @classmethod
+    def from_networkx(cls, phylogeny):
+        """Build a compact phylogeny from a networkx phylogeny (e.g., loaded via
+        load_phylogeny_to_networkx). Node ids must be integers.
+
+        Node attributes become attribute columns (missing values are filled
+        in by pandas), except "origin", which is kept as the origin array.
+
+        Args:
+            phylogeny (networkx.DiGraph): graph object that describes a
+                phylogeny
+
+        Returns:
+            CompactPhylogeny
+        """
+        ids, offsets, ancestors = _networkx_structure(phylogeny)
+        data = pd.DataFrame.from_records(
+            [attrs for _, attrs in phylogeny.nodes(data=True)],
+            index=np.arange(len(ids)))
+        origin = None
+        if "origin" in data.columns:
+            origin = data.pop("origin").to_numpy(dtype=object)
+            origin[pd.isna(origin)] = None
+        attributes = {col: data[col].to_numpy() for col in data.columns
+                      if col not in ("id", "ancestor_list", "ancestor_id")}
+        return cls(ids, offsets, ancestors, attributes, origin)
+
+    def to_networkx(self):
+        """Convert to a networkx phylogeny (edges go from parent to child), in
+        the same form as produced by load_phylogeny_to_networkx.
+
+        Returns:
+            networkx.DiGraph
+        """
+        columns = list(self.attributes)
+        nodes = [dict(zip(columns, row)) for row in
+                 zip(*(self.attributes[col].tolist() for col in columns))]
+        if not columns:
+            nodes = [{} for _ in range(len(self))]
+        for i in np.flatnonzero(pd.notna(self.origin)):
+            nodes[i]["origin"] = self.origin[i]
+
+        phylogeny = nx.DiGraph()
+        phylogeny.add_nodes_from(zip(self.ids.tolist(), nodes))
+        children = np.repeat(self.ids, self.num_ancestors)
+        parents = self.ids[self.ancestor_indices]
+        phylogeny.add_edges_from(zip(parents.tolist(), children.tolist()))
+        return phylogeny
+
+    def to_pandas_df(self):
+        """Convert to a pandas dataframe with an id column, an ancestor_list
+        column (in the form produced by networkx_to_pandas_df) and a column
+        per attribute.
+
+        Returns:
+            pandas.DataFrame
+        """
+        df = pd.DataFrame({"id": self.ids})
+        ancestors = np.split(self.ids[self.ancestor_indices],
+                             self.ancestor_offsets[1:-1])
+        df["ancestor_list"] = [a.tolist() if len(a) else [None]
+                               for a in ancestors]
+        for name, values in self.attributes.items():
+            df[name] = values
+        return df
+
+    # ===== taxon lookup =====
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, taxon_id):
+        try:
+            self.index_of(taxon_id)
+        except Exception:
+            return False
+        return True
+
+    def __repr__(self):
+        return (f"CompactPhylogeny({len(self)} taxa, "
+                f"attributes={list(self.attributes)})")
+
+    def index_of(self, taxon_ids):
+        """Get the dense index of one or many taxon ids.
+
+        Args:
+            taxon_ids (int or array-like): taxon id(s) to look up
+
+        Returns:
+            Dense index (int) or int64 array of dense indices.
+
+        Raises:
+            Exception: if any of the given ids are not in the phylogeny.
+        """
+        scalar = np.ndim(taxon_ids) == 0
+        query = np.atleast_1d(np.asarray(taxon_ids))
+        if query.dtype.kind not in "iu":
+            # Only numbers equal to an integer id can match one (as with
+            # networkx, where 2.0 finds taxon 2 but 2.7 finds nothing)
+            if len(query) and not np.issubdtype(query.dtype, np.number):
+                _raise_missing(query[0])
+            inexact = query != np.round(query)
+            if np.any(inexact):
+                _raise_missing(query[inexact][0])
+            query = query.astype(np.int64)
+        pos = np.searchsorted(self.ids, query, sorter=self._sorter)
+        pos = np.minimum(pos, max(len(self.ids) - 1, 0))
+        if self._sorter is not None:
+            pos = self._sorter[pos]
+        found = (self.ids[pos] == query) if len(self.ids) \
+            else np.zeros(len(query), dtype=bool)
+        if not np.all(found):
+            _raise_missing(query[~found][0])
+        return int(pos[0]) if scalar else pos.astype(np.int64)
+
+    def _attribute_loaded(self, name):
+        return not isinstance(self.attributes, LazyColumns) or \
+            self.attributes.is_loaded(name)
+
+    def taxon_attributes(self, index):
+        """Get a dictionary with all attributes of the taxon at the given
+        dense index (plus its "origin", if it has one). Attributes that have
+        not been loaded from a column store are read for this taxon only.
+        """
+        attrs = {}
+        for name in self.attributes:
+            if self._attribute_loaded(name):
+                value = self.attributes[name][index]
+            else:
+                value = self.attributes.value(name, index)
+            attrs[name] = value.item() if hasattr(value, "item") else value
+        if self.origin[index] is not None:
+            attrs["origin"] = self.origin[index]
+        return attrs
+
+    def taxa_dict(self, indices):
+        """Get a dictionary keyed by taxon id of attribute dictionaries (with an
+        "id" entry) for the taxa at the given dense indices.
+        """
+        taxa = {}
+        for i in np.asarray(indices, dtype=np.int64).tolist():
+            attrs = self.taxon_attributes(i)
+            attrs["id"] = int(self.ids[i])
+            taxa[int(self.ids[i])] = attrs
+        return taxa
+
+    # ===== structure =====
+
+    @property
+    def num_ancestors(self):
+        """Number of (non-special) ancestors of every taxon."""
+        return np.diff(self.ancestor_offsets)
+
+    @property
+    def num_children(self):
+        """Number of direct descendants of every taxon."""
+        return np.diff(self.child_offsets)
+
+    def ancestors(self, index):
+        """Dense indices of the direct ancestors of the given taxon."""
+        return self.ancestor_indices[
+            self.ancestor_offsets[index]:self.ancestor_offsets[index + 1]]
+
+    def children(self, index):
+        """Dense indices of the direct descendants of the given taxon."""
+        return self.child_indices[
+            self.child_offsets[index]:self.child_offsets[index + 1]]
+
+    def is_asexual(self):
+        """True if no taxon has more than one ancestor."""
+        if self._is_asexual is None:
+            self._is_asexual = bool(len(self) == 0 or
+                                    self.num_ancestors.max() <= 1)
+        return self._is_asexual
+
+    def root_indices(self):
+        """Dense indices of taxa with no ancestors."""
+        return np.flatnonzero(self.num_ancestors == 0)
+
+    def leaf_indices(self):
+        """Dense indices of taxa with no descendants."""
+        return np.flatnonzero(self.num_children == 0)
+
+    @property
+    def depths(self):
+        """Number of steps from each taxon to its root (following first
+        ancestors). Computed once, on first access.
+        """
+        if self._depths is None:
+            self._depths, self._root_labels = _pointer_jump(self.parents)
+        return self._depths
+
+    @property
+    def root_labels(self):
+        """Dense index of each taxon's root (following first ancestors).
+        Computed once, on first access.
+        """
+        if self._root_labels is None:
+            self._depths, self._root_labels = _pointer_jump(self.parents)
+        return self._root_labels
+
+    def component_labels(self):
+        """Label every taxon with a representative dense index of its weakly
+        connected component (its root, for asexual phylogenies).
+        """
+        if self.is_asexual():
+            return self.root_labels
+        # Label propagation with pointer jumping over all ancestor edges
+        labels = np.arange(len(self))
+        child = np.repeat(np.arange(len(self)), self.num_ancestors)
+        parent = self.ancestor_indices
+        while True:
+            low = np.minimum(labels[child], labels[parent])
+            new_labels = labels.copy()
+            np.minimum.at(new_labels, child, low)
+            np.minimum.at(new_labels, parent, low)
+            new_labels = new_labels[new_labels]
+            if np.array_equal(new_labels, labels):
+                return labels
+            labels = new_labels
+
+    def lineage_indices(self, index):
+        """Dense indices along the lineage of the given taxon (following first
+        ancestors), starting with the taxon itself and ending at its root.
+        """
+        lineage = np.empty(self.depths[index] + 1, dtype=np.int64)
+        parents = self.parents
+        for step in range(len(lineage)):
+            lineage[step] = index
+            index = parents[index]
+        return lineage
+
+    def lca_index(self):
+        """LCAIndex over the first-ancestor tree, for O(log(depth)) most
+        recent common ancestor and ancestor queries. Built once, on first
+        use.
+        """
+        if self._lca_index is None:
+            self._lca_index = LCAIndex(self.parents, self.depths,
+                                       self.root_labels)
+        return self._lca_index
+
+    def ancestry_index(self):
+        """AncestryIndex over all ancestors of every taxon (the ancestor DAG,
+        for sexual phylogenies), for ancestor set, lowest common ancestor and
+        ancestor count queries. Built once, on first use.
+        """
+        if self._ancestry_index is None:
+            self._ancestry_index = AncestryIndex(self.ancestor_offsets,
+                                                 self.ancestor_indices)
+        return self._ancestry_index
+
+    def mrca_index(self, indices):
+        """Dense index of the most recent common ancestor of the given taxa
+        (following first ancestors), or -1 if they do not share one.
+        """
+        return self.lca_index().mrca(indices)
+
+    def subset(self, indices):
+        """Get a new compact phylogeny with only the taxa at the given dense
+        indices (in the given order). Ancestors that are left out are dropped
+        from ancestor lists.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+
+        # Gather the ancestor lists of the kept taxa only, so the cost does
+        # not depend on the size of the whole phylogeny
+        starts = np.asarray(self.ancestor_offsets[indices])
+        counts = np.asarray(self.ancestor_offsets[indices + 1]) - starts
+        edge_child = np.repeat(np.arange(len(indices)), counts)
+        edge_pos = np.repeat(starts - (np.cumsum(counts) - counts), counts) \
+            + np.arange(counts.sum())
+        edge_parent = np.asarray(self.ancestor_indices[edge_pos])
+
+        # Drop ancestors that are left out, renumbering the others
+        sorter = np.argsort(indices, kind="stable")
+        pos = np.searchsorted(indices, edge_parent, sorter=sorter)
+        pos = sorter[np.minimum(pos, max(len(indices) - 1, 0))] \
+            if len(indices) else pos
+        keep = indices[pos] == edge_parent if len(indices) \
+            else np.zeros(0, dtype=bool)
+        edge_child, edge_parent = edge_child[keep], pos[keep]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(edge_child, minlength=len(indices)),
+                  out=offsets[1:])
+        if isinstance(self.attributes, LazyColumns):
+            attributes = self.attributes.take(indices)
+        else:
+            attributes = {name: values[indices]
+                          for name, values in self.attributes.items()}
+        return CompactPhylogeny(self.ids[indices], offsets, edge_parent,
+                                attributes, self.origin[indices])
+
+
+def _networkx_structure(phylogeny):
+    # Taxon ids (in node order) and CSR ancestor lists (dense indices, in the
+    # order the edges were added) of a networkx phylogeny, read straight from
+    # its predecessor dicts
+    num_taxa = phylogeny.number_of_nodes()
+    predecessors = phylogeny._pred
+    ids = np.fromiter(predecessors, dtype=np.int64, count=num_taxa)
+    offsets = np.zeros(num_taxa + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, predecessors.values()), dtype=np.int64,
+                          count=num_taxa), out=offsets[1:])
+    ancestors = np.fromiter(chain.from_iterable(predecessors.values()),
+                            dtype=np.int64, count=offsets[-1])
+    sorter = np.argsort(ids, kind="stable")
+    return ids, offsets, sorter[np.searchsorted(ids, ancestors, sorter=sorter)]
+
+
+def stream_phylogeny_to_compact(filename, chunksize=100000, spill_dir=None,
+                                columns=None):
+    """Loads a phylogeny in standards format (csv) into a CompactPhylogeny,
+    reading chunksize rows at a time.
+
+    Only the topology (ids and ancestors) is kept in memory, so peak memory
+    grows with the number of taxa rather than with the size of the file.
+    Attribute columns are dropped unless spill_dir is given, in which case
+    they are written to a ColumnStore in that directory and each column is
+    loaded (numeric columns as memory maps) the first time it is accessed.
+
+    Args:
+        filename (str): path to phylogeny file
+        chunksize (int): number of rows to read at a time
+        spill_dir (str): directory to write attribute columns to, or None to
+            drop them
+        columns (list): attribute columns to write to spill_dir (default: all
+            of them). Other columns are never parsed.
+
+    Returns:
+        CompactPhylogeny
+    """
+    store = None
+    if spill_dir is not None:
+        store = ColumnStore(spill_dir)
+        if len(store):
+            raise Exception(f"{spill_dir} already holds a column store")
+
+    taxon_ids, parsed = _stream_topology(filename, chunksize, store, columns)
+    offsets, values, origin = parsed.offsets, parsed.values, parsed.origin
+    del parsed
+
+    # Ancestor ids are only resolved once every taxon has been read
+    _check_ancestors_present(
+        ParsedAncestorLists(None, offsets, values, origin), taxon_ids)
+    sorter = np.argsort(taxon_ids, kind="stable")
+    ancestors = sorter[np.searchsorted(taxon_ids, values, sorter=sorter)]
+    del values, sorter
+    attributes = LazyColumns(store) if store is not None else None
+    return CompactPhylogeny(taxon_ids, offsets, ancestors, attributes, origin)
+
+
+def _stream_topology(filename, chunksize, store=None, columns=None,
+                     strict=True):
+    # Reads the ids and ancestor lists of a csv file chunk by chunk (writing
+    # attribute columns to store, if given). Returns the taxon ids and
+    # ParsedAncestorLists (without ancestor_id) for the whole file, and with
+    # strict=False also its malformed rows (see parse_ancestor_lists).
+    ids, values, counts, origin_rows, origins = [], [], [], [], []
+    malformed = []
+    num_rows = 0
+    for data, parsed, chunk_malformed in _iter_phylogeny_csv_chunks(
+            filename, chunksize, columns if store is not None else [],
+            strict):
+        malformed.append(chunk_malformed)
+        ids.append(data.index.to_numpy(dtype=np.int64))
+        values.append(parsed.values)
+        counts.append(np.diff(parsed.offsets))
+        special = np.flatnonzero(pd.notna(parsed.origin))
+        origin_rows.append(special + num_rows)
+        origins.append(parsed.origin[special])
+        num_rows += len(data)
+        if store is not None:
+            store.append(data.drop(columns=["ancestor_list", "ancestor_id"]))
+
+    taxon_ids = np.concatenate(ids) if ids else np.zeros(0, np.int64)
+    values = np.concatenate(values) if values else np.zeros(0, np.int64)
+    offsets = np.zeros(num_rows + 1, dtype=np.int64)
+    if counts:
+        np.cumsum(np.concatenate(counts), out=offsets[1:])
+    origin = np.full(num_rows, None, dtype=object)
+    if origin_rows:
+        origin[np.concatenate(origin_rows)] = np.concatenate(origins)
+    parsed = ParsedAncestorLists(None, offsets, values, origin)
+    if strict:
+        return taxon_ids, parsed
+    malformed = np.concatenate(malformed) if malformed \
+        else np.zeros(0, dtype=bool)
+    return taxon_ids, parsed, malformed
+
+
+def load_phylogeny_to_compact(filename, columns=None, compact_dtypes=False,
+                              cache=False):
+    """
+    Loads a phylogeny in standards format (in csv or json) from the file
+    specified by the filename parameter (optionally compressed with gzip,
+    bz2 or xz). Returns the phylogeny as a CompactPhylogeny.
+
+    If columns is given, only those attribute columns are read up front. For
+    csv files, the remaining columns are still available as attributes: each
+    one is read from the file the first time it is accessed. For json files,
+    the remaining columns are dropped.
+
+    Args:
+        filename (str): path to phylogeny file
+        columns (list): attribute columns to read up front
+        compact_dtypes (bool): use compact dtypes for attribute columns (see
+            load_phylogeny_to_pandas_df)
+        cache (bool): use the binary cache of csv files (see
+            load_phylogeny_to_pandas_df)
+    """
+    if _file_format(filename) == "json":
+        data = pd.read_json(filename, orient="index", convert_dates=False,
+                            precise_float=True,
+                            compression=_compression(filename))
+        if columns is not None:
+            data = _project_columns(data, columns)
+        if compact_dtypes:
+            _compact_dtypes(data)
+        return CompactPhylogeny.from_pandas_df(data)
+    data, parsed, lazy_columns = _read_phylogeny_csv_columns(
+        filename, columns, compact_dtypes, cache)
+    return CompactPhylogeny._from_parsed(data, parsed, lazy_columns)
+
+
+def _load_compact_worker(filename, options):
+    return filename, load_phylogeny_to_compact(filename, **options)
+
+
+def _load_error(filename, error):
+    # Errors loading one of many files say which file failed
+    return Exception(f"failed to load {filename}: {error}")
+
+
+def iter_load_phylogenies_to_compact(filenames, processes=None, **options):
+    """Loads many phylogeny files (e.g., replicate runs) in parallel, across a
+    pool of processes, yielding each one as soon as it has been loaded.
+
+    Phylogenies are loaded as CompactPhylogeny objects, which are sent back
+    from the worker processes as a handful of numpy arrays (much cheaper to
+    transfer than networkx graphs).
+
+    Args:
+        filenames (list or str): paths to phylogeny files, or a glob pattern
+            (e.g., "runs/*/phylogeny.csv")
+        processes (int): number of worker processes (default: one per cpu).
+            With processes=1, files are loaded one after the other in this
+            process.
+        **options: passed on to load_phylogeny_to_compact (e.g., columns,
+            compact_dtypes or cache). Columns left to be read lazily are
+            read in this process, when first accessed.
+
+    Yields:
+        (filename, CompactPhylogeny) pairs, in the order loading finishes.
+    """
+    if isinstance(filenames, str):
+        filenames = sorted(glob.glob(filenames))
+    if processes == 1:
+        for filename in filenames:
+            try:
+                loaded = _load_compact_worker(filename, options)
+            except Exception as e:
+                raise _load_error(filename, e) from e
+            yield loaded
+        return
+    with ProcessPoolExecutor(processes) as pool:
+        futures = {pool.submit(_load_compact_worker, filename, options):
+                   filename for filename in filenames}
+        for future in as_completed(futures):
+            try:
+                loaded = future.result()
+            except Exception as e:
+                raise _load_error(futures[future], e) from e
+            yield loaded
+
+
+def load_phylogenies_to_compact(filenames, processes=None, **options):
+    """Loads many phylogeny files in parallel (see
+    iter_load_phylogenies_to_compact).
+
+    Returns:
+        dictionary of filename to CompactPhylogeny, in the order of filenames
+        (or in sorted order, for a glob pattern).
+    """
+    if isinstance(filenames, str):
+        filenames = sorted(glob.glob(filenames))
+    loaded = dict(iter_load_phylogenies_to_compact(filenames, processes,
+                                                   **options))
+    return {filename: loaded[filename] for filename in filenames}
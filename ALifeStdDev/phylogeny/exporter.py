@@ -0,0 +1,99 @@
+from itertools import chain, islice
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from .columnstore import LazyColumns
+from .compact import CompactPhylogeny
+from .loader import (_STRUCTURE_ATTRIBUTES, _file_format,
+                     _format_ancestor_lists, _networkx_attribute_names,
+                     _pandas_df_chunks, _write_phylogeny_chunks)
+
+
+def _networkx_chunks(phylogeny, attributes, file_format, chunksize):
+    if attributes is None:
+        attributes = _networkx_attribute_names(phylogeny)
+    nodes = iter(phylogeny.nodes(data=True))
+    first = True
+    while True:
+        chunk = list(islice(nodes, chunksize))
+        if not chunk and not first:
+            return
+        first = False
+        ids = [node for node, _ in chunk]
+        data = pd.DataFrame({"id": ids})
+        ancestors = [list(phylogeny.pred[node]) for node in ids]
+        offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum([len(a) for a in ancestors], out=offsets[1:])
+        data["ancestor_list"] = _format_ancestor_lists(
+            offsets, list(chain.from_iterable(ancestors)),
+            [attrs.get("origin") for _, attrs in chunk], file_format)
+        for name in attributes:
+            data[name] = [attrs.get(name) for _, attrs in chunk]
+        yield data
+
+
+def _compact_chunks(phylogeny, attributes, file_format, chunksize):
+    if attributes is None:
+        attributes = list(phylogeny.attributes)
+    # Columns not yet loaded are only read chunk by chunk when the store can
+    # read rows without reading the whole column; otherwise each one is read
+    # once, here
+    by_chunk = isinstance(phylogeny.attributes, LazyColumns) and \
+        phylogeny.attributes.store.random_access
+    if not by_chunk:
+        loaded = {name: phylogeny.attributes[name] for name in attributes
+                  if name in phylogeny.attributes}
+    offsets = phylogeny.ancestor_offsets
+    for start in range(0, max(len(phylogeny), 1), chunksize):
+        stop = min(start + chunksize, len(phylogeny))
+        ancestor_ids = phylogeny.ids[
+            phylogeny.ancestor_indices[offsets[start]:offsets[stop]]]
+        data = pd.DataFrame({"id": phylogeny.ids[start:stop]})
+        data["ancestor_list"] = _format_ancestor_lists(
+            offsets[start:stop + 1] - offsets[start], ancestor_ids,
+            phylogeny.origin[start:stop], file_format)
+        if by_chunk:
+            columns = phylogeny.attributes.take(np.arange(start, stop))
+        else:
+            columns = {name: values[start:stop]
+                       for name, values in loaded.items()}
+        for name in attributes:
+            data[name] = columns[name] if name in columns else None
+        yield data
+
+
+def save_phylogeny(phylogeny, filename, attributes=None, chunksize=100000):
+    """Writes a phylogeny to a file in standards format, converting
+    chunksize taxa at a time so memory use does not grow with the size of
+    the phylogeny.
+
+    The format is chosen from the extension of filename: csv or json,
+    optionally compressed (as it is written) with gzip, bz2 or xz, e.g.
+    "phylogeny.csv.gz". Roots are written with their "origin" attribute as
+    their ancestor list (e.g., "[none]").
+
+    Args:
+        phylogeny (networkx.DiGraph, CompactPhylogeny or pandas.DataFrame):
+            phylogeny to write (dataframes as produced by
+            load_phylogeny_to_pandas_df or networkx_to_pandas_df)
+        filename (str): path of file to write
+        attributes (list): taxon attributes to write as columns (default:
+            all of them). Taxa without a value get an empty entry. Ignored
+            for dataframes, which are written as they are.
+        chunksize (int): number of taxa to convert at a time
+    """
+    file_format = _file_format(filename)
+    if attributes is not None:
+        attributes = [name for name in attributes
+                      if name not in _STRUCTURE_ATTRIBUTES]
+    if isinstance(phylogeny, CompactPhylogeny):
+        chunks = _compact_chunks(phylogeny, attributes, file_format,
+                                 chunksize)
+    elif isinstance(phylogeny, nx.DiGraph):
+        chunks = _networkx_chunks(phylogeny, attributes, file_format,
+                                  chunksize)
+    else:
+        chunks = _pandas_df_chunks(phylogeny, file_format, chunksize)
+    _write_phylogeny_chunks(filename, chunks)
@@ -0,0 +1,140 @@
+import numpy as np
+
+from .compact import CompactPhylogeny, _networkx_structure
+
+
+# Methods through which a networkx DiGraph's structure can change
+_MUTATING_METHODS = ("add_node", "add_nodes_from", "remove_node",
+                     "remove_nodes_from", "add_edge", "add_edges_from",
+                     "add_weighted_edges_from", "remove_edge",
+                     "remove_edges_from", "update", "clear", "clear_edges")
+
+
+class _InvalidatingMethod:
+    # Stands in for a mutating method on an indexed graph (the way
+    # networkx.freeze replaces them): marks the graph's index as out of date,
+    # then calls the graph class's own method
+
+    def __init__(self, phylogeny, name):
+        self.phylogeny = phylogeny
+        self.name = name
+
+    def __call__(self, *args, **kwargs):
+        self.phylogeny._phylogeny_index = None
+        return getattr(type(self.phylogeny), self.name)(self.phylogeny, *args,
+                                                        **kwargs)
+
+
+class PhylogenyIndex:
+    """Structural index of a networkx phylogeny: roots, leaves, asexual flag,
+    parent pointers and depths, computed once and shared by every function in
+    phylogeny.utils and phylogeny.metrics.
+
+    Build one with index_phylogeny. The structure is held as a CompactPhylogeny
+    without attributes (the structure attribute); depths and root labels are
+    computed the first time they are needed.
+    """
+
+    def __init__(self, phylogeny):
+        """
+        Args:
+            phylogeny (networkx.DiGraph): graph object that describes a
+                phylogeny (node ids must be integers)
+        """
+        self.structure = CompactPhylogeny(*_networkx_structure(phylogeny))
+
+    def __repr__(self):
+        return f"PhylogenyIndex({len(self.structure)} taxa)"
+
+    def _ids(self, indices):
+        return self.structure.ids[indices].tolist()
+
+    def is_asexual(self):
+        """True if no taxon has more than one ancestor."""
+        return self.structure.is_asexual()
+
+    def root_ids(self):
+        """Ids of taxa with no ancestors (in node order)."""
+        return self._ids(self.structure.root_indices())
+
+    def leaf_ids(self):
+        """Ids of taxa with no descendants (in node order)."""
+        return self._ids(self.structure.leaf_indices())
+
+    def num_components(self):
+        """Number of weakly connected components (independent trees)."""
+        return len(np.unique(self.structure.component_labels()))
+
+    def depth(self, taxon_id):
+        """Number of steps from the given taxon to its root (following first
+        ancestors).
+        """
+        return int(self.structure.depths[self.structure.index_of(taxon_id)])
+
+    def parent_id(self, taxon_id):
+        """Id of the given taxon's (first) ancestor, or None for roots."""
+        parent = self.structure.parents[self.structure.index_of(taxon_id)]
+        return None if parent < 0 else int(self.structure.ids[parent])
+
+    def lineage_ids(self, taxon_id):
+        """Ids along the lineage of the given taxon, from the taxon itself to
+        its root (following first ancestors).
+        """
+        return self._ids(self.structure.lineage_indices(
+            self.structure.index_of(taxon_id)))
+
+
+def index_phylogeny(phylogeny):
+    """Build a structural index (PhylogenyIndex) of a networkx phylogeny and
+    attach it to the graph.
+
+    While attached, functions in phylogeny.utils and phylogeny.metrics answer
+    structural queries (roots, leaves, is_asexual, lineages, mrca, depths)
+    from the index instead of scanning the graph on every call. Adding or
+    removing nodes or edges invalidates the index; it is rebuilt the next
+    time it is needed. Node attributes are not part of the index, so they can
+    be changed freely.
+
+    Args:
+        phylogeny (networkx.DiGraph): graph object that describes a phylogeny
+
+    Returns:
+        PhylogenyIndex
+    """
+    if "_phylogeny_index" not in phylogeny.__dict__:
+        for name in _MUTATING_METHODS:
+            setattr(phylogeny, name, _InvalidatingMethod(phylogeny, name))
+    # None if the graph has changed since the index was built
+    if phylogeny.__dict__.get("_phylogeny_index") is None:
+        phylogeny._phylogeny_index = PhylogenyIndex(phylogeny)
+    return phylogeny._phylogeny_index
+
+
+def get_phylogeny_index(phylogeny):
+    """Get the structural index attached to a phylogeny by index_phylogeny
+    (rebuilding it if the graph has changed since), or None if the phylogeny
+    has not been indexed.
+
+    Args:
+        phylogeny (networkx.DiGraph): graph object that describes a phylogeny
+
+    Returns:
+        PhylogenyIndex or None
+    """
+    if "_phylogeny_index" not in getattr(phylogeny, "__dict__", {}):
+        return None
+    return index_phylogeny(phylogeny)
+
+
+def drop_phylogeny_index(phylogeny):
+    """Detach the structural index from a phylogeny, so that later queries
+    scan the graph again.
+
+    Args:
+        phylogeny (networkx.DiGraph): graph object that describes a phylogeny
+    """
+    if "_phylogeny_index" not in phylogeny.__dict__:
+        return
+    del phylogeny.__dict__["_phylogeny_index"]
+    for name in _MUTATING_METHODS:
+        del phylogeny.__dict__[name]
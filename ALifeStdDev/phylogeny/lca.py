@@ -0,0 +1,154 @@
+import numpy as np
+
+
+class LCAIndex:
+    """Lowest common ancestor index over the first-ancestor tree of a
+    phylogeny (its only tree, for asexual phylogenies), by binary lifting.
+
+    Holds the 2^k-th ancestor of every taxon for k up to log2 of the maximum
+    depth. Setup takes O(n log(depth)) time; after that, most recent common
+    ancestors and ancestor tests take O(log(depth)) per pair, and every query
+    is vectorized over numpy arrays of dense indices.
+
+    Build one with CompactPhylogeny.lca_index(), which keeps it for later
+    queries.
+    """
+
+    def __init__(self, parents, depths, root_labels):
+        """
+        Args:
+            parents (array-like): dense index of each taxon's (first)
+                ancestor, or -1 for roots
+            depths (array-like): number of steps from each taxon to its root
+            root_labels (array-like): dense index of each taxon's root
+        """
+        num_taxa = len(parents)
+        dtype = np.int32 if num_taxa < 2 ** 31 else np.int64
+        self.depths = np.asarray(depths)
+        self.root_labels = np.asarray(root_labels)
+        max_depth = int(self.depths.max()) if num_taxa else 0
+        # Roots are their own ancestors, so lifting past a root stays there
+        up = np.where(np.asarray(parents) < 0, np.arange(num_taxa),
+                      parents).astype(dtype)
+        self.ancestors = [up]
+        for _ in range(1, max(max_depth.bit_length(), 1)):
+            up = up[up]
+            self.ancestors.append(up)
+
+    def __len__(self):
+        return len(self.depths)
+
+    def lift(self, indices, steps):
+        """Dense indices of the ancestors the given numbers of steps above the
+        given taxa (stopping at roots).
+        """
+        indices = np.array(indices, dtype=np.int64, ndmin=1)
+        steps = np.broadcast_to(np.asarray(steps, dtype=np.int64),
+                                indices.shape)
+        for k, up in enumerate(self.ancestors):
+            move = np.flatnonzero((steps >> k) & 1)
+            indices[move] = up[indices[move]]
+        return indices
+
+    def mrca_pairs(self, first, second):
+        """Dense index of the most recent common ancestor of each pair of
+        taxa, or -1 for pairs that do not share one.
+
+        Args:
+            first (array-like): dense indices
+            second (array-like): dense indices (same length as first)
+
+        Returns:
+            int64 array of dense indices
+        """
+        first = np.array(first, dtype=np.int64, ndmin=1)
+        second = np.array(second, dtype=np.int64, ndmin=1)
+        # Bring the deeper taxon of each pair up to the depth of the other
+        diff = self.depths[first] - self.depths[second]
+        deeper = diff < 0
+        first[deeper], second[deeper] = second[deeper], first[deeper]
+        first = self.lift(first, np.abs(diff))
+
+        # Then step both up by the largest jumps that keep them apart
+        apart = np.flatnonzero(first != second)
+        for up in reversed(self.ancestors):
+            a, b = up[first[apart]], up[second[apart]]
+            jump = a != b
+            first[apart[jump]] = a[jump]
+            second[apart[jump]] = b[jump]
+        first[apart] = self.ancestors[0][first[apart]]
+
+        first[self.root_labels[first] != self.root_labels[second]] = -1
+        return first
+
+    def mrca(self, indices):
+        """Dense index of the most recent common ancestor of all of the given
+        taxa, or -1 if they do not share one (or none are given).
+        """
+        current = np.unique(np.asarray(indices, dtype=np.int64))
+        if len(current) == 0 or \
+                np.any(self.root_labels[current] != self.root_labels[current[0]]):
+            return -1
+        # Pair up taxa and replace each pair with its mrca, halving each round
+        while len(current) > 1:
+            half = len(current) // 2
+            current = np.concatenate((
+                self.mrca_pairs(current[:half], current[half:2 * half]),
+                current[2 * half:]))
+        return int(current[0])
+
+    def mrca_groups(self, indices, offsets):
+        """Dense index of the most recent common ancestor of each group of
+        taxa, or -1 for groups that do not share one (or are empty). All
+        groups are reduced together, halving every group in each round.
+
+        Args:
+            indices (array-like): dense indices of the taxa of every group,
+                one group after the other
+            offsets (array-like): CSR offsets of the groups into indices
+                (number of groups + 1)
+
+        Returns:
+            int64 array of dense indices, one per group
+        """
+        current = np.array(indices, dtype=np.int64, ndmin=1)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        sizes = np.diff(offsets)
+        group = np.repeat(np.arange(len(sizes)), sizes)
+        # Groups spanning several trees have no mrca, and are left out
+        roots = self.root_labels[current]
+        split = np.bincount(group, weights=roots != roots[offsets[group]],
+                            minlength=len(sizes)) > 0
+        keep = ~split[group]
+        current, group = current[keep], group[keep]
+        num_groups = np.count_nonzero((sizes > 0) & ~split)
+
+        while len(current) > num_groups:
+            # Pair every taxon at an even position within its group with the
+            # taxon after it (if there is one)
+            start = np.flatnonzero(np.diff(group, prepend=-1))
+            rank = np.arange(len(group)) - np.repeat(start, np.diff(
+                np.append(start, len(group))))
+            even = np.flatnonzero(rank % 2 == 0)
+            paired = even[(even + 1 < len(group))]
+            paired = paired[group[paired + 1] == group[paired]]
+            current[paired] = self.mrca_pairs(current[paired],
+                                              current[paired + 1])
+            current, group = current[even], group[even]
+
+        result = np.full(len(sizes), -1, dtype=np.int64)
+        result[group] = current
+        return result
+
+    def is_ancestor(self, ancestors, descendants):
+        """Is each of ancestors a (strict) ancestor of the taxon at the same
+        position of descendants?
+
+        Returns:
+            bool array
+        """
+        ancestors = np.array(ancestors, dtype=np.int64, ndmin=1)
+        descendants = np.array(descendants, dtype=np.int64, ndmin=1)
+        steps = self.depths[descendants] - self.depths[ancestors]
+        lifted = self.lift(descendants, np.maximum(steps, 0))
+        return (steps > 0) & (lifted == ancestors)
@@ -0,0 +1,252 @@
+import numpy as np
+
+from .compact import CompactPhylogeny
+
+
+def _lifespan_times(origin, destruction, not_destroyed_value="none"):
+    # Origin and destruction times as float64 arrays, with taxa that have not
+    # been destroyed (not_destroyed_value, or an infinite time) ending at inf
+    destruction = np.asarray(destruction)
+    if destruction.dtype.kind in "biuf":
+        end = destruction.astype(float)
+        if isinstance(not_destroyed_value, str):
+            not_destroyed = np.zeros(len(end), dtype=bool)
+        else:
+            not_destroyed = destruction == not_destroyed_value
+    else:
+        destruction = destruction.astype(object)
+        not_destroyed = destruction == not_destroyed_value
+        end = np.empty(len(destruction))
+        end[~not_destroyed] = destruction[~not_destroyed].astype(float)
+    end[not_destroyed] = np.inf
+    start = np.asarray(origin).astype(float)
+    return start, end
+
+
+def _taxon_times(phylogeny, attribute):
+    # Values of the given attribute for every taxon (in dense/node order)
+    if isinstance(phylogeny, CompactPhylogeny):
+        if attribute not in phylogeny.attributes:
+            raise Exception(f"Not all taxa have '{attribute}' data")
+        return phylogeny.attributes[attribute]
+    values = [attrs.get(attribute) for _, attrs in
+              phylogeny.nodes(data=True)]
+    if any(value is None for value in values):
+        raise Exception(f"Not all taxa have '{attribute}' data")
+    return values
+
+
+def get_lifespan_times(phylogeny, not_destroyed_value="none",
+                       destruction_attribute="destruction_time",
+                       origin_attribute="origin_time"):
+    """Normalize the origin and destruction times of all taxa of a phylogeny
+    into float64 arrays, with inf as the destruction time of taxa that have
+    not been destroyed, for vectorized liveness checks (see get_alive_mask).
+
+    Args:
+        phylogeny (networkx.DiGraph or CompactPhylogeny): graph object that
+            describes a phylogeny
+        not_destroyed_value (str): value of destruction_attribute that
+            indicates that the taxon is not destroyed (i.e., still exists)
+        destruction_attribute (str): attribute holding destruction times
+        origin_attribute (str): attribute holding origin times, or None to
+            only normalize destruction times
+
+    Returns:
+        Tuple of origin times (None if origin_attribute is None) and
+        destruction times, in dense (CompactPhylogeny) or node (networkx)
+        order.
+    """
+    destruction = _taxon_times(phylogeny, destruction_attribute)
+    if origin_attribute is None:
+        origin = np.zeros(len(destruction))
+    else:
+        origin = _taxon_times(phylogeny, origin_attribute)
+    start, end = _lifespan_times(origin, destruction, not_destroyed_value)
+    return (None if origin_attribute is None else start), end
+
+
+def get_alive_mask(origin_times, destruction_times, time="present"):
+    """Which taxa are alive at the given time(s)?
+
+    A taxon is alive at time t if origin_time <= t < destruction_time.
+
+    Args:
+        origin_times (numpy.ndarray): origin time of each taxon (float64,
+            e.g., from get_lifespan_times; may be None for time="present")
+        destruction_times (numpy.ndarray): destruction time of each taxon,
+            inf for taxa that have not been destroyed
+        time (float, array-like or the string "present"): time point(s), or
+            "present" (default) for the taxa that have not been destroyed
+
+    Returns:
+        bool array with one entry per taxon, or one row per time point if
+        given several.
+    """
+    if isinstance(time, str) and time == "present":
+        return np.isinf(destruction_times)
+    time = np.asarray(time, dtype=float)
+    if time.ndim:
+        time = time[:, np.newaxis]
+    return (origin_times <= time) & (time < destruction_times)
+
+
+class LifespanIndex:
+    """Index of the lifespans of the taxa of a phylogeny, for answering "which
+    taxa were alive at time t" without scanning every taxon.
+
+    A taxon is alive at time t if origin_time <= t < destruction_time (taxa
+    that have not been destroyed live forever), as in get_extant_taxa_ids.
+
+    Counts of living taxa come from two sorted arrays of origin and
+    destruction times, in O(log n) per time point (vectorized over many time
+    points). The ids of living taxa come from a centered interval tree, in
+    O(log n + k) for k living taxa.
+
+    Build one with build_lifespan_index.
+    """
+
+    def __init__(self, ids, origin_times, destruction_times):
+        """
+        Args:
+            ids (array-like): taxon ids
+            origin_times (array-like): origin time of each taxon
+            destruction_times (array-like): destruction time of each taxon
+                (inf for taxa that have not been destroyed)
+        """
+        self.ids = np.asarray(ids, dtype=np.int64)
+        start = np.asarray(origin_times, dtype=float)
+        # Taxa destroyed before their origin are never alive
+        end = np.maximum(np.asarray(destruction_times, dtype=float), start)
+        self.sorted_origin_times = np.sort(start)
+        self.sorted_destruction_times = np.sort(end)
+        self._not_destroyed = np.flatnonzero(np.isinf(end))
+        self._build_tree(start, end)
+
+    def _build_tree(self, start, end):
+        # Centered interval tree, built one level at a time. Each node stores
+        # the intervals containing its center (the median origin time of the
+        # intervals that reach it), sorted by origin time and by destruction
+        # time. Intervals ending at or before the center go left, those
+        # starting after it go right.
+        num_taxa = len(start)
+        centers = np.zeros(num_taxa, dtype=float)
+        left = np.full(num_taxa, -1, dtype=np.int64)
+        right = np.full(num_taxa, -1, dtype=np.int64)
+        stored_node = np.full(num_taxa, -1, dtype=np.int64)
+        active = np.flatnonzero(end > start)
+        active_node = np.zeros(len(active), dtype=np.int64)
+        num_nodes = 1 if len(active) else 0
+        while len(active):
+            order = np.lexsort((start[active], active_node))
+            active, active_node = active[order], active_node[order]
+            nodes, first, counts = np.unique(active_node, return_index=True,
+                                             return_counts=True)
+            centers[nodes] = start[active[first + (counts - 1) // 2]]
+            center = centers[active_node]
+            goes_left = end[active] <= center
+            goes_right = start[active] > center
+            stays = ~(goes_left | goes_right)
+            stored_node[active[stays]] = active_node[stays]
+
+            for goes, children in [(goes_left, left), (goes_right, right)]:
+                parents = np.unique(active_node[goes])
+                children[parents] = num_nodes + np.arange(len(parents))
+                num_nodes += len(parents)
+                active_node[goes] = children[active_node[goes]]
+            active, active_node = active[~stays], active_node[~stays]
+
+        self._centers = centers[:num_nodes]
+        self._left = left[:num_nodes]
+        self._right = right[:num_nodes]
+        stored = np.flatnonzero(stored_node >= 0)
+        node = stored_node[stored]
+        self._node_offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(node, minlength=num_nodes),
+                  out=self._node_offsets[1:])
+        by_start = stored[np.lexsort((start[stored], node))]
+        by_end = stored[np.lexsort((-end[stored], node))]
+        self._by_start, self._start = by_start, start[by_start]
+        self._by_end, self._neg_end = by_end, -end[by_end]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def count_alive(self, times):
+        """Number of taxa alive at each of the given times, without looking
+        up which ones they are.
+
+        Args:
+            times (float or array-like): time point(s)
+
+        Returns:
+            int (for a single time) or int64 array of counts
+        """
+        born = np.searchsorted(self.sorted_origin_times, times, side="right")
+        destroyed = np.searchsorted(self.sorted_destruction_times, times,
+                                    side="right")
+        counts = born - destroyed
+        return int(counts) if np.ndim(counts) == 0 else counts
+
+    def _alive_indices(self, time):
+        if isinstance(time, str) and time == "present":
+            return self._not_destroyed
+        parts = []
+        node = 0 if len(self._centers) else -1
+        while node >= 0:
+            lo, hi = self._node_offsets[node], self._node_offsets[node + 1]
+            if time < self._centers[node]:
+                # Every interval here ends after time: alive if started
+                count = np.searchsorted(self._start[lo:hi], time,
+                                        side="right")
+                parts.append(self._by_start[lo:lo + count])
+                node = self._left[node]
+            else:
+                # Every interval here started by time: alive if not ended
+                count = np.searchsorted(self._neg_end[lo:hi], -time,
+                                        side="left")
+                parts.append(self._by_end[lo:lo + count])
+                node = self._right[node]
+        return np.concatenate(parts) if parts else np.zeros(0, np.int64)
+
+    def alive_ids(self, time="present"):
+        """Ids of the taxa alive at the given time, in no particular order.
+
+        Args:
+            time (float or the string "present"): time point, or "present"
+                (default) for the taxa that have not been destroyed
+
+        Returns:
+            int64 array of taxon ids
+        """
+        return self.ids[self._alive_indices(time)]
+
+
+def build_lifespan_index(phylogeny, not_destroyed_value="none",
+                         destruction_attribute="destruction_time",
+                         origin_attribute="origin_time"):
+    """Build a LifespanIndex over the origin and destruction times of the taxa
+    of a phylogeny, for repeated extant-taxa queries (e.g., sweeping many time
+    points).
+
+    Args:
+        phylogeny (networkx.DiGraph or CompactPhylogeny): graph object that
+            describes a phylogeny. All taxa must specify origin and
+            destruction times.
+        not_destroyed_value (str): value of destruction_attribute that
+            indicates that the taxon is not destroyed (i.e., still exists)
+        destruction_attribute (str): attribute holding destruction times
+        origin_attribute (str): attribute holding origin times
+
+    Returns:
+        LifespanIndex
+    """
+    if isinstance(phylogeny, CompactPhylogeny):
+        ids = phylogeny.ids
+    else:
+        ids = np.fromiter(phylogeny.nodes, dtype=np.int64,
+                          count=phylogeny.number_of_nodes())
+    destruction = _taxon_times(phylogeny, destruction_attribute)
+    origin = _taxon_times(phylogeny, origin_attribute)
+    return LifespanIndex(ids, *_lifespan_times(origin, destruction,
+                                               not_destroyed_value))
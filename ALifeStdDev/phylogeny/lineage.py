@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+from .compact import CompactPhylogeny
+
+
+class LineageView:
+    """Read-only view of the ancestral lineage of a taxon, backed by the ids
+    along it (root first) and the phylogeny it was taken from. Nothing is
+    copied: attribute values are looked up in the phylogeny when asked for.
+
+    The lineage metrics in phylogeny.metrics accept views directly. Get one
+    with extract_asexual_lineage(phylogeny, taxa_id, view=True), or from a
+    LineageTrie.
+    """
+
+    def __init__(self, phylogeny, ids):
+        """
+        Args:
+            phylogeny (networkx.DiGraph or CompactPhylogeny): phylogeny the
+                lineage belongs to
+            ids (array-like): ids along the lineage, from root to tip
+        """
+        self.phylogeny = phylogeny
+        self.ids = np.asarray(ids, dtype=np.int64)
+
+    def __repr__(self):
+        return f"LineageView({len(self)} taxa)"
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids.tolist())
+
+    def __contains__(self, taxon_id):
+        return bool(np.any(self.ids == taxon_id))
+
+    def has_attribute(self, attribute):
+        """Do all taxa along the lineage have the given attribute?"""
+        if isinstance(self.phylogeny, CompactPhylogeny):
+            return attribute in self.phylogeny.attributes
+        nodes = self.phylogeny.nodes
+        return all(attribute in nodes[taxon_id] for taxon_id in self)
+
+    def attribute(self, attribute):
+        """Values of the given attribute along the lineage, from root to tip
+        (numpy array).
+        """
+        if isinstance(self.phylogeny, CompactPhylogeny):
+            return self.phylogeny.attributes[attribute][
+                self.phylogeny.index_of(self.ids)]
+        nodes = self.phylogeny.nodes
+        return pd.Series([nodes[taxon_id][attribute]
+                          for taxon_id in self]).to_numpy()
+
+    def to_networkx(self):
+        """Copy of the lineage as a networkx.DiGraph (as returned by
+        extract_asexual_lineage).
+        """
+        if isinstance(self.phylogeny, CompactPhylogeny):
+            return self.phylogeny.subset(
+                self.phylogeny.index_of(self.ids)).to_networkx()
+        return self.phylogeny.subgraph(self.ids.tolist()).copy()
+
+
+class LineageTrie:
+    """Lineages of many taxa of a phylogeny, stored as a parent-pointer tree
+    over the taxa on any of them, so ancestry shared by several lineages is
+    kept only once.
+
+    Build one with extract_asexual_lineages. Iterating over a trie yields a
+    LineageView per lineage.
+
+    Attributes:
+        phylogeny (networkx.DiGraph or CompactPhylogeny): phylogeny the
+            lineages belong to
+        ids (numpy.ndarray): ids of the taxa on any lineage, shallowest first
+        parents (numpy.ndarray): position (in ids) of each taxon's ancestor,
+            -1 for roots
+        tips (numpy.ndarray): position (in ids) of the taxon each lineage was
+            extracted for
+    """
+
+    def __init__(self, phylogeny, ids, parents, tips):
+        self.phylogeny = phylogeny
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.parents = np.asarray(parents, dtype=np.int64)
+        self.tips = np.asarray(tips, dtype=np.int64)
+
+    def __repr__(self):
+        return f"LineageTrie({len(self)} lineages, {len(self.ids)} taxa)"
+
+    def __len__(self):
+        return len(self.tips)
+
+    def __iter__(self):
+        return (self.lineage(i) for i in range(len(self)))
+
+    def tip_ids(self):
+        """Ids of the taxa the lineages were extracted for."""
+        return self.ids[self.tips]
+
+    def lineage_ids(self, i):
+        """Ids along the i-th lineage, from root to tip."""
+        path = []
+        position = int(self.tips[i])
+        while position >= 0:
+            path.append(position)
+            position = int(self.parents[position])
+        return self.ids[path[::-1]]
+
+    def lineage(self, i):
+        """LineageView of the i-th lineage."""
+        return LineageView(self.phylogeny, self.lineage_ids(i))
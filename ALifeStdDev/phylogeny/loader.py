@@ -1,25 +1,413 @@
 import networkx as nx
+import numpy as np
 import pandas as pd
 import ast
+import bz2
+import gzip
+import lzma
+import os
+import re
+from collections import namedtuple
 
+from .cache import (CachedColumnStore, clear_phylogeny_cache,
+                    phylogeny_cache_path, _PhylogenyCache, _open_cache,
+                    _write_cache)
+from .columnstore import CsvColumnStore, LazyColumns, _compact_column
 
-def load_phylogeny_to_pandas_df(filename):
-    data = pd.read_csv(filename)
-    data.columns = data.columns.str.replace(' ', '')
 
-    # The ancestor_list column contains a string of lists of strings
-    # Let's turn it into an actual list of strings
-    data.loc[:, "ancestor_list"] = \
-        data.loc[:, "ancestor_list"].apply(lambda x: x.strip())
-    data.loc[:, "ancestor_list"] = \
-        data.loc[:, "ancestor_list"].apply(lambda x: x if x.lower() != "[none]" else "[None]")
-    data.loc[:, "ancestor_list"] = \
-        data.loc[:, "ancestor_list"].apply(ast.literal_eval)
-    data.set_index("id", inplace=True)
+ParsedAncestorLists = namedtuple("ParsedAncestorLists",
+                                 ["ancestor_id", "offsets", "values", "origin"])
+ParsedAncestorLists.__doc__ = """Vectorized parse of an ancestor_list column.
+
+Attributes:
+    ancestor_id (numpy.ndarray): int64 array with the first listed ancestor
+        of each taxon, or -1 for taxa with no (numeric) ancestors.
+    offsets (numpy.ndarray): int64 CSR offsets (length n + 1); the ancestors
+        of row i are values[offsets[i]:offsets[i + 1]].
+    values (numpy.ndarray): int64 ancestor ids, in row order.
+    origin (numpy.ndarray): object array holding the special (non-numeric)
+        ancestor value of each row as a string (e.g., "none"), or None for
+        rows without one.
+"""
+
+
+# Compression codecs (all from the standard library) by file extension
+_COMPRESSION_EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+_OPENERS = {None: open, "gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+
+
+def _compression(filename):
+    # Compression codec of a file, from its extension (None if uncompressed)
+    return _COMPRESSION_EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+
+
+def _file_format(filename):
+    # "csv" or "json", from a file's extension (ignoring compression)
+    base = filename
+    if _compression(filename) is not None:
+        base = os.path.splitext(filename)[0]
+    extension = os.path.splitext(base)[1].lower()
+    if extension not in (".csv", ".json"):
+        raise Exception(f"unsupported phylogeny file: {filename} (expected "
+                        ".csv or .json, optionally compressed as .gz, .bz2 "
+                        "or .xz)")
+    return extension[1:]
+
+
+def open_phylogeny_file(filename, mode="rt"):
+    """Open a phylogeny file in text mode, compressed or decompressed on the
+    fly if its extension is .gz, .bz2 or .xz.
+
+    Args:
+        filename (str): path to phylogeny file
+        mode (str): "rt" to read or "wt" to write
+
+    Returns:
+        file object
+    """
+    return _OPENERS[_compression(filename)](filename, mode)
+
+
+# Characters in an ancestor list that are never part of an ancestor id
+_IGNORED_BYTES = np.zeros(256, dtype=bool)
+_IGNORED_BYTES[list(b"[] \t'\"")] = True
+_ROW_END, _TOKEN_END = 0, ord(",")
+# Largest ancestor id, and the number of digits from which ids may not fit
+_MAX_ID = np.iinfo(np.int64).max
+_MAX_ID_DIGITS = len(str(_MAX_ID))
+# Tokens that are numbers but not valid ancestor ids (e.g., "1.5" or "-2"),
+# rather than special values
+_NUMBER = re.compile(r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$")
+
+
+def parse_ancestor_lists(ancestor_lists, strict=True):
+    """Parse a whole column of standard-format ancestor lists at once.
+
+    Handles string lists as written to file (e.g., "['1', '2']") as well as
+    already-parsed python lists (e.g., from JSON). Non-numeric entries (e.g.,
+    ['none'] or [None]) are treated as special values and reported in the
+    origin field rather than as ancestors.
+
+    All rows are joined into a single byte buffer and tokenized with numpy,
+    so there is no per-row python work (except for special values).
+
+    Args:
+        ancestor_lists (pandas.Series or sequence): ancestor_list column
+        strict (bool): if True (default), raise on malformed rows. Otherwise,
+            report them: rows with unbalanced brackets or quotes, and ids
+            that are numbers but not valid ids (e.g., "1.5", "-2" or ids too
+            large for a 64-bit integer). Invalid ids are left out of the
+            parsed ancestors.
+
+    Returns:
+        ParsedAncestorLists with an int64 parent column and the CSR
+        offsets/values pair describing every row's ancestors. With
+        strict=False, a tuple of it and a bool array marking malformed rows.
+
+    Raises:
+        Exception: with strict=True, if any row is malformed.
+    """
+    lists = pd.Series(ancestor_lists, dtype=object).astype(str).to_numpy()
+    num_rows = len(lists)
+    text = "\0".join(lists) + "\0" if num_rows else ""
+    buf = np.frombuffer(text.encode(), dtype=np.uint8)
+
+    row_end = buf == _ROW_END
+    if row_end.sum() != num_rows:
+        raise Exception("ancestor_list values may not contain null bytes")
+    malformed = _unbalanced_rows(buf, row_end, num_rows)
+    if strict and np.any(malformed):
+        raise Exception("malformed ancestor_list: "
+                        f"{lists[np.argmax(malformed)]!r}")
+
+    def reject(tok, message):
+        if strict:
+            raise Exception(message)
+        malformed[token_row[tok]] = True
+
+    token_end = row_end | (buf == _TOKEN_END)
+    token_end_pos = np.flatnonzero(token_end)
+    num_tokens = len(token_end_pos)
+    # Token number of every byte, and row number of every token
+    token = np.cumsum(token_end) - token_end
+    token_row = np.cumsum(row_end)[token_end_pos] - row_end[token_end_pos]
+
+    content = ~(token_end | _IGNORED_BYTES[buf])
+    digit = (buf >= ord("0")) & (buf <= ord("9"))
+    num_content = np.bincount(token[content], minlength=num_tokens)
+    num_other = np.bincount(token[content & ~digit], minlength=num_tokens)
+    is_id = (num_content > 0) & (num_other == 0)
+
+    token_start_pos = np.append(0, token_end_pos[:-1] + 1)
+
+    def token_text(tok):
+        raw = buf[token_start_pos[tok]:token_end_pos[tok]].tobytes()
+        return raw.decode().strip("[] \t'\"")
+
+    # Ids with as many digits as the largest id may not fit in int64; they
+    # are parsed one by one (leading zeros are allowed)
+    long_values = {}
+    for tok in np.flatnonzero(is_id & (num_content >= _MAX_ID_DIGITS)):
+        value = int(token_text(tok))
+        if value > _MAX_ID:
+            reject(tok, f"ancestor id {value} does not fit in a 64-bit "
+                   "integer")
+            is_id[tok] = False
+        else:
+            long_values[tok] = value
+
+    # Accumulate the digits of each id token by place value
+    digit_pos = np.flatnonzero(digit & is_id[token])
+    digit_token = token[digit_pos]
+    starts = np.flatnonzero(np.diff(digit_token, prepend=-1))
+    ends = np.append(starts, len(digit_pos))[1:] - 1
+    place = np.repeat(ends, ends - starts + 1) - np.arange(len(digit_pos))
+    digits = (buf[digit_pos] - ord("0")).astype(np.int64)
+    values = np.add.reduceat(digits * np.power(10, place, dtype=np.int64),
+                             starts) if len(starts) else digits
+
+    counts = np.bincount(token_row[is_id], minlength=num_rows)
+    offsets = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    ancestor_id = np.full(num_rows, -1, dtype=np.int64)
+    has_ancestor = counts > 0
+    ancestor_id[has_ancestor] = values[offsets[:-1][has_ancestor]]
+
+    if long_values:
+        # (These overflowed above)
+        value_pos = np.cumsum(is_id) - 1
+        for tok, value in long_values.items():
+            values[value_pos[tok]] = value
+        ancestor_id[has_ancestor] = values[offsets[:-1][has_ancestor]]
+
+    origin = np.full(num_rows, None, dtype=object)
+    for tok in np.flatnonzero(num_other > 0):
+        special = token_text(tok)
+        if _NUMBER.match(special):
+            reject(tok, f"invalid ancestor id: {special!r} (ancestor ids "
+                   "must be non-negative integers)")
+        else:
+            origin[token_row[tok]] = special
+
+    parsed = ParsedAncestorLists(ancestor_id, offsets, values, origin)
+    return parsed if strict else (parsed, malformed)
+
+
+def _unbalanced_rows(buf, row_end, num_rows):
+    # Rows of a joined ancestor_list buffer with unbalanced quotes, more than
+    # one pair of brackets, or a bracket left open or closed before opening
+    byte_row = np.cumsum(row_end) - row_end
+
+    def positions(char):
+        return np.flatnonzero(buf == ord(char))
+
+    def per_row(pos):
+        return np.bincount(byte_row[pos], minlength=num_rows)
+
+    opens, closes = positions("["), positions("]")
+    num_opens, num_closes = per_row(opens), per_row(closes)
+    unbalanced = (num_opens != num_closes) | (num_opens > 1) | \
+        (per_row(positions("'")) % 2 == 1) | (per_row(positions('"')) % 2 == 1)
+    open_pos = np.full(num_rows, -1, dtype=np.int64)
+    close_pos = np.full(num_rows, -1, dtype=np.int64)
+    open_pos[byte_row[opens]] = opens
+    close_pos[byte_row[closes]] = closes
+    return unbalanced | (close_pos < open_pos)
+
+
+def _literal_ancestor_list(ancestor_list):
+    ancestor_list = ancestor_list.strip()
+    if ancestor_list.lower() == "[none]":
+        ancestor_list = "[None]"
+    return ast.literal_eval(ancestor_list)
+
+
+def _usecols(columns):
+    # Column filter for read_csv that always keeps id and ancestor_list
+    # (column names in files may be padded with spaces)
+    if columns is None:
+        return None
+    keep = {"id", "ancestor_list", *columns}
+    return lambda col: col.replace(' ', '') in keep
+
+
+def _check_columns_present(data, columns):
+    missing = [col for col in columns or [] if col not in data.columns]
+    if missing:
+        raise Exception(f"column(s) not in file: {missing}")
+
+
+def _project_columns(data, columns):
+    _check_columns_present(data, columns)
+    keep = {"id", "ancestor_list", *columns}
+    return data[[col for col in data.columns if col in keep]]
+
+
+def _compact_dtypes(data):
+    for col in data.columns:
+        if col not in ("id", "ancestor_list"):
+            data[col] = _compact_column(data[col])
+
+
+def _read_phylogeny_csv(filename, ancestor_lists=False, columns=None,
+                        compact_dtypes=False, cache=False):
+    # Returns the dataframe, its parsed ancestor lists and, with cache=True,
+    # the open cache (None if it could not be written), for the caller to
+    # read lazy columns from or close
+    cached = _open_cache(filename) if cache else None
+    if cached is not None:
+        data = cached.dataframe(columns)
+        parsed = ParsedAncestorLists(*cached.parsed())
+        _check_columns_present(data, columns)
+    else:
+        # Caches always hold every column
+        data = pd.read_csv(filename,
+                           usecols=_usecols(None if cache else columns),
+                           compression=_compression(filename))
+        data.columns = data.columns.str.replace(' ', '')
+        parsed = parse_ancestor_lists(data["ancestor_list"])
+        data.set_index("id", inplace=True)
+        if cache:
+            try:
+                _write_cache(filename, data, parsed)
+                cached = _PhylogenyCache(phylogeny_cache_path(filename))
+            except OSError:
+                # E.g., a read-only data directory: load without a cache
+                cached = None
+            if columns is not None:
+                data = _project_columns(data, columns)
+        _check_columns_present(data, columns)
+
+    if compact_dtypes:
+        _compact_dtypes(data)
+    data["ancestor_id"] = parsed.ancestor_id
+    if ancestor_lists:
+        # Legacy representation: a python list of strings per taxon
+        data["ancestor_list"] = \
+            data["ancestor_list"].apply(_literal_ancestor_list)
+    return data, parsed, cached
+
+
+def _lazy_columns(filename, num_rows, compact_dtypes=False, cached=None):
+    # Columns of a csv file (or of its open cache) read on first access
+    if cached is not None:
+        return LazyColumns(CachedColumnStore(filename, compact_dtypes,
+                                             cached))
+    return LazyColumns(CsvColumnStore(filename, num_rows, compact_dtypes))
+
+
+def _read_phylogeny_csv_columns(filename, columns=None, compact_dtypes=False,
+                                cache=False):
+    # The dataframe and parsed ancestor lists of a csv file, with lazy
+    # columns for the attributes not in columns (None if columns is None)
+    data, parsed, cached = _read_phylogeny_csv(
+        filename, columns=columns, compact_dtypes=compact_dtypes, cache=cache)
+    lazy_columns = None
+    if columns is not None:
+        lazy_columns = _lazy_columns(filename, len(data), compact_dtypes,
+                                     cached)
+    elif cached is not None:
+        cached.npz.close()
+    return data, parsed, lazy_columns
+
+
+def rebuild_phylogeny_cache(filename):
+    """(Re)build the binary cache of a phylogeny file in standards format
+    (csv), even if it already has a valid one.
+
+    Args:
+        filename (str): path to phylogeny file
+
+    Returns:
+        Path of the cache file.
+    """
+    clear_phylogeny_cache(filename)
+    data, parsed = _read_phylogeny_csv(filename)[:2]
+    _write_cache(filename, data, parsed)
+    return phylogeny_cache_path(filename)
+
+
+def _iter_phylogeny_csv_chunks(filename, chunksize, columns=None,
+                               strict=True):
+    # Compressed files are decompressed as they are read. Yields each chunk
+    # with its parsed ancestor lists and, with strict=False, its malformed
+    # rows (None otherwise; see parse_ancestor_lists)
+    for data in pd.read_csv(filename, chunksize=chunksize,
+                            usecols=_usecols(columns),
+                            compression=_compression(filename)):
+        data.columns = data.columns.str.replace(' ', '')
+        _check_columns_present(data, columns)
+        if strict:
+            parsed = parse_ancestor_lists(data["ancestor_list"])
+            malformed = None
+        else:
+            parsed, malformed = parse_ancestor_lists(data["ancestor_list"],
+                                                     strict=False)
+        data["ancestor_id"] = parsed.ancestor_id
+        data.set_index("id", inplace=True)
+        yield data, parsed, malformed
+
+
+def iter_phylogeny_chunks(filename, chunksize=100000, columns=None):
+    """Reads a phylogeny in standards format (csv) chunksize rows at a time,
+    so files larger than memory can be processed. Compressed files (.gz,
+    .bz2 or .xz) are decompressed as they are read.
+
+    Args:
+        filename (str): path to phylogeny file
+        chunksize (int): number of rows per chunk
+        columns (list): attribute columns to read (id and ancestor_list are
+            always read). By default, all columns are read.
+
+    Yields:
+        pandas.DataFrame of up to chunksize rows, in the same form as produced
+        by load_phylogeny_to_pandas_df.
+    """
+    for data, _, _ in _iter_phylogeny_csv_chunks(filename, chunksize,
+                                                 columns):
+        yield data
+
+
+def load_phylogeny_to_pandas_df(filename, ancestor_lists=False, columns=None,
+                                compact_dtypes=False, cache=False):
+    """Loads a phylogeny in standards format (csv, optionally compressed with
+    gzip, bz2 or xz) into a pandas dataframe indexed by taxon id.
+
+    The ancestor_list column is parsed in a single vectorized pass and an
+    int64 "ancestor_id" column is added holding each taxon's (first) ancestor,
+    or -1 for roots. Use parse_ancestor_lists on the "ancestor_list" column to
+    get the full CSR representation for multi-parent (sexual) phylogenies.
+
+    Args:
+        filename (str): path to phylogeny file
+        ancestor_lists (bool): if True, also convert the "ancestor_list"
+            column into python lists (slow on large files). Otherwise the
+            column is left as the strings found in the file.
+        columns (list): attribute columns to read (id and ancestor_list are
+            always read). Other columns are never parsed. By default, all
+            columns are read.
+        compact_dtypes (bool): if True, store integer columns as int32 (when
+            their values fit), float columns as float32 and text columns with
+            many repeated values as categoricals, instead of pandas' default
+            64-bit/object dtypes.
+        cache (bool): if True, read the file from its binary cache (see
+            phylogeny_cache_path), writing the cache first if it is missing or
+            out of date. The cache is considered valid while the file's size
+            and modification time (or else its content hash) are unchanged.
+
+    Returns:
+        pandas.DataFrame
+    """
+    data, _, cached = _read_phylogeny_csv(filename, ancestor_lists, columns,
+                                          compact_dtypes, cache)
+    if cached is not None:
+        cached.npz.close()
     return data
 
 
-def load_phylogeny_to_networkx(filename):
+def load_phylogeny_to_networkx(filename, columns=None, compact_dtypes=False,
+                               cache=False):
     """
     Loads a phylogeny in standards format (in csv or json) from the file
     specified by the filename parameter. Returns the phylogeny as a
@@ -28,11 +416,38 @@ def load_phylogeny_to_networkx(filename):
     Special ancestor values are encoded in an "origin" field within nodes.
     Example: `my_phylogeny.nodes["A"]["origin"]` would return the origin of
     node "A"
+
+    Files compressed with gzip, bz2 or xz (e.g., "phylogeny.csv.gz") are
+    decompressed as they are read.
+
+    If columns is given, only those attribute columns are read up front. For
+    csv files, the remaining columns are still available as node attributes:
+    each one is read from the file the first time any node's value for it is
+    accessed. For json files, the remaining columns are dropped.
+
+    Args:
+        filename (str): path to phylogeny file
+        columns (list): attribute columns to read up front
+        compact_dtypes (bool): use compact dtypes for attribute columns (see
+            load_phylogeny_to_pandas_df)
+        cache (bool): use the binary cache of csv files (see
+            load_phylogeny_to_pandas_df)
     """
-    if filename.endswith(".csv"):  # Handle CSV files
-        data = load_phylogeny_to_pandas_df(filename)
-    elif filename.endswith(".json"):  # Handle JSON files
-        data = pd.read_json(filename, orient="index", convert_dates=False)
+    if _file_format(filename) == "csv":  # Handle CSV files
+        data, parsed, lazy_columns = _read_phylogeny_csv_columns(
+            filename, columns, compact_dtypes, cache)
+        if lazy_columns is not None:
+            for col in columns:
+                del lazy_columns[col]
+        return _pandas_df_to_networkx(data, parsed, lazy_columns)
+    else:  # Handle JSON files
+        data = pd.read_json(filename, orient="index", convert_dates=False,
+                            precise_float=True,
+                            compression=_compression(filename))
+        if columns is not None:
+            data = _project_columns(data, columns)
+        if compact_dtypes:
+            _compact_dtypes(data)
 
     return pandas_df_to_networkx(data)
 
@@ -44,54 +459,276 @@ def pandas_df_to_networkx(data):
 
     NOTE: Assumes that the pandas dataframe (data) is of the form produced by 
     load_phylogeny_to_pandas_df. If this assumption is not true, may produce
-    invalid trees.
+    invalid trees. Taxon ids are taken from the "id" column if there is one,
+    and from the index otherwise.
+
+    Raises:
+        Exception: if any ancestors are not in the dataframe (all missing
+        ancestor ids are listed in the message).
     """
+    return _pandas_df_to_networkx(
+        data, parse_ancestor_lists(data["ancestor_list"]))
+
+
+def _check_ancestors_present(parsed, taxon_ids):
+    missing = np.setdiff1d(parsed.values, taxon_ids)
+    if len(missing):
+        num_taxa = np.isin(parsed.values, missing).sum()
+        raise Exception(f"{len(missing)} ancestor(s) of {num_taxa} taxa are "
+                        f"not in file: {missing.tolist()}")
+
+
+def _ancestor_list_values(ancestor_lists, parsed):
+    # Python lists of ancestor id strings (e.g., ['0', '100']) from parsed
+    # ancestor lists, as load_phylogeny_to_pandas_df(..., ancestor_lists=True)
+    # would give. Rows with special values are evaluated one by one.
+    ids = list(map(str, parsed.values.tolist()))
+    offsets = parsed.offsets.tolist()
+    lists = [ids[start:stop] for start, stop in zip(offsets, offsets[1:])]
+    for row in np.flatnonzero(pd.notna(parsed.origin)):
+        try:
+            lists[row] = _literal_ancestor_list(ancestor_lists[row])
+        except (ValueError, SyntaxError):
+            lists[row] = lists[row] + [parsed.origin[row]]
+    return lists
+
+
+class _LazyNodeAttributes(dict):
+    # Node attribute dict that reads values missing from it from lazy
+    # columns, the first time they are accessed. Iterating over it loads
+    # everything, so copies of nodes get every attribute.
+    __slots__ = ("columns", "row")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.columns = None
+        self.row = None
+
+    def __missing__(self, key):
+        if self.columns is None or key not in self.columns:
+            raise KeyError(key)
+        value = self.columns.value(key, self.row)
+        if isinstance(value, np.generic):
+            value = value.item()
+        self[key] = value
+        return value
+
+    def _load_all(self):
+        if self.columns is not None:
+            for key in self.columns:
+                if not dict.__contains__(self, key):
+                    self.__missing__(key)
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or \
+            (self.columns is not None and key in self.columns)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __iter__(self):
+        self._load_all()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self._load_all()
+        return dict.__len__(self)
+
+    def keys(self):
+        self._load_all()
+        return dict.keys(self)
+
+    def values(self):
+        self._load_all()
+        return dict.values(self)
+
+    def items(self):
+        self._load_all()
+        return dict.items(self)
+
+    def __eq__(self, other):
+        self._load_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        self._load_all()
+        return dict.__ne__(self, other)
+
+    def copy(self):
+        self._load_all()
+        return dict(dict.items(self))
+
+    def __repr__(self):
+        self._load_all()
+        return dict.__repr__(self)
+
+
+class _LazyAttributeDiGraph(nx.DiGraph):
+    node_attr_dict_factory = _LazyNodeAttributes
+
+
+def _pandas_df_to_networkx(data, parsed, lazy_columns=None):
+    if "id" in data.columns:
+        taxon_ids = data["id"].to_numpy()
+        data = data.drop(columns="id")
+    else:
+        taxon_ids = data.index.to_numpy()
+
+    # Ancestors are looked up against every id in the file, so order in file
+    # is not required/guaranteed
+    _check_ancestors_present(parsed, taxon_ids)
+
+    # ancestor_id is internal to the loader; nodes get ancestor lists as
+    # lists, as they are in files (not as the raw strings)
+    data = data.drop(columns="ancestor_id", errors="ignore")
+    if "ancestor_list" in data.columns and len(data) and \
+            isinstance(data["ancestor_list"].iat[0], str):
+        data = data.assign(ancestor_list=_ancestor_list_values(
+            data["ancestor_list"].to_numpy(), parsed))
+
+    # Build every node's attribute dict from column arrays in one pass
+    columns = list(data.columns)
+    attributes = [dict(zip(columns, row))
+                  for row in zip(*(data[col].tolist() for col in columns))]
+    if not columns:
+        attributes = [{} for _ in taxon_ids]
+    for row in np.flatnonzero(pd.notna(parsed.origin)):
+        attributes[row]["origin"] = parsed.origin[row]
 
     # A phylogeny is a directed graph
-    phylogeny = nx.DiGraph()
-
-    # Have to do this in two passes, (one to add nodes, one to
-    # add edges) because order in file is not required/guaranteed
-
-    # Add nodes
-    for taxon_id in data.index:
-        phylogeny.add_node(taxon_id)
-        for col in data:
-            if col == "id":
-                continue
-            phylogeny.nodes[taxon_id][col] = data.loc[taxon_id, col]
-
-    # Add edges
-    for taxon_id in data.index:
-
-        for ancestor in data.loc[taxon_id, "ancestor_list"]:
-            try:  # Conversion to int will fail if its a special value
-                ancestor = int(ancestor)
-                if phylogeny.has_node(ancestor):
-                    phylogeny.add_edge(ancestor, taxon_id)
-                else:
-                    raise Exception(
-                        f"{taxon_id}'s ancestor, {ancestor}, is not in file.")
-
-            except (ValueError, TypeError):  # Handle special values
-                phylogeny.nodes[taxon_id]["origin"] = ancestor
+    phylogeny = nx.DiGraph() if lazy_columns is None \
+        else _LazyAttributeDiGraph()
+    phylogeny.add_nodes_from(zip(taxon_ids.tolist(), attributes))
+    if lazy_columns is not None:
+        for row, node in enumerate(phylogeny.nodes.values()):
+            node.columns = lazy_columns
+            node.row = row
+    children = np.repeat(taxon_ids, np.diff(parsed.offsets))
+    phylogeny.add_edges_from(zip(parsed.values.tolist(), children.tolist()))
 
     return phylogeny
 
 
-def networkx_to_pandas_df(g, bonus_cols=None):
+# Node attributes that describe the structure rather than the taxon; they
+# are derived from the graph when writing ancestor lists
+_STRUCTURE_ATTRIBUTES = ("id", "ancestor_list", "ancestor_id", "origin")
+
+
+def _networkx_attribute_names(g):
+    # Union of all node attribute names, in order of first appearance
+    names = {}
+    for _, attrs in g.nodes(data=True):
+        names.update(dict.fromkeys(attrs))
+    return [name for name in names if name not in _STRUCTURE_ATTRIBUTES]
+
+
+def networkx_to_pandas_df(g, bonus_cols=None, all_attributes=False):
+    """
+    Converts a networkx phylogeny to a pandas dataframe with an id column and
+    an ancestor_list column (a list of ancestor ids per taxon, or [None] for
+    roots).
+
+    Args:
+        g (networkx.DiGraph): graph object that describes a phylogeny
+        bonus_cols (dict): extra columns to add, as a dictionary of column
+            name to node attribute name
+        all_attributes (bool): if True, also add a column for every node
+            attribute (missing values are filled in by pandas)
+
+    Returns:
+        pandas.DataFrame
+    """
     if bonus_cols is None:
         bonus_cols = {}
     df = pd.DataFrame()
-    df["id"] = g.nodes.keys()
-    df["ancestor_list"] = [list(g.predecessors(i)) if
-                           len(list(g.predecessors(i))) > 0
-                           else [None] for i in df["id"]]
-
-    # roots = df[df["ancestor_list"].apply(lambda x: len(x) == 0)].index
-    # df.loc[roots, "ancestor_list"] = "[None]"
+    df["id"] = list(g.nodes)
+    df["ancestor_list"] = [list(g.pred[i]) or [None] for i in g.nodes]
 
+    if all_attributes:
+        for name in _networkx_attribute_names(g):
+            df[name] = [attrs.get(name) for _, attrs in g.nodes(data=True)]
     for name1, name2 in bonus_cols.items():
         df[name1] = [g.nodes[i][name2] for i in df["id"]]
 
     return df
+
+
+def _format_ancestor_lists(offsets, values, origin, file_format):
+    # Standard-format ancestor lists from CSR ancestor ids: strings like
+    # "[1,2]" (or "[none]" for roots) for csv files, and lists like [1, 2]
+    # (or ["none"]) for json. Roots are written with their origin, if any.
+    offsets = np.asarray(offsets).tolist()
+    values = np.asarray(values).tolist()
+    if file_format == "csv":
+        values = list(map(str, values))
+    formatted = []
+    for row, special in enumerate(origin):
+        start, stop = offsets[row], offsets[row + 1]
+        if start == stop:
+            special = special if isinstance(special, str) else "none"
+            formatted.append([special] if file_format == "json"
+                             else f"[{special}]")
+        elif file_format == "json":
+            formatted.append(values[start:stop])
+        elif stop == start + 1:
+            formatted.append("[" + values[start] + "]")
+        else:
+            formatted.append("[" + ",".join(values[start:stop]) + "]")
+    return formatted
+
+
+def _write_phylogeny_chunks(filename, chunks):
+    # Writes dataframes with an id column, a formatted ancestor_list column
+    # and attribute columns to a (possibly compressed) csv or json file
+    file_format = _file_format(filename)
+    with open_phylogeny_file(filename, "wt") as out:
+        first = True
+        if file_format == "json":
+            out.write("{")
+        for chunk in chunks:
+            if file_format == "json":
+                body = chunk.set_index("id").to_json(
+                    orient="index", double_precision=15)[1:-1]
+                if body:
+                    out.write(body if first else "," + body)
+                    first = False
+            else:
+                chunk.to_csv(out, index=False, header=first)
+                first = False
+        if file_format == "json":
+            out.write("}")
+
+
+def _pandas_df_chunks(data, file_format, chunksize):
+    if "id" not in data.columns:
+        data = data.rename_axis("id").reset_index()
+    data = data.drop(columns="ancestor_id", errors="ignore")
+    for start in range(0, max(len(data), 1), chunksize):
+        chunk = data.iloc[start:start + chunksize].copy()
+        parsed = parse_ancestor_lists(chunk["ancestor_list"])
+        chunk["ancestor_list"] = _format_ancestor_lists(
+            parsed.offsets, parsed.values, parsed.origin, file_format)
+        yield chunk
+
+
+def save_phylogeny_pandas_df(data, filename, chunksize=100000):
+    """Writes a phylogeny dataframe to a file in standards format, chunksize
+    rows at a time.
+
+    The format is chosen from the extension of filename: csv or json,
+    optionally compressed (as it is written) with gzip, bz2 or xz, e.g.
+    "phylogeny.csv.gz".
+
+    Args:
+        data (pandas.DataFrame): phylogeny, as produced by
+            load_phylogeny_to_pandas_df or networkx_to_pandas_df. Taxon ids
+            are taken from the "id" column if there is one, and from the
+            index otherwise. The "ancestor_id" column is not written.
+        filename (str): path of file to write
+        chunksize (int): number of rows to convert at a time
+    """
+    _write_phylogeny_chunks(filename, _pandas_df_chunks(
+        data, _file_format(filename), chunksize))
@@ -1,5 +1,28 @@
 import networkx as nx
+import numpy as np
+import pandas as pd
 from . import utils
+from .compact import CompactPhylogeny
+from .index import get_phylogeny_index
+from .lineage import LineageView
+
+
+def _lineage_values(lineage, attr):
+    # Values of an attribute along a compact lineage or lineage view, from
+    # root to tip
+    if isinstance(lineage, LineageView):
+        return lineage.attribute(attr)
+    return lineage.attributes[attr][np.argsort(lineage.depths, kind="stable")]
+
+
+def _lineage_states(lineage, attribute_list):
+    # One integer code per taxon along a compact lineage or lineage view for
+    # its state, from root to tip
+    code = np.zeros(len(lineage), dtype=np.int64)
+    for attr in attribute_list:
+        attr_code, uniques = pd.factorize(_lineage_values(lineage, attr))
+        code = pd.factorize(code * (len(uniques) + 1) + attr_code)[0]
+    return code
 
 # ===== asexual lineage metrics =====
 
@@ -15,6 +38,7 @@ def get_asexual_lineage_length(lineage):
         length (int) of given lineage
     """
     if not utils.is_asexual_lineage(lineage): raise Exception("the given lineage is not an asexual lineage")
+    if isinstance(lineage, (CompactPhylogeny, LineageView)): return len(lineage)
     return len(lineage.nodes)
 
 def get_asexual_lineage_num_discrete_state_changes(lineage, attribute_list):
@@ -34,6 +58,9 @@ def get_asexual_lineage_num_discrete_state_changes(lineage, attribute_list):
     if not utils.is_asexual_lineage(lineage): raise Exception("the given lineage is not an asexual lineage")
     # Check that all nodes have all given attributes in the attribute list
     if not utils.all_taxa_have_attributes(lineage, attribute_list): raise Exception("given attributes are not universal among all taxa along the lineage")
+    if isinstance(lineage, (CompactPhylogeny, LineageView)):
+        states = _lineage_states(lineage, attribute_list)
+        return 1 + int(np.count_nonzero(states[1:] != states[:-1]))
     # get the first state (root node)
     lineage_id = utils.get_root_ids(lineage)[0]
     num_states = 1
@@ -65,6 +92,8 @@ def get_asexual_lineage_num_discrete_unique_states(lineage, attribute_list):
     if not utils.is_asexual_lineage(lineage): raise Exception("the given lineage is not an asexual lineage")
     # Check that all nodes have all given attributes in the attribute list
     if not utils.all_taxa_have_attributes(lineage, attribute_list): raise Exception("given attributes are not universal among all taxa along the lineage")
+    if isinstance(lineage, (CompactPhylogeny, LineageView)):
+        return len(np.unique(_lineage_states(lineage, attribute_list)))
     # get the first state (root node)
     lineage_id = utils.get_root_ids(lineage)[0]
     unique_states = set()
@@ -94,6 +123,10 @@ def get_asexual_lineage_mutation_accumulation(lineage, mutation_attributes, skip
     if not utils.is_asexual_lineage(lineage): raise Exception("the given lineage is not an asexual lineage")
     # Check that all nodes have all given attributes in the attribute list
     if not utils.all_taxa_have_attributes(lineage, mutation_attributes): raise Exception("given mutation attributes are not universal among all taxa along the lineage")
+    if isinstance(lineage, (CompactPhylogeny, LineageView)):
+        start = 1 if skip_root else 0
+        return {mut_attr: _lineage_values(lineage, mut_attr)[start:].sum().item()
+                for mut_attr in mutation_attributes}
     # initialize
     mut_accumulators = {mut_attr:0 for mut_attr in mutation_attributes}
     # get the root node
@@ -119,6 +152,11 @@ def get_mrca_tree_depth_asexual(phylogeny, ids=None):
     # Get the id of the most recent common ancestor
     mrca_id = utils.get_mrca_id_asexual(phylogeny, ids)
     if mrca_id == -1: raise Exception("phylogeny has no common ancestor")
+    if isinstance(phylogeny, CompactPhylogeny):
+        return int(phylogeny.depths[phylogeny.index_of(mrca_id)])
+    index = get_phylogeny_index(phylogeny)
+    if index is not None:
+        return index.depth(mrca_id)
     # Calculate distance from root to mrca
     cur_id = mrca_id
     depth = 0
@@ -129,6 +167,83 @@ def get_mrca_tree_depth_asexual(phylogeny, ids=None):
         cur_id = ancestor_ids[0]
     return depth
 
+def get_taxa_depths(phylogeny, attribute=None):
+    """Get the tree depth (number of steps to its root, following first
+    ancestors) of every taxon in a phylogeny.
+
+    Depths come from the phylogeny's structure (for networkx phylogenies, its
+    index if it has one), where they are computed for all taxa at once and
+    kept for later depth queries.
+
+    Args:
+        phylogeny (networkx.DiGraph or CompactPhylogeny): graph object that
+            describes a phylogeny
+        attribute (str): if given, also store each taxon's depth as this
+            attribute (node attribute or attribute column)
+
+    Returns:
+        Dictionary of taxon id to depth (networkx), or int64 array of depths
+        in dense order (CompactPhylogeny).
+    """
+    structure = utils._query_structure(phylogeny)
+    depths = np.asarray(structure.depths)
+    if isinstance(phylogeny, CompactPhylogeny):
+        if attribute is not None:
+            phylogeny.attributes[attribute] = depths.copy()
+        return depths
+    depths = dict(zip(structure.ids.tolist(), depths.tolist()))
+    if attribute is not None:
+        nx.set_node_attributes(phylogeny, depths, attribute)
+    return depths
+
+def get_tree_height(phylogeny):
+    """Get the height of a phylogeny: the greatest tree depth of any of its
+    taxa (0 for a phylogeny of roots only, -1 for an empty phylogeny).
+    """
+    depths = utils._query_structure(phylogeny).depths
+    return int(depths.max()) if len(depths) else -1
+
+def get_depth_histogram(phylogeny, ids=None):
+    """Count taxa at each tree depth.
+
+    Args:
+        phylogeny (networkx.DiGraph or CompactPhylogeny): graph object that
+            describes a phylogeny
+        ids (list): taxa to count (default: all taxa)
+
+    Returns:
+        int64 array whose i-th entry is the number of taxa at depth i.
+    """
+    structure = utils._query_structure(phylogeny)
+    depths = np.asarray(structure.depths)
+    if ids is not None:
+        depths = depths[structure.index_of(np.asarray(list(ids)))]
+    return np.bincount(depths, minlength=1 if len(depths) else 0)
+
+def get_ancestor_counts(phylogeny, ids=None):
+    """Count the distinct ancestors of each of the given taxa (default: leaf
+    taxa), through any of their ancestors, so that shared ancestry in sexual
+    phylogenies is counted once.
+
+    Ancestor sets are computed together, as bitsets over the phylogeny's
+    AncestryIndex, in O((n + m) k / 64) time for k taxa and m ancestor edges.
+
+    Args:
+        phylogeny (networkx.DiGraph or CompactPhylogeny): graph object that
+            describes a phylogeny
+        ids (list): taxa to count ancestors of
+
+    Returns:
+        Dictionary of taxon id to number of ancestors (networkx), or int64
+        array of counts in the order of ids (CompactPhylogeny).
+    """
+    structure = utils._query_structure(phylogeny)
+    indices = utils._dag_query_indices(structure, ids)
+    counts = structure.ancestry_index().num_ancestors(indices)
+    if isinstance(phylogeny, CompactPhylogeny):
+        return counts
+    return dict(zip(structure.ids[indices].tolist(), counts.tolist()))
+
 # ===== phylogenetic richness =====
 
 def calc_phylogenetic_diversity_asexual(phylogeny, ids=None):
@@ -142,14 +257,35 @@ def calc_phylogenetic_diversity_asexual(phylogeny, ids=None):
     we'll get the mrca for those ids and compute the minimum spanning tree
 
     none defaults to including all leaf nodes
+
+    If the MRCA is itself one of the ids, the path from it to its root is
+    part of the canopy as well.
     """
     # if given no ids, default to leaf taxa; otherwise, validate given ids
-    if ids == None:
+    if ids is None:
         # Find MRCA on leaf nodes
         ids = utils.get_leaf_taxa_ids(phylogeny)
+    index = get_phylogeny_index(phylogeny)
+    if index is not None:
+        return calc_phylogenetic_diversity_asexual(index.structure, ids)
     # (1) get the mrca
     mrca_id = utils.get_mrca_id_asexual(phylogeny, ids)
     if mrca_id == -1: raise Exception("given ids have no common ancestor")
+    if isinstance(phylogeny, CompactPhylogeny):
+        # Climb from all ids at once, stopping at taxa already in the canopy
+        mrca = phylogeny.index_of(mrca_id)
+        given = np.unique(phylogeny.index_of(np.asarray(ids)))
+        canopy = np.zeros(len(phylogeny), dtype=bool)
+        canopy[mrca] = True
+        frontier = given
+        while len(frontier):
+            frontier = frontier[~canopy[frontier]]
+            canopy[frontier] = True
+            frontier = np.unique(phylogeny.parents[frontier])
+            frontier = frontier[frontier >= 0]
+        # A given MRCA also brings in its ancestors (see above)
+        above = phylogeny.depths[mrca] if np.isin(mrca, given) else 0
+        return int(canopy.sum() + above)
     # (2) collect paths from each id to mrca
     canopy = set([i for i in ids] + [mrca_id])
     for i in ids:
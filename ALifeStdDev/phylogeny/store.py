@@ -0,0 +1,145 @@
+import json
+import os
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from .columnstore import ColumnStore, LazyColumns
+from .compact import CompactPhylogeny
+
+# Structure arrays of a phylogeny store, each a flat int64 file
+_STRUCTURE_ARRAYS = ("ids", "ancestor_offsets", "ancestor_indices", "parents",
+                     "child_offsets", "child_indices", "depths", "root_labels")
+
+
+class _SparseOrigin:
+    # Origin array (special ancestor value of each taxon, or None) held as
+    # just the few rows that have one. Supports the indexing CompactPhylogeny
+    # needs without materializing a value per taxon.
+
+    def __init__(self, num_taxa, rows, values):
+        self.num_taxa = num_taxa
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.values = np.empty(len(values), dtype=object)
+        self.values[:] = values
+
+    def __len__(self):
+        return self.num_taxa
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            key = np.arange(self.num_taxa)[key]
+        if np.ndim(key) == 0:
+            return self[np.array([key])][0]
+        key = np.asarray(key)
+        if key.dtype == bool:
+            key = np.flatnonzero(key)
+        key = np.where(key < 0, key + self.num_taxa, key)
+        result = np.full(len(key), None, dtype=object)
+        if len(self.rows):
+            pos = np.minimum(np.searchsorted(self.rows, key),
+                             len(self.rows) - 1)
+            found = self.rows[pos] == key
+            result[found] = self.values[pos[found]]
+        return result
+
+    def __array__(self, dtype=None):
+        return self[np.arange(self.num_taxa)]
+
+
+def _array_path(directory, name):
+    return os.path.join(directory, f"{name}.bin")
+
+
+def _open_array(directory, name, length):
+    if length == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.memmap(_array_path(directory, name), dtype=np.int64, mode="r",
+                     shape=(length,))
+
+
+def write_phylogeny_store(phylogeny, directory):
+    """Write a phylogeny to an on-disk store that can be opened with
+    open_phylogeny_store.
+
+    Taxa are stored sorted by id. The store holds the id index, ancestor and
+    descendant lists, parent array, depths and roots as flat binary arrays,
+    and every attribute in a ColumnStore, so that all of them can be memory
+    mapped.
+
+    Args:
+        phylogeny (pandas.DataFrame, networkx.DiGraph or CompactPhylogeny):
+            phylogeny to write (dataframes as loaded by
+            load_phylogeny_to_pandas_df)
+        directory (str): directory to write the store to. Must not already
+            hold a store.
+    """
+    if isinstance(phylogeny, pd.DataFrame):
+        phylogeny = CompactPhylogeny.from_pandas_df(phylogeny)
+    elif isinstance(phylogeny, nx.DiGraph):
+        phylogeny = CompactPhylogeny.from_networkx(phylogeny)
+    if phylogeny._sorter is not None:
+        phylogeny = phylogeny.subset(phylogeny._sorter)
+
+    metadata_path = os.path.join(directory, "phylogeny.json")
+    if os.path.exists(metadata_path):
+        raise Exception(f"{directory} already holds a phylogeny store")
+    os.makedirs(directory, exist_ok=True)
+
+    arrays = {name: getattr(phylogeny, name) for name in _STRUCTURE_ARRAYS}
+    for name, values in arrays.items():
+        np.asarray(values, dtype=np.int64).tofile(
+            _array_path(directory, name))
+
+    store = ColumnStore(os.path.join(directory, "columns"))
+    if len(phylogeny.attributes):
+        store.append(pd.DataFrame({name: phylogeny.attributes[name]
+                                   for name in phylogeny.attributes}))
+
+    origin = np.asarray(phylogeny.origin, dtype=object)
+    origin_rows = np.flatnonzero(pd.notna(origin))
+    metadata = {"num_taxa": len(phylogeny),
+                "num_edges": len(phylogeny.ancestor_indices),
+                "asexual": phylogeny.is_asexual(),
+                "origin_rows": origin_rows.tolist(),
+                "origin_values": [str(value) for value in origin[origin_rows]]}
+    # The metadata is written last, so an interrupted write is not a store
+    with open(metadata_path, "w") as metadata_file:
+        json.dump(metadata, metadata_file)
+
+
+def open_phylogeny_store(directory):
+    """Open a phylogeny store written by write_phylogeny_store.
+
+    Nothing is read up front: every array is memory mapped (read-only), so
+    point queries such as extract_asexual_lineage or get_mrca_id_asexual on
+    a few ids only read the pages they touch, and processes opening the same
+    store share its pages through the operating system's page cache.
+    Attribute columns are mapped the first time they are accessed.
+
+    Args:
+        directory (str): directory holding the store
+
+    Returns:
+        CompactPhylogeny
+    """
+    metadata_path = os.path.join(directory, "phylogeny.json")
+    if not os.path.exists(metadata_path):
+        raise Exception(f"{directory} does not hold a phylogeny store")
+    with open(metadata_path) as metadata_file:
+        metadata = json.load(metadata_file)
+
+    num_taxa = metadata["num_taxa"]
+    lengths = {"ancestor_offsets": num_taxa + 1, "child_offsets": num_taxa + 1,
+               "ancestor_indices": metadata["num_edges"],
+               "child_indices": metadata["num_edges"]}
+    arrays = {name: _open_array(directory, name, lengths.get(name, num_taxa))
+              for name in _STRUCTURE_ARRAYS}
+    store = ColumnStore(os.path.join(directory, "columns"))
+    attributes = LazyColumns(store) if len(store) else {}
+    origin = _SparseOrigin(num_taxa, metadata["origin_rows"],
+                           metadata["origin_values"])
+    return CompactPhylogeny._from_structure(
+        attributes=attributes, origin=origin,
+        is_asexual=metadata["asexual"], **arrays)
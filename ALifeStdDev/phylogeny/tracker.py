@@ -0,0 +1,283 @@
+import numpy as np
+
+from .compact import CompactPhylogeny
+from .exporter import save_phylogeny
+from .lifespans import LifespanIndex, get_alive_mask
+
+# Per-taxon arrays of a tracker, with their dtypes
+_TRACKER_ARRAYS = (("ids", np.int64), ("parents", np.int64),
+                   ("jumps", np.int64), ("depths", np.int64),
+                   ("root_labels", np.int64), ("origin_times", float),
+                   ("destruction_times", float))
+
+
+def _time_values(times):
+    # Times as written to a phylogeny: integers if they all are
+    if np.all(np.isfinite(times)) and np.array_equal(times, np.round(times)):
+        return times.astype(np.int64)
+    return times.copy()
+
+
+class PhylogenyTracker:
+    """Asexual phylogeny built up one taxon at a time, e.g., from inside a
+    running simulation, that can be queried (extant taxa, most recent common
+    ancestors, phylogenetic diversity) and exported at any point.
+
+    Taxa are held in growable numpy arrays (capacity doubles as needed), so
+    adding or destroying a taxon takes amortized O(1) time. Depths, root
+    labels and the set of extant taxa are kept up to date as taxa are added
+    and destroyed, and every taxon gets a skew-binary jump pointer (Myers,
+    1983) when it is added, so most recent common ancestors take O(log n)
+    time without rebuilding anything.
+
+    Taxa are alive from their origin time until they are destroyed.
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        Args:
+            capacity (int): number of taxa to allocate room for up front
+        """
+        self._capacity = max(int(capacity), 1)
+        for name, dtype in _TRACKER_ARRAYS:
+            setattr(self, "_" + name, np.empty(self._capacity, dtype=dtype))
+        self._num_taxa = 0
+        self._index_of = {}
+        self._extant = set()
+        self._attributes = {}
+
+    def __repr__(self):
+        return (f"PhylogenyTracker({len(self)} taxa, "
+                f"{self.num_extant()} extant)")
+
+    def __len__(self):
+        return self._num_taxa
+
+    def __contains__(self, taxon_id):
+        return taxon_id in self._index_of
+
+    def _index(self, taxon_id):
+        if taxon_id not in self._index_of:
+            raise Exception(f"Failed to find given taxa ({taxon_id}) in "
+                            "phylogeny")
+        return self._index_of[taxon_id]
+
+    def _grow(self):
+        self._capacity *= 2
+        for name, _ in _TRACKER_ARRAYS:
+            values = getattr(self, "_" + name)
+            grown = np.empty(self._capacity, dtype=values.dtype)
+            grown[:self._num_taxa] = values[:self._num_taxa]
+            setattr(self, "_" + name, grown)
+
+    def _view(self, name):
+        # Filled part of a per-taxon array
+        return getattr(self, "_" + name)[:self._num_taxa]
+
+    # ===== updates =====
+
+    def add_taxon(self, taxon_id, parent, origin_time, **attrs):
+        """Add a taxon, alive from origin_time until destroyed.
+
+        Args:
+            taxon_id (int): id of the new taxon (must not be in use)
+            parent (int): id of the taxon's ancestor, or None for roots
+            origin_time (float): time the taxon came into existence
+            **attrs: attributes of the taxon (e.g., genotype)
+        """
+        if taxon_id in self._index_of:
+            raise Exception(f"Taxon id {taxon_id} is already in phylogeny")
+        if self._num_taxa == self._capacity:
+            self._grow()
+        index = self._num_taxa
+        if parent is None:
+            parent_index, jump, depth, root = -1, index, 0, index
+        else:
+            parent_index = self._index(parent)
+            # Jump twice as far as the parent's jump when it is as long as
+            # the jump after it, and to the parent otherwise
+            depths, jumps = self._depths, self._jumps
+            parent_jump = jumps[parent_index]
+            if depths[parent_index] - depths[parent_jump] == \
+                    depths[parent_jump] - depths[jumps[parent_jump]]:
+                jump = jumps[parent_jump]
+            else:
+                jump = parent_index
+            depth = depths[parent_index] + 1
+            root = self._root_labels[parent_index]
+
+        self._ids[index] = taxon_id
+        self._parents[index] = parent_index
+        self._jumps[index] = jump
+        self._depths[index] = depth
+        self._root_labels[index] = root
+        self._origin_times[index] = origin_time
+        self._destruction_times[index] = np.inf
+        for name, value in attrs.items():
+            if name not in self._attributes:
+                self._attributes[name] = [None] * index
+            self._attributes[name].append(value)
+        for values in self._attributes.values():
+            if len(values) == index:
+                values.append(None)
+        self._index_of[taxon_id] = index
+        self._extant.add(index)
+        self._num_taxa += 1
+
+    def destroy_taxon(self, taxon_id, time):
+        """Mark a taxon as destroyed (no longer alive) from the given time on.
+
+        Args:
+            taxon_id (int): id of the taxon to destroy
+            time (float): destruction time
+        """
+        index = self._index(taxon_id)
+        if index not in self._extant:
+            raise Exception(f"Taxon {taxon_id} has already been destroyed")
+        self._destruction_times[index] = time
+        self._extant.remove(index)
+
+    # ===== queries =====
+
+    def num_extant(self):
+        """Number of taxa that have not been destroyed."""
+        return len(self._extant)
+
+    def extant_ids(self, time="present"):
+        """Ids of the taxa alive at the given time (sorted), or of the taxa
+        that have not been destroyed for time="present" (default).
+        """
+        if isinstance(time, str) and time == "present":
+            indices = np.fromiter(self._extant, dtype=np.int64,
+                                  count=len(self._extant))
+        else:
+            indices = np.flatnonzero(get_alive_mask(
+                self._view("origin_times"), self._view("destruction_times"),
+                time))
+        return np.sort(self._ids[indices])
+
+    def parent_id(self, taxon_id):
+        """Id of the given taxon's ancestor, or None for roots."""
+        parent = self._parents[self._index(taxon_id)]
+        return None if parent < 0 else int(self._ids[parent])
+
+    def depth(self, taxon_id):
+        """Number of steps from the given taxon to its root."""
+        return int(self._depths[self._index(taxon_id)])
+
+    def root_id(self, taxon_id):
+        """Id of the root of the given taxon's tree."""
+        return int(self._ids[self._root_labels[self._index(taxon_id)]])
+
+    def _ancestor_at_depth(self, index, depth):
+        depths, jumps, parents = self._depths, self._jumps, self._parents
+        while depths[index] > depth:
+            if depths[jumps[index]] >= depth:
+                index = jumps[index]
+            else:
+                index = parents[index]
+        return index
+
+    def _mrca_index(self, first, second):
+        if self._root_labels[first] != self._root_labels[second]:
+            return -1
+        first = self._ancestor_at_depth(first, self._depths[second])
+        second = self._ancestor_at_depth(second, self._depths[first])
+        # Taxa at the same depth have jumps of the same length
+        jumps, parents = self._jumps, self._parents
+        while first != second:
+            if jumps[first] != jumps[second]:
+                first, second = jumps[first], jumps[second]
+            else:
+                first, second = parents[first], parents[second]
+        return first
+
+    def _query_indices(self, ids):
+        # Dense indices of the given ids (default: extant taxa)
+        if ids is None:
+            return sorted(self._extant)
+        return sorted({self._index(taxon_id) for taxon_id in ids})
+
+    def mrca_id(self, ids=None):
+        """Id of the most recent common ancestor of the given taxa (default:
+        extant taxa), or -1 if they do not share one (or none are given).
+        """
+        indices = self._query_indices(ids)
+        if not indices:
+            return -1
+        mrca = indices[0]
+        for index in indices[1:]:
+            mrca = self._mrca_index(mrca, index)
+            if mrca < 0:
+                return -1
+        return int(self._ids[mrca])
+
+    def phylogenetic_diversity(self, ids=None):
+        """Number of taxa in the minimum spanning tree from the most recent
+        common ancestor of the given taxa (default: extant taxa) to all of
+        them, as calc_phylogenetic_diversity_asexual (which also counts the
+        path from the most recent common ancestor to its root, if it is one
+        of the given taxa).
+        """
+        mrca_id = self.mrca_id(ids)
+        if mrca_id == -1:
+            raise Exception("given ids have no common ancestor")
+        parents = self._view("parents")
+        mrca = self._index_of[mrca_id]
+        given = np.array(self._query_indices(ids), dtype=np.int64)
+        canopy = np.zeros(len(self), dtype=bool)
+        canopy[mrca] = True
+        frontier = given
+        while len(frontier):
+            frontier = frontier[~canopy[frontier]]
+            canopy[frontier] = True
+            frontier = np.unique(parents[frontier])
+            frontier = frontier[frontier >= 0]
+        # A given MRCA also brings in its ancestors, as it does there
+        above = self._depths[mrca] if np.isin(mrca, given) else 0
+        return int(canopy.sum() + above)
+
+    def lifespan_index(self):
+        """LifespanIndex over the taxa tracked so far, for extant-taxa queries
+        at many past time points.
+        """
+        return LifespanIndex(self._view("ids"), self._view("origin_times"),
+                             self._view("destruction_times"))
+
+    # ===== export =====
+
+    def to_compact(self, not_destroyed_value="none"):
+        """Snapshot of the phylogeny tracked so far as a CompactPhylogeny,
+        with origin_time and destruction_time attributes (destruction time
+        not_destroyed_value for extant taxa) besides the taxa's own.
+
+        Returns:
+            CompactPhylogeny
+        """
+        parents = self._view("parents")
+        # Only extant taxa have an infinite destruction time
+        destruction_times = self._view("destruction_times")
+        destroyed = np.isfinite(destruction_times)
+        destruction = np.full(len(self), not_destroyed_value, dtype=object)
+        destruction[destroyed] = _time_values(destruction_times[destroyed])
+        attributes = {"origin_time": _time_values(self._view("origin_times")),
+                      "destruction_time": destruction}
+        for name, values in self._attributes.items():
+            attributes[name] = np.array(values, dtype=object) \
+                if any(value is None for value in values) else values
+        origin = np.where(parents < 0, "none", None).astype(object)
+        return CompactPhylogeny.from_parents(self._view("ids").copy(),
+                                             parents.copy(), attributes,
+                                             origin)
+
+    def to_networkx(self, not_destroyed_value="none"):
+        """Snapshot of the phylogeny tracked so far as a networkx.DiGraph (see
+        to_compact).
+        """
+        return self.to_compact(not_destroyed_value).to_networkx()
+
+    def save(self, filename, chunksize=100000):
+        """Write the phylogeny tracked so far to a file in standards format
+        (see save_phylogeny).
+        """
+        save_phylogeny(self.to_compact(), filename, chunksize=chunksize)
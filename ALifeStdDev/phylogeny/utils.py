@@ -1,4 +1,14 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
 import networkx as nx
+import numpy as np
+import pandas as pd
+
+from .compact import CompactPhylogeny, _pointer_jump
+from .index import PhylogenyIndex, get_phylogeny_index
+from .lifespans import get_alive_mask, get_lifespan_times
+from .lineage import LineageTrie, LineageView
 
 
 # ===== Verification =====
@@ -14,6 +24,10 @@ def all_taxa_have_attribute(phylogeny, attribute):
         True if all taxa (nodes) in the phylogeny have the given attribute and
         False otherwise.
     """
+    if isinstance(phylogeny, CompactPhylogeny):
+        return attribute in phylogeny.attributes
+    if isinstance(phylogeny, LineageView):
+        return phylogeny.has_attribute(attribute)
     for node in phylogeny.nodes:
         if not (attribute in phylogeny.nodes[node]):
             return False
@@ -31,6 +45,10 @@ def all_taxa_have_attributes(phylogeny, attribute_list):
         True if all taxa (nodes) in the phylogeny have the all of the given
         attributes and False otherwise.
     """
+    if isinstance(phylogeny, CompactPhylogeny):
+        return all(attr in phylogeny.attributes for attr in attribute_list)
+    if isinstance(phylogeny, LineageView):
+        return all(phylogeny.has_attribute(attr) for attr in attribute_list)
     for node in phylogeny.nodes:
         for attribute in attribute_list:
             if not (attribute in phylogeny.nodes[node]):
@@ -50,10 +68,12 @@ def is_asexual(phylogeny):
     Returns:
         True if the phylogeny is asexual and False otherwise.
     """
-    for node in phylogeny.nodes:
-        if len(list(phylogeny.predecessors(node))) > 1:
-            return False
-    return True
+    if isinstance(phylogeny, CompactPhylogeny):
+        return phylogeny.is_asexual()
+    index = get_phylogeny_index(phylogeny)
+    if index is not None:
+        return index.is_asexual()
+    return max(map(len, phylogeny._pred.values()), default=0) <= 1
 
 
 def is_asexual_lineage(phylogeny):
@@ -68,6 +88,15 @@ def is_asexual_lineage(phylogeny):
     Returns:
         True if the phylogeny is an asexual lineage and False otherwise.
     """
+    if isinstance(phylogeny, LineageView):
+        return True
+    if isinstance(phylogeny, CompactPhylogeny):
+        return (len(phylogeny.root_indices()) == 1
+                and phylogeny.is_asexual()
+                and phylogeny.num_children.max() <= 1)
+    index = get_phylogeny_index(phylogeny)
+    if index is not None:
+        return is_asexual_lineage(index.structure)
     lineage_ids = get_root_ids(phylogeny)
     # There should only be a single root if the given phylogeny is a single,
     # asexual lineage
@@ -98,6 +127,11 @@ def has_single_root(phylogeny):
     Returns:
         True if it has only a single root and False if it has mulitple roots.
     """
+    if isinstance(phylogeny, CompactPhylogeny):
+        return len(np.unique(phylogeny.component_labels())) == 1
+    index = get_phylogeny_index(phylogeny)
+    if index is not None:
+        return index.num_components() == 1
     return nx.is_weakly_connected(phylogeny)
 
 
@@ -110,6 +144,11 @@ def get_root_ids(phylogeny):
     Returns:
         For all nodes in phylogeny, return ids of nodes with no predecessors.
     """
+    if isinstance(phylogeny, CompactPhylogeny):
+        return phylogeny.ids[phylogeny.root_indices()]
+    index = get_phylogeny_index(phylogeny)
+    if index is not None:
+        return index.root_ids()
     return [node for node in phylogeny.nodes
             if len(list(phylogeny.predecessors(node))) == 0]
 
@@ -128,8 +167,9 @@ def get_roots(phylogeny):
         Each node in the returned list is a dictionary with all of the node's
         descriptors/attributes.
     """
-    roots = {node: phylogeny.nodes[node] for node in phylogeny.nodes
-             if len(list(phylogeny.predecessors(node))) == 0}
+    if isinstance(phylogeny, CompactPhylogeny):
+        return phylogeny.taxa_dict(phylogeny.root_indices())
+    roots = {node: phylogeny.nodes[node] for node in get_root_ids(phylogeny)}
     for r in roots:
         roots[r]["id"] = r
     return roots
@@ -161,24 +201,86 @@ def get_num_independent_phylogenies(phylogeny):
         Returns the number of weakly connected components (independent trees)
         in the given phylogeny.
     """
+    if isinstance(phylogeny, CompactPhylogeny):
+        return len(np.unique(phylogeny.component_labels()))
+    index = get_phylogeny_index(phylogeny)
+    if index is not None:
+        return index.num_components()
     return nx.number_weakly_connected_components(phylogeny)
 
 
-def get_independent_phylogenies(phylogeny):
+def get_component_labels(phylogeny):
+    """Label every taxon with the independently-rooted tree (weakly connected
+    component) it belongs to, in O(n) for asexual phylogenies (the label is
+    the id of the taxon's root).
+
+    For sexual phylogenies, the label is the id of a representative taxon of
+    the component.
+
+    Args:
+        phylogeny (networkx.DiGraph or CompactPhylogeny): graph object that
+            describes a phylogeny
+
+    Returns:
+        Dictionary of taxon id to label (networkx), or int64 array of labels
+        in dense order (CompactPhylogeny).
+    """
+    structure = _query_structure(phylogeny)
+    labels = structure.ids[structure.component_labels()]
+    if isinstance(phylogeny, CompactPhylogeny):
+        return labels
+    return dict(zip(structure.ids.tolist(), labels.tolist()))
+
+
+def _component_indices(structure):
+    # Dense indices of the taxa of each independent tree, largest tree first
+    labels = structure.component_labels()
+    order = np.argsort(labels, kind="stable")
+    components = np.split(order, np.flatnonzero(np.diff(labels[order])) + 1)
+    components.sort(key=len, reverse=True)
+    return [comp for comp in components if len(comp)]
+
+
+def iter_independent_phylogenies(phylogeny):
+    """Iterate over the independently-rooted trees within the given phylogeny
+    (largest first), one at a time, without copying the phylogeny.
+
+    Args:
+        phylogeny (networkx.DiGraph or CompactPhylogeny): graph object that
+            describes a phylogeny
+
+    Yields:
+        Read-only subgraph views of the given phylogeny (networkx), or
+        CompactPhylogeny subsets (made as they are reached).
+    """
+    structure = _query_structure(phylogeny)
+    for comp in _component_indices(structure):
+        if isinstance(phylogeny, CompactPhylogeny):
+            yield phylogeny.subset(comp)
+        else:
+            yield phylogeny.subgraph(structure.ids[comp].tolist())
+
+
+def get_independent_phylogenies(phylogeny, copy=True):
     """Get a list of the independently-rooted trees within the given phylogeny.
 
+    Trees are found from component labels (see get_component_labels) rather
+    than by searching the graph.
+
     Args:
         phylogeny (networkx.DiGraph): graph object that describes a phylogeny
+        copy (bool): if False, return read-only subgraph views of the given
+            phylogeny instead of copies (networkx only)
 
     Returns:
-        Returns a list of networkx.DiGraph objects.
+        Returns a list of networkx.DiGraph objects, largest first.
         Each member of the returned list is an independent (not connected)
         subgraph of the given phylogeny. The returned list of networkx.DiGraph
-        objects are copies.
+        objects are copies, unless copy is False.
     """
-    components = [c for c in sorted(nx.weakly_connected_components(phylogeny),
-                                    key=len, reverse=True)]
-    phylogenies = [phylogeny.subgraph(comp).copy() for comp in components]
+    phylogenies = list(iter_independent_phylogenies(phylogeny))
+    if copy and not isinstance(phylogeny, CompactPhylogeny):
+        phylogenies = [view.copy() for view in phylogenies]
     return phylogenies
 
 
@@ -198,8 +300,10 @@ def get_leaf_taxa(phylogeny):
         Each node in the returned list is a dictionary with all of the node's
         descriptors/attributes.
     """
-    extant = {node: phylogeny.nodes[node] for node in phylogeny.nodes
-              if len(list(phylogeny.successors(node))) == 0}
+    if isinstance(phylogeny, CompactPhylogeny):
+        return phylogeny.taxa_dict(phylogeny.leaf_indices())
+    extant = {node: phylogeny.nodes[node]
+              for node in get_leaf_taxa_ids(phylogeny)}
     for e in extant:
         extant[e]["id"] = e
     return extant
@@ -216,6 +320,11 @@ def get_leaf_taxa_ids(phylogeny):
         For all nodes in phylogeny, return ids of nodes with no successors
         (descendants).
     """
+    if isinstance(phylogeny, CompactPhylogeny):
+        return phylogeny.ids[phylogeny.leaf_indices()]
+    index = get_phylogeny_index(phylogeny)
+    if index is not None:
+        return index.leaf_ids()
     extant_ids = [node for node in phylogeny.nodes
                   if len(list(phylogeny.successors(node))) == 0]
     return extant_ids
@@ -248,20 +357,14 @@ def get_extant_taxa_ids(phylogeny, time="present", not_destroyed_value="none",
     Returns:
         List of extant taxa ids.
     """
-    # Check if all taxa have destruction time attribute
-    validate_destruction_time(phylogeny, destruction_attribute)
-
-    # Check if all taxa have origin time attribute
-    if (time != "present"):
-        validate_origin_time(phylogeny, origin_attribute)
-
-    extant_ids = [node for node in phylogeny.nodes
-                  if taxon_is_alive(phylogeny.nodes[node],
-                                    time=time,
-                                    not_destroyed_value=not_destroyed_value,
-                                    destruction_attribute=destruction_attribute,
-                                    origin_attribute=origin_attribute)]
-    return extant_ids
+    # (Raises an exception unless all taxa have destruction times, and origin
+    # times if needed)
+    alive = _alive_mask(phylogeny, time, not_destroyed_value,
+                        destruction_attribute, origin_attribute)
+    if isinstance(phylogeny, CompactPhylogeny):
+        return phylogeny.ids[alive]
+    return [node for node, is_alive in zip(phylogeny.nodes, alive)
+            if is_alive]
 
 
 def get_extant_taxa(phylogeny, time="present", not_destroyed_value="none",
@@ -294,19 +397,15 @@ def get_extant_taxa(phylogeny, time="present", not_destroyed_value="none",
         Each node in the returned list is a dictionary with all of the node's
         descriptors/attributes.
     """
-    # Check if all taxa have destruction time attribute
-    validate_destruction_time(phylogeny, destruction_attribute)
-
-    # Check if all taxa have origin time attribute
-    if (time != "present"):
-        validate_origin_time(phylogeny, origin_attribute)
-
-    extant = {node: phylogeny.nodes[node] for node in phylogeny.nodes
-              if taxon_is_alive(phylogeny.nodes[node],
-                                time=time,
-                                not_destroyed_value=not_destroyed_value,
-                                destruction_attribute=destruction_attribute,
-                                origin_attribute=origin_attribute)}
+    # (Raises an exception unless all taxa have destruction times, and origin
+    # times if needed)
+    alive = _alive_mask(phylogeny, time, not_destroyed_value,
+                        destruction_attribute, origin_attribute)
+    if isinstance(phylogeny, CompactPhylogeny):
+        return phylogeny.taxa_dict(np.flatnonzero(alive))
+
+    extant = {node: attrs for (node, attrs), is_alive
+              in zip(phylogeny.nodes(data=True), alive) if is_alive}
     for e in extant:
         extant[e]["id"] = e
     return extant
@@ -315,13 +414,22 @@ def get_extant_taxa(phylogeny, time="present", not_destroyed_value="none",
 def taxon_is_alive(node, time, not_destroyed_value="none",
                    destruction_attribute="destruction_time",
                    origin_attribute="origin_time"):
-    return (node["destruction_time"] == not_destroyed_value  # not dead yet
+    return (node[destruction_attribute] == not_destroyed_value  # not dead yet
             or (time != "present" and
                 float(node[destruction_attribute]) > time)) \
             and (time == "present" or
                  float(node[origin_attribute]) <= time)  # has been born
 
 
+def _alive_mask(phylogeny, time, not_destroyed_value, destruction_attribute,
+                origin_attribute):
+    # Vectorized taxon_is_alive over all taxa (in dense or node order)
+    origin, destruction = get_lifespan_times(
+        phylogeny, not_destroyed_value, destruction_attribute,
+        None if time == "present" else origin_attribute)
+    return get_alive_mask(origin, destruction, time)
+
+
 def validate_destruction_time(phylogeny, attribute="destruction_time"):
     if (not all_taxa_have_attribute(phylogeny, attribute)):
         raise Exception(f"Not all taxa have '{attribute}' data")
@@ -334,7 +442,7 @@ def validate_origin_time(phylogeny, attribute="origin_time"):
 
 # ===== lineages-specific utilities =====
 
-def extract_asexual_lineage(phylogeny, taxa_id):
+def extract_asexual_lineage(phylogeny, taxa_id, view=False):
     """Given a phylogeny, extract the ancestral lineage of the taxa specified by
     taxa_id. Only works for asexual phylogenies.
 
@@ -342,11 +450,21 @@ def extract_asexual_lineage(phylogeny, taxa_id):
         phylogeny (networkx.DiGraph): graph object that describes a phylogeny
         taxa_id (int): id of taxa to extract an ancestral lineage for (must be
             a valid node id in the given phylogeny).
+        view (bool): if True, return a read-only LineageView of the lineage
+            instead of copying it out of the phylogeny
 
     Returns:
         networkx.DiGraph that contains the ancestral lineage of the specified
-        taxa.
+        taxa (or LineageView, if view is True).
     """
+    if view:
+        return LineageView(phylogeny, np.asarray(
+            extract_asexual_lineage_ids(phylogeny, taxa_id))[::-1])
+    if isinstance(phylogeny, CompactPhylogeny):
+        if not phylogeny.is_asexual():
+            raise Exception("Given phylogeny is not asexual")
+        return phylogeny.subset(
+            phylogeny.lineage_indices(phylogeny.index_of(taxa_id))[::-1])
     return phylogeny.subgraph(extract_asexual_lineage_ids(phylogeny,
                                                           taxa_id)).copy()
 
@@ -363,12 +481,24 @@ def extract_asexual_lineage_ids(phylogeny, taxa_id):
     Returns:
         List of ids along specified taxa's lineage.
     """
+    if isinstance(phylogeny, CompactPhylogeny):
+        index = phylogeny.index_of(taxa_id)
+        if not phylogeny.is_asexual():
+            raise Exception("Given phylogeny is not asexual")
+        return phylogeny.ids[phylogeny.lineage_indices(index)]
     # Make sure taxa id is in the phylogeny
     if taxa_id not in phylogeny.nodes:
         raise Exception(f"Failed to find given taxa ({taxa_id}) in phylogeny")
     if not is_asexual(phylogeny):
         raise Exception("Given phylogeny is not asexual")
-    # Get taxa ids on lineage
+    index = get_phylogeny_index(phylogeny)
+    if index is not None:
+        return index.lineage_ids(taxa_id)
+    return _asexual_lineage_ids(phylogeny, taxa_id)
+
+
+def _asexual_lineage_ids(phylogeny, taxa_id):
+    # Lineage of taxa_id in a networkx phylogeny already known to be asexual
     ids_on_lineage = [taxa_id]
     while True:
         ancestor_ids = list(phylogeny.predecessors(ids_on_lineage[-1]))
@@ -415,6 +545,12 @@ def abstract_asexual_lineage(lineage, attribute_list,
     track_origin = all_taxa_have_attribute(lineage, origin_time_attr)
     track_destruction = all_taxa_have_attribute(lineage, destruction_time_attr)
 
+    if isinstance(lineage, CompactPhylogeny):
+        return _compact_abstract(lineage, attribute_list,
+                                 origin_time_attr if track_origin else None,
+                                 destruction_time_attr if track_destruction
+                                 else None, lineage_mode=True)
+
     abstract_lineage = nx.DiGraph()  # Empty graph to hold abstract lineage.
 
     # Start with the root node (to qualify as a lineage, graph must only have
@@ -481,7 +617,10 @@ def abstract_asexual_phylogeny(phylogeny, attribute_list,
                              destruction_time_attr="destruction_time"):
     """Given an asexual phylogeny, abstract as sequence of states where state-ness
     is described by attributes. I.e., compress the phylogeny into a sequence of
-    states.
+    states. Each independent tree of a forest is abstracted separately.
+
+    States are found with vectorized operations over the whole phylogeny
+    rather than by walking it node by node (see _abstract_states).
 
     Args:
         phylogeny (networkx.DiGraph): an asexual phylogeny
@@ -493,7 +632,8 @@ def abstract_asexual_phylogeny(phylogeny, attribute_list,
 
     Returns:
         networkx.DiGraph objects that describes an abstracted version of the
-        given phylogeny.
+        given phylogeny. States are numbered in tree order; each state's
+        "members" attribute is an int64 array of the ids of its taxa.
     """
     # Check that phylogeny is an asexual phylogeny.
     if not is_asexual(phylogeny):
@@ -513,95 +653,151 @@ def abstract_asexual_phylogeny(phylogeny, attribute_list,
     track_origin = all_taxa_have_attribute(phylogeny, origin_time_attr)
     track_destruction = all_taxa_have_attribute(phylogeny, destruction_time_attr)
 
-    abstract_phylogeny = nx.DiGraph()  # Empty graph to hold abstract phylogeny.
-
-    # Start with the root nodes
-    # TODO: Make work for forests (multiple roots)
-    to_process = []
-    root_ids = get_root_ids(phylogeny)
-    state_id = 0
-    next_id = 1
-    # Add the first phylogeny state to the abstract phylogeny
-    for root_id in root_ids:
-        abstract_phylogeny.add_node(state_id)
-        abstract_phylogeny.nodes[state_id]["state_id"] = state_id
-        abstract_phylogeny.nodes[state_id]["node_state"] = \
-            [phylogeny.nodes[root_id][attr] for attr in attribute_list]
-        # Add attributes to state
+    if isinstance(phylogeny, CompactPhylogeny):
+        return _compact_abstract(phylogeny, attribute_list,
+                                 origin_time_attr if track_origin else None,
+                                 destruction_time_attr if track_destruction
+                                 else None, lineage_mode=False)
+
+    # States are found on the phylogeny's structure (see _compact_abstract),
+    # then copied into an abstract networkx phylogeny
+    structure = _query_structure(phylogeny)
+    node_attrs = [attrs for _, attrs in phylogeny.nodes(data=True)]
+    heads, state_parents, member_order, bounds = _abstract_states(
+        structure, [[attrs[attr] for attrs in node_attrs]
+                    for attr in attribute_list])
+    num_states = len(heads)
+    if track_destruction:
+        # Latest destruction time among members ("none"/inf become -1)
+        _, destruction = get_lifespan_times(
+            phylogeny, destruction_attribute=destruction_time_attr,
+            origin_attribute=None)
+        destruction[np.isinf(destruction)] = -1
+        latest = np.full(num_states, -np.inf)
+        np.maximum.at(latest, np.repeat(np.arange(num_states),
+                                        np.diff(bounds, prepend=0)),
+                      destruction[member_order])
+        latest = latest.tolist()
+    # Member ids of each state, as views into one array
+    member_ids = structure.ids[member_order]
+    starts = np.concatenate(([0], bounds[:-1])).tolist()
+
+    states = []
+    for state_id, (head, start, end) in enumerate(zip(
+            heads.tolist(), starts, bounds.tolist())):
+        head_attrs = node_attrs[head]
+        state = {"state_id": state_id,
+                 "node_state": [head_attrs[attr] for attr in attribute_list]}
         for attr in attribute_list:
-            abstract_phylogeny.nodes[state_id][attr] = phylogeny.nodes[root_id][attr]
+            state[attr] = head_attrs[attr]
         if track_origin:
-            abstract_phylogeny.nodes[state_id]["origin_time"] = \
-                phylogeny.nodes[root_id][origin_time_attr]
-        if track_destruction:  # (this might get updated as we go)
-            dest_time = phylogeny.nodes[root_id][destruction_time_attr]
-            if dest_time == "none" or float(dest_time) == float("inf"):
-                dest_time = -1
-            dest_time = float(dest_time)
-            abstract_phylogeny.nodes[state_id]["destruction_time"] = dest_time
-
-        # Add first member
-        abstract_phylogeny.nodes[state_id]["members"] = {root_id:
-                                                    phylogeny.nodes[root_id]}
-
-        to_process.append((root_id, state_id))
-        state_id = next_id
-        next_id += 1
-
-    while to_process:
-        phylogeny_id, state_id = to_process.pop()
-
-        successor_ids = list(phylogeny.successors(phylogeny_id))
-        if len(successor_ids) == 0:
-            continue  # We've hit a leaf node!
-        for id in successor_ids:
-            # Is this a new state or a member of the current state?
-            state = [phylogeny.nodes[id][attr] for attr in attribute_list]
-            if abstract_phylogeny.nodes[state_id]["node_state"] == state:
-                next_state_id = state_id
-                # Add this taxa as member of current state
-                # - update time of destruction etc
-                abstract_phylogeny.nodes[state_id]["members"][id] = \
-                    phylogeny.nodes[id]
-                if track_destruction:
-                    dest_time = phylogeny.nodes[id][destruction_time_attr]
-                    if dest_time == "none" or float(dest_time) == float("inf"):
-                        dest_time = -1
-                    dest_time = float(dest_time)
-                    dest_time = max(dest_time, abstract_phylogeny.nodes[state_id]["destruction_time"])
-                    abstract_phylogeny.nodes[state_id]["destruction_time"] = dest_time
-            else:
-                # Add new state
-                next_state_id = next_id
-                next_id += 1
-                abstract_phylogeny.add_node(next_state_id)
-                abstract_phylogeny.add_edge(state_id, next_state_id)
-                # Document state information
-                abstract_phylogeny.nodes[next_state_id]["state_id"] = next_state_id
-                abstract_phylogeny.nodes[next_state_id]["node_state"] = \
-                    [phylogeny.nodes[id][attr] for attr in attribute_list]
-                if track_origin:
-                    abstract_phylogeny.nodes[next_state_id]["origin_time"] = \
-                        phylogeny.nodes[id][origin_time_attr]
-
-                if track_destruction:
-                    dest_time = phylogeny.nodes[id][destruction_time_attr]
-                    if dest_time == "none" or float(dest_time) == float("inf"):
-                        dest_time = -1
-                    dest_time = float(dest_time)                    
-                    abstract_phylogeny.nodes[next_state_id]["destruction_time"] = dest_time
-
-                for attr in attribute_list:
-                    abstract_phylogeny.nodes[next_state_id][attr] = \
-                        phylogeny.nodes[id][attr]
-                # Add first member
-                abstract_phylogeny.nodes[next_state_id]["members"] = \
-                    {id: phylogeny.nodes[id]}
-            to_process.append((id, next_state_id))
+            state["origin_time"] = head_attrs[origin_time_attr]
+        if track_destruction:
+            state["destruction_time"] = latest[state_id]
+        state["members"] = member_ids[start:end]
+        states.append((state_id, state))
 
+    abstract_phylogeny = nx.DiGraph()  # Empty graph to hold abstract phylogeny.
+    abstract_phylogeny.add_nodes_from(states)
+    has_parent = np.flatnonzero(state_parents >= 0)
+    abstract_phylogeny.add_edges_from(zip(state_parents[has_parent].tolist(),
+                                          has_parent.tolist()))
     return abstract_phylogeny
 
 
+def _abstract_states(structure, attribute_values):
+    """Group the taxa of an asexual phylogeny's structure (CompactPhylogeny)
+    into states, in O(n log n).
+
+    Taxa are grouped into a state with their parent whenever they share the
+    parent's attribute values (attribute_values holds one sequence of values
+    per attribute, in dense order). States are numbered in tree order
+    (shallowest head first), so every state comes after its parent state.
+
+    Returns:
+        Tuple of the dense index of each state's first taxon (head), each
+        state's parent state (-1 for roots), the dense indices of all taxa
+        grouped by state (from the head down) and the end offset of each
+        state's group.
+    """
+    num_taxa = len(structure)
+    parents, depths = structure.parents, structure.depths
+
+    # Encode each taxon's state (tuple of attribute values) as an integer
+    code = np.zeros(num_taxa, dtype=np.int64)
+    for values in attribute_values:
+        attr_code, uniques = pd.factorize(values)
+        code = pd.factorize(code * (len(uniques) + 1) + attr_code)[0]
+
+    # A taxon starts a new state unless it matches its parent; everyone else
+    # points at the head of their state (found by pointer jumping)
+    has_parent = parents >= 0
+    new_state = ~has_parent
+    new_state[has_parent] = code[has_parent] != code[parents[has_parent]]
+    head = np.where(new_state, np.arange(num_taxa), parents)
+    while True:
+        next_head = head[head]
+        if np.array_equal(next_head, head):
+            break
+        head = next_head
+
+    heads = np.flatnonzero(new_state)
+    heads = heads[np.argsort(depths[heads], kind="stable")]
+    state_of_head = np.full(num_taxa, -1, dtype=np.int64)
+    state_of_head[heads] = np.arange(len(heads))
+    state = state_of_head[head]
+    head_parents = parents[heads]
+    state_parents = np.where(head_parents >= 0,
+                             state[np.maximum(head_parents, 0)], -1)
+    member_order = np.lexsort((depths, state))
+    bounds = np.cumsum(np.bincount(state, minlength=len(heads)))
+    return heads, state_parents, member_order, bounds
+
+
+def _compact_abstract(phylogeny, attribute_list, origin_time_attr,
+                      destruction_time_attr, lineage_mode):
+    """Abstract a compact asexual phylogeny into states in O(n log n).
+
+    Taxa are grouped into a state with their parent whenever they share the
+    parent's attribute values. Returns a CompactPhylogeny of states with ids
+    0 to k-1 (numbered in tree order) and a "members" attribute holding an
+    array of member taxon ids per state.
+    """
+    heads, state_parents, member_order, bounds = _abstract_states(
+        phylogeny, [phylogeny.attributes[attr] for attr in attribute_list])
+    state = np.repeat(np.arange(len(heads)), np.diff(bounds, prepend=0))
+
+    attributes = {"state_id": np.arange(len(heads))}
+    for attr in attribute_list:
+        attributes[attr] = phylogeny.attributes[attr][heads]
+    if origin_time_attr is not None:
+        attributes["origin_time"] = \
+            phylogeny.attributes[origin_time_attr][heads]
+    if destruction_time_attr is not None:
+        destruction = phylogeny.attributes[destruction_time_attr]
+        if lineage_mode:
+            # Destruction time of the last member along the lineage
+            attributes["destruction_time"] = destruction[
+                member_order[bounds - 1]] if len(heads) else destruction
+        else:
+            # Latest destruction time among members ("none"/inf become -1)
+            _, destruction = get_lifespan_times(
+                phylogeny, destruction_attribute=destruction_time_attr,
+                origin_attribute=None)
+            destruction[np.isinf(destruction)] = -1
+            latest = np.full(len(heads), -np.inf)
+            np.maximum.at(latest, state, destruction[member_order])
+            attributes["destruction_time"] = latest
+    members = np.empty(len(heads), dtype=object)
+    for i, member_ids in enumerate(np.split(phylogeny.ids[member_order],
+                                            bounds[:-1])):
+        members[i] = member_ids
+    attributes["members"] = members
+
+    return CompactPhylogeny.from_parents(np.arange(len(heads)), state_parents,
+                                         attributes)
+
+
 # ===== lod ====
 
 def extract_asexual_lod(phylogeny):
@@ -620,25 +816,103 @@ def extract_asexual_lod(phylogeny):
     if not is_asexual(phylogeny):
       raise Exception("Given phylogeny is not asexual.")
 
-    if not get_extant_taxa_ids(phylogeny):
+    extant_taxa_ids = get_extant_taxa_ids(phylogeny)
+    if not len(extant_taxa_ids):
       raise Exception("Given phylogeny has no extant taxa.")
 
-    # Get all leafs and roots
-    extant_taxa_ids = sorted(get_extant_taxa_ids(phylogeny), reverse=True)
-    root_ids = sorted(get_root_ids(phylogeny))
+    # Every taxon in an asexual phylogeny is connected to exactly one root, so
+    # the line of descent of the maximal valued extant taxon is its lineage
+    return extract_asexual_lineage(phylogeny, int(np.max(extant_taxa_ids)))
+
 
-    # Iterate through leaf/root pairs until we find a connected pair
-    for taxa_id in extant_taxa_ids:
-      for root_id in root_ids:
-        if nx.has_path(phylogeny, root_id, taxa_id):
-          return extract_asexual_lineage(phylogeny, taxa_id)
-    raise Exception("No path found.") 
+def extract_asexual_lods(phylogeny):
+    """Given an asexual phylogeny, extract the lines of descent of all extant
+    taxa at once, keeping the ancestry they share only once (as a
+    parent-pointer tree over the taxa on any line of descent).
+
+    Args:
+        phylogeny (networkx.DiGraph or CompactPhylogeny): graph object that
+            describes a phylogeny
+
+    Returns:
+        Tuple of three int64 arrays:
+        - ids of every taxon on a line of descent, shallowest first (so each
+          comes after its ancestor)
+        - position (in the first array) of each of those taxa's ancestor, -1
+          for roots
+        - position of each extant taxon, in increasing id order. The line of
+          descent of an extant taxon is found by following ancestor positions
+          from its position to a root.
+    """
+    if not is_asexual(phylogeny):
+        raise Exception("Given phylogeny is not asexual.")
+    extant_taxa_ids = np.sort(np.asarray(get_extant_taxa_ids(phylogeny),
+                                         dtype=np.int64))
+    if not len(extant_taxa_ids):
+        raise Exception("Given phylogeny has no extant taxa.")
+    trie = extract_asexual_lineages(phylogeny, extant_taxa_ids)
+    return trie.ids, trie.parents, trie.tips
+
+
+def extract_asexual_lineages(phylogeny, ids):
+    """Given an asexual phylogeny, extract the ancestral lineages of the given
+    taxa at once, into a LineageTrie that keeps the ancestry they share only
+    once (rather than copying it out of the phylogeny for each taxon).
+
+    Args:
+        phylogeny (networkx.DiGraph or CompactPhylogeny): graph object that
+            describes a phylogeny
+        ids (list): ids of the taxa to extract ancestral lineages for
+
+    Returns:
+        LineageTrie with one lineage per given id (in the given order)
+    """
+    if not is_asexual(phylogeny):
+        raise Exception("Given phylogeny is not asexual.")
+    structure = _query_structure(phylogeny)
+    members, parents, tips = _lineage_trie(
+        structure, structure.index_of(np.asarray(list(ids))))
+    return LineageTrie(phylogeny, structure.ids[members], parents, tips)
+
+
+def _lineage_mask(structure, indices):
+    # Which taxa are on the lineage of any of the given taxa (dense indices)?
+    # Lineages are marked by binary lifting: after the k-th round, every
+    # ancestor less than 2^k steps above a given taxon is marked.
+    on_lineage = np.zeros(len(structure), dtype=bool)
+    on_lineage[indices] = True
+    for up in structure.lca_index().ancestors:
+        on_lineage[up[on_lineage]] = True
+    return on_lineage
+
+
+def _lineage_trie(structure, indices):
+    # Every taxon on the lineages of the given taxa (dense indices), kept
+    # once: their dense indices (shallowest first), the position of each
+    # one's parent among them (-1 for roots) and the position of each given
+    # taxon
+    members = np.flatnonzero(_lineage_mask(structure, indices))
+    members = members[np.argsort(structure.depths[members], kind="stable")]
+    position = np.full(len(structure), -1, dtype=np.int64)
+    position[members] = np.arange(len(members))
+    member_parents = structure.parents[members]
+    parents = np.where(member_parents >= 0,
+                       position[np.maximum(member_parents, 0)], -1)
+    return members, parents, position[indices]
 
 
 def is_ancestor_asexual(phylogeny, tax1, tax2):
     """
     Is tax2 the ancestor of tax1?
     """
+    index = get_phylogeny_index(phylogeny)
+    if index is not None:
+        return is_ancestor_asexual(index.structure, tax1, tax2)
+    if isinstance(phylogeny, CompactPhylogeny):
+        if not phylogeny.is_asexual():
+            raise Exception("given phylogeny is not asexual")
+        index1, index2 = phylogeny.index_of([tax1, tax2])
+        return bool(phylogeny.lca_index().is_ancestor(index2, index1)[0])
     curr = tax1
     while True:
         parent = list(phylogeny.predecessors(curr))
@@ -653,12 +927,36 @@ def is_ancestor_asexual(phylogeny, tax1, tax2):
 
 # ===== mrca =====
 
+def _query_structure(phylogeny):
+    # CompactPhylogeny to answer structural queries on: the phylogeny itself,
+    # or the structure of a networkx phylogeny (from its index, if it has one)
+    if isinstance(phylogeny, CompactPhylogeny):
+        return phylogeny
+    index = get_phylogeny_index(phylogeny)
+    if index is None:
+        index = PhylogenyIndex(phylogeny)
+    return index.structure
+
+
+def _compact_query_indices(phylogeny, ids):
+    # Dense indices of the given ids (default: leaf taxa), without duplicates
+    if ids is None:
+        return phylogeny.leaf_indices()
+    return np.unique(phylogeny.index_of(np.asarray(list(ids))))
+
+
 def has_common_ancestor_asexual(phylogeny, ids=None):
     """Do the given set of ids share a common ancestor in the given phylogeny?
     """
     # check that phylogeny is asexual
     if not is_asexual(phylogeny):
         raise Exception("given phylogeny is not asexual")
+    if isinstance(phylogeny, CompactPhylogeny):
+        indices = _compact_query_indices(phylogeny, ids)
+        return len(np.unique(phylogeny.root_labels[indices])) == 1
+    index = get_phylogeny_index(phylogeny)
+    if index is not None:
+        return has_common_ancestor_asexual(index.structure, ids)
     # if given no ids, default to leaf taxa; otherwise, validate given ids
     if ids is None:
         # Find MRCA on leaf nodes
@@ -677,8 +975,9 @@ def has_common_ancestor_asexual(phylogeny, ids=None):
     elif len(ids) == 0:
         return False
 
-    # Get the lineages of each taxa
-    lineages = [set(extract_asexual_lineage_ids(phylogeny, i)) for i in ids]
+    # Get the lineages of each taxa (the phylogeny is already known to be
+    # asexual, so this is not checked again for every taxon)
+    lineages = [set(_asexual_lineage_ids(phylogeny, i)) for i in ids]
     common_ancestors = set.intersection(*lineages)
 
     if len(common_ancestors) > 0:
@@ -694,6 +993,12 @@ def get_mrca_id_asexual(phylogeny, ids=None):
     # check that phylogeny is asexual
     if not is_asexual(phylogeny):
         raise Exception("given phylogeny is not asexual")
+    if isinstance(phylogeny, CompactPhylogeny):
+        mrca = phylogeny.mrca_index(_compact_query_indices(phylogeny, ids))
+        return -1 if mrca < 0 else int(phylogeny.ids[mrca])
+    index = get_phylogeny_index(phylogeny)
+    if index is not None:
+        return get_mrca_id_asexual(index.structure, ids)
     # if given no ids, default to leaf taxa; otherwise, validate given ids
     if ids is None:
         # Find MRCA on leaf nodes
@@ -712,8 +1017,9 @@ def get_mrca_id_asexual(phylogeny, ids=None):
     elif len(ids) == 0:
         return -1
 
-    # Get the lineages of each taxa
-    lineages = [set(extract_asexual_lineage_ids(phylogeny, i)) for i in ids]
+    # Get the lineages of each taxa (the phylogeny is already known to be
+    # asexual, so this is not checked again for every taxon)
+    lineages = [set(_asexual_lineage_ids(phylogeny, i)) for i in ids]
     common_ancestors = set.intersection(*lineages)
 
     if len(common_ancestors) == 1:
@@ -742,6 +1048,8 @@ def get_mrca_asexual(phylogeny, ids=None):
     """
     if has_common_ancestor_asexual(phylogeny, ids):
         mrca_id = get_mrca_id_asexual(phylogeny, ids)
+        if isinstance(phylogeny, CompactPhylogeny):
+            return phylogeny.taxa_dict([phylogeny.index_of(mrca_id)])[mrca_id]
         mrca = phylogeny.nodes[mrca_id]
         mrca["id"] = mrca_id
         return mrca
@@ -749,22 +1057,369 @@ def get_mrca_asexual(phylogeny, ids=None):
         return None
 
 
+def get_mrca_ids_asexual(phylogeny, groups):
+    """Get the ids of the most recent common ancestors of many groups of taxa
+    (e.g., pairs) at once, along with their tree depths.
+
+    All groups are answered together, vectorized over the phylogeny's
+    LCAIndex, instead of validating the phylogeny and walking lineages once
+    per group.
+
+    Args:
+        phylogeny (networkx.DiGraph or CompactPhylogeny): an asexual phylogeny
+        groups (array-like): (m, k) array of taxon ids (e.g., (m, 2) for
+            pairs), one group per row, or a list of m groups of any size
+
+    Returns:
+        Tuple of two int64 arrays of length m: the id of each group's most
+        recent common ancestor and its tree depth (both -1 for groups that
+        do not share a common ancestor).
+    """
+    if not is_asexual(phylogeny):
+        raise Exception("given phylogeny is not asexual")
+    structure = _query_structure(phylogeny)
+    if isinstance(groups, np.ndarray) and groups.ndim == 2:
+        ids = groups.ravel()
+        offsets = np.arange(len(groups) + 1) * groups.shape[1]
+    else:
+        sizes = np.fromiter((len(group) for group in groups), dtype=np.int64,
+                            count=len(groups))
+        offsets = np.zeros(len(groups) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+        ids = np.fromiter(chain.from_iterable(groups), dtype=np.int64,
+                          count=offsets[-1])
+    mrcas = structure.lca_index().mrca_groups(structure.index_of(ids),
+                                              offsets)
+    found = mrcas >= 0
+    mrca_ids = np.where(found, structure.ids[mrcas], -1)
+    depths = np.where(found, structure.depths[mrcas], -1)
+    return mrca_ids, depths
+
+
+# ===== sexual (DAG) ancestry =====
+# These follow every ancestor of every taxon (not just first ancestors), so
+# they work on sexual and asexual phylogenies alike.
+
+def _dag_query_indices(structure, ids):
+    # Dense indices of the given ids (default: leaf taxa)
+    if ids is None:
+        return structure.leaf_indices()
+    return structure.index_of(np.asarray(list(ids)))
+
+
+def get_ancestor_ids(phylogeny, taxa_id):
+    """Get the ids of all ancestors of a taxon (every taxon it descends from,
+    through any of its ancestors), in increasing order.
+
+    Args:
+        phylogeny (networkx.DiGraph or CompactPhylogeny): graph object that
+            describes a phylogeny
+        taxa_id (int): id of the taxon
+
+    Returns:
+        List of ids (numpy array, for CompactPhylogeny)
+    """
+    structure = _query_structure(phylogeny)
+    index = structure.index_of(taxa_id)
+    mask = structure.ancestry_index().ancestor_mask([index])
+    mask[index] = False
+    ids = np.sort(structure.ids[mask])
+    return ids if isinstance(phylogeny, CompactPhylogeny) else ids.tolist()
+
+
+def is_ancestor(phylogeny, tax1, tax2):
+    """
+    Is tax2 an ancestor of tax1 (through any of tax1's ancestors)?
+    """
+    structure = _query_structure(phylogeny)
+    index1, index2 = structure.index_of([tax1, tax2])
+    return bool(index1 != index2 and
+                structure.ancestry_index().ancestor_mask([index1])[index2])
+
+
+def get_lowest_common_ancestor_ids(phylogeny, ids=None):
+    """Get the ids of the lowest common ancestors of the given taxa (default:
+    leaf taxa): the taxa that are ancestors of all of them (or one of them,
+    and an ancestor of all others) without a descendant that also is.
+
+    In an asexual phylogeny, this is the most recent common ancestor (see
+    get_mrca_id_asexual); in a sexual phylogeny, there can be several.
+
+    Args:
+        phylogeny (networkx.DiGraph or CompactPhylogeny): graph object that
+            describes a phylogeny
+        ids (list): ids of the taxa
+
+    Returns:
+        List of ids in increasing order, empty if the taxa share no ancestor
+        (numpy array, for CompactPhylogeny)
+    """
+    structure = _query_structure(phylogeny)
+    lcas = structure.ancestry_index().lowest_common_ancestors(
+        _dag_query_indices(structure, ids))
+    ids = np.sort(structure.ids[lcas])
+    return ids if isinstance(phylogeny, CompactPhylogeny) else ids.tolist()
+
+
+# ===== pruning =====
+
+def prune_phylogeny(phylogeny, ids=None, collapse_unifurcations=False,
+                    branch_length=None, not_destroyed_value="none",
+                    destruction_attribute="destruction_time"):
+    """Prune an asexual phylogeny down to the ancestry of its extant taxa (or
+    of the given taxa), dropping extinct branches.
+
+    Optionally, also collapse chains of taxa with a single child: kept taxa
+    that are neither roots nor among the given (extant) taxa and have exactly
+    one kept child are dropped, and their child is attached to its nearest
+    kept ancestor. Every taxon then gets a "branch_length" attribute with the
+    length of the branch to its new ancestor (0 for roots).
+
+    All taxa are handled at once on the phylogeny's parent array, rather than
+    by removing nodes one at a time.
+
+    Args:
+        phylogeny (networkx.DiGraph or CompactPhylogeny): an asexual phylogeny
+        ids (list): ids of the taxa whose ancestry to keep (default: extant
+            taxa)
+        collapse_unifurcations (bool): collapse single-child chains
+        branch_length (str): attribute to measure collapsed branches with
+            (e.g., "origin_time"), as the difference between the attribute
+            values of their ends. By default, branch lengths are numbers of
+            steps.
+        not_destroyed_value (str): value of destruction_attribute that
+            indicates that the taxon is not destroyed (for ids=None)
+        destruction_attribute (str): attribute holding destruction times (for
+            ids=None)
+
+    Returns:
+        Pruned phylogeny, of the same type as the given one (a copy, with
+        taxa in their original order)
+    """
+    if not is_asexual(phylogeny):
+        raise Exception("the given phylogeny is not an asexual phylogeny")
+    if collapse_unifurcations and "branch_length" in _attribute_names(phylogeny):
+        raise Exception("'branch_length' is a reserved attribute when "
+                        "collapsing unifurcations")
+    if ids is None:
+        ids = get_extant_taxa_ids(phylogeny,
+                                  not_destroyed_value=not_destroyed_value,
+                                  destruction_attribute=destruction_attribute)
+    structure = _query_structure(phylogeny)
+    given = structure.index_of(np.asarray(list(ids)))
+    keep = _lineage_mask(structure, given)
+    parents = structure.parents
+
+    if collapse_unifurcations:
+        has_parent = keep & (parents >= 0)
+        num_children = np.bincount(parents[has_parent],
+                                   minlength=len(structure))
+        unifurcation = has_parent & (num_children == 1)
+        unifurcation[given] = False
+        keep &= ~unifurcation
+        # Nearest kept ancestor (or self) of every taxon
+        nearest = _pointer_jump(np.where(keep, -1, parents))[1]
+        parents = np.where(parents >= 0, nearest[np.maximum(parents, 0)], -1)
+
+    kept = np.flatnonzero(keep)
+    position = np.full(len(structure), -1, dtype=np.int64)
+    position[kept] = np.arange(len(kept))
+    kept_parents = parents[kept]
+    new_parents = np.where(kept_parents >= 0,
+                           position[np.maximum(kept_parents, 0)], -1)
+    if collapse_unifurcations:
+        if branch_length is None:
+            values = structure.depths[kept]
+        else:
+            values = _branch_length_values(phylogeny, branch_length)[kept]
+        lengths = np.where(new_parents >= 0,
+                           values - values[np.maximum(new_parents, 0)], 0)
+
+    if isinstance(phylogeny, CompactPhylogeny):
+        pruned = phylogeny.subset(kept)
+        if collapse_unifurcations:
+            # (The subset's attributes are its own, and may be lazy)
+            pruned.attributes["branch_length"] = lengths
+            pruned = CompactPhylogeny.from_parents(
+                pruned.ids, new_parents, pruned.attributes, pruned.origin)
+        return pruned
+
+    kept_ids = structure.ids[kept].tolist()
+    nodes = phylogeny.nodes
+    pruned = nx.DiGraph()
+    pruned.add_nodes_from((taxon_id, dict(nodes[taxon_id]))
+                          for taxon_id in kept_ids)
+    has_parent = np.flatnonzero(new_parents >= 0)
+    pruned.add_edges_from(zip(structure.ids[kept[new_parents[has_parent]]]
+                              .tolist(), structure.ids[kept[has_parent]]
+                              .tolist()))
+    if collapse_unifurcations:
+        nx.set_node_attributes(pruned, dict(zip(kept_ids, lengths.tolist())),
+                               "branch_length")
+        # Taxa attached to a new ancestor get ancestry attributes to match
+        moved = kept[parents[kept] != structure.parents[kept]]
+        for taxon_id, parent_id in zip(structure.ids[moved].tolist(),
+                                       structure.ids[parents[moved]].tolist()):
+            attrs = pruned.nodes[taxon_id]
+            if "ancestor_list" in attrs:
+                attrs["ancestor_list"] = _moved_ancestor_list(
+                    attrs["ancestor_list"], parent_id)
+            if "ancestor_id" in attrs:
+                attrs["ancestor_id"] = parent_id
+    return pruned
+
+
+def _moved_ancestor_list(ancestor_list, parent_id):
+    # Ancestor list naming a new ancestor, in the form of the old one: a list
+    # of ids (strings as loaded from csv, or numbers as from json), or a
+    # standard-format string
+    if isinstance(ancestor_list, str):
+        return f"['{parent_id}']"
+    if ancestor_list and not isinstance(ancestor_list[0], str):
+        return [parent_id]
+    return [str(parent_id)]
+
+
+def _attribute_names(phylogeny):
+    # Names of the taxon attributes of a phylogeny
+    if isinstance(phylogeny, CompactPhylogeny):
+        return set(phylogeny.attributes)
+    return set(chain.from_iterable(attrs for _, attrs in
+                                   phylogeny.nodes(data=True)))
+
+
 # ===== miscellaneous =====
 
-def get_pairwise_distances(phylogeny, ids):
+# Number of pairs to compute distances for at a time
+_DISTANCE_CHUNK_PAIRS = 1000000
+
+# Per-process state of get_pairwise_distances workers
+_distance_worker_state = None
+
+
+def _condensed_pairs(num_ids, row_start, row_stop):
+    # Positions (in ids) of the pairs in rows row_start to row_stop of a
+    # condensed distance matrix (pairs i < j, ordered by i then j)
+    rows = np.arange(row_start, row_stop)
+    counts = num_ids - 1 - rows
+    first = np.repeat(rows, counts)
+    row_offsets = np.cumsum(counts) - counts
+    second = np.arange(counts.sum()) - np.repeat(row_offsets, counts) + first + 1
+    return first, second
+
+
+def _pairwise_distance_rows(lca, lengths, indices, row_start, row_stop):
+    first, second = _condensed_pairs(len(indices), row_start, row_stop)
+    first, second = indices[first], indices[second]
+    mrcas = lca.mrca_pairs(first, second)
+    return lengths[first] + lengths[second] - 2 * lengths[mrcas]
+
+
+def _init_distance_worker(lca, lengths, indices):
+    global _distance_worker_state
+    _distance_worker_state = (lca, lengths, indices)
+
+
+def _distance_worker(row_start, row_stop):
+    return _pairwise_distance_rows(*_distance_worker_state, row_start,
+                                   row_stop)
+
+
+def _branch_length_values(phylogeny, attribute):
+    # Per-taxon values of the given attribute (e.g., origin_time) as floats,
+    # in dense (node) order
+    if isinstance(phylogeny, CompactPhylogeny):
+        values = phylogeny.attributes[attribute]
+    else:
+        values = [attrs[attribute] for _, attrs in phylogeny.nodes(data=True)]
+    return pd.to_numeric(pd.Series(values)).to_numpy(dtype=float)
+
+
+def _distance_form(distances, num_ids, form):
+    if form == "list":
+        return distances.tolist()
+    if form == "condensed":
+        return distances
+    if form == "square":
+        square = np.zeros((num_ids, num_ids), dtype=distances.dtype)
+        first, second = np.triu_indices(num_ids, k=1)
+        square[first, second] = distances
+        square[second, first] = distances
+        return square
+    raise Exception(f"unknown distance matrix form: {form}")
+
+
+def get_pairwise_distances(phylogeny, ids, form="list", branch_length=None,
+                           processes=1):
     """
     given phylogeny and some ids to compute the pairwise distances between,
     return pairwise distances
 
+    For asexual phylogenies, the distance between a and b is computed as
+    depth(a) + depth(b) - 2 * depth(mrca(a, b)) from the phylogeny's
+    LCAIndex, vectorized over all pairs, rather than by searching for a path
+    between every pair.
+
+    Args:
+        phylogeny (networkx.DiGraph or CompactPhylogeny): graph object that
+            describes a phylogeny
+        ids (list): ids of the taxa to compute distances between
+        form (str): "list" (default) for a list of the distances between
+            ids[i] and ids[j] for all i < j (in that order), "condensed" for
+            the same as a numpy array, or "square" for a symmetric
+            len(ids) x len(ids) numpy array
+        branch_length (str): attribute to measure branch lengths with (e.g.,
+            "origin_time"), so that the length of a branch is the difference
+            between the attribute values of its ends. By default, every
+            branch has length 1. Only supported for asexual phylogenies.
+        processes (int): number of worker processes to split large distance
+            matrices across (default: 1; None for one per cpu)
+
     Raises:
         networkx.exception.NetworkXNoPath: if no path between any two of the
         given ids
     """
-    dists = []
-    undirected_phylo = phylogeny.to_undirected()
-    for i in range(0, len(ids)):
-        for j in range(i+1, len(ids)):
-            dists.append(nx.shortest_path_length(undirected_phylo,
-                                                 source=ids[i], target=ids[j]))
-            # print(f"Dist between: {ids[i]}-{ids[j]} = {dists[-1]}")
-    return dists
+    if not is_asexual(phylogeny):
+        if branch_length is not None:
+            raise Exception("branch lengths are only supported for asexual "
+                            "phylogenies")
+        if isinstance(phylogeny, CompactPhylogeny):
+            phylogeny = phylogeny.to_networkx()
+        dists = []
+        undirected_phylo = phylogeny.to_undirected()
+        for i in range(0, len(ids)):
+            for j in range(i+1, len(ids)):
+                dists.append(nx.shortest_path_length(undirected_phylo,
+                                                     source=ids[i], target=ids[j]))
+        return _distance_form(np.array(dists, dtype=np.int64), len(ids), form)
+
+    structure = _query_structure(phylogeny)
+    indices = structure.index_of(np.asarray(ids))
+    roots = structure.root_labels[indices]
+    if np.any(roots != roots[:1]):
+        raise nx.NetworkXNoPath("no path between some of the given ids")
+    if branch_length is None:
+        lengths = np.asarray(structure.depths)
+    else:
+        lengths = _branch_length_values(phylogeny, branch_length)
+    lca = structure.lca_index()
+
+    # Split the rows of the condensed matrix into chunks of about
+    # _DISTANCE_CHUNK_PAIRS pairs each
+    num_ids = len(indices)
+    row_pairs = np.cumsum(num_ids - 1 - np.arange(num_ids))
+    num_pairs = int(row_pairs[-1]) if num_ids else 0
+    bounds = np.unique(np.concatenate((
+        [0], np.searchsorted(row_pairs, np.arange(
+            _DISTANCE_CHUNK_PAIRS, num_pairs, _DISTANCE_CHUNK_PAIRS)) + 1,
+        [num_ids]))).tolist()
+    chunks = list(zip(bounds[:-1], bounds[1:]))
+    if processes == 1 or len(chunks) < 2:
+        parts = [_pairwise_distance_rows(lca, lengths, indices, start, stop)
+                 for start, stop in chunks]
+    else:
+        with ProcessPoolExecutor(processes, initializer=_init_distance_worker,
+                                 initargs=(lca, lengths, indices)) as pool:
+            parts = list(pool.map(_distance_worker, *zip(*chunks)))
+    distances = np.concatenate(parts) if parts else lengths[:0]
+    return _distance_form(distances, num_ids, form)
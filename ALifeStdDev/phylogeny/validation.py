@@ -0,0 +1,178 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .compact import CompactPhylogeny, _stream_topology
+from .loader import parse_ancestor_lists
+
+
+class ValidationReport(namedtuple("ValidationReport", [
+        "num_taxa", "duplicate_ids", "dangling_ancestor_ids",
+        "dangling_taxa_ids", "malformed_ids", "cycle_ids", "root_ids",
+        "asexual"])):
+    """Result of validating a phylogeny in standards format.
+
+    Attributes:
+        num_taxa (int): number of taxa (rows)
+        duplicate_ids (numpy.ndarray): ids used by more than one taxon
+        dangling_ancestor_ids (numpy.ndarray): ancestor ids that are not the
+            id of any taxon
+        dangling_taxa_ids (numpy.ndarray): ids of taxa that list a dangling
+            ancestor
+        malformed_ids (numpy.ndarray): ids of taxa whose ancestor_list is not
+            a list of ancestor ids or [none] (e.g., unknown special values,
+            special values mixed with ids, ids that are not non-negative
+            64-bit integers, or unbalanced brackets or quotes)
+        cycle_ids (numpy.ndarray): ids of taxa that are their own ancestor,
+            or descend from such a taxon
+        root_ids (numpy.ndarray): ids of taxa without ancestors
+        asexual (bool): True if no taxon lists more than one ancestor
+    """
+    __slots__ = ()
+
+    @property
+    def multiple_roots(self):
+        """True if the phylogeny has more than one root."""
+        return len(self.root_ids) > 1
+
+    @property
+    def problems(self):
+        """List of messages describing everything that makes the phylogeny
+        invalid (multiple roots are allowed).
+        """
+        problems = []
+        for field, message in [
+                ("duplicate_ids", "duplicate id(s)"),
+                ("dangling_ancestor_ids", "ancestor id(s) not in phylogeny"),
+                ("malformed_ids", "taxa with malformed ancestor_list"),
+                ("cycle_ids", "taxa in or below an ancestry cycle")]:
+            values = getattr(self, field)
+            if len(values):
+                problems.append(f"{len(values)} {message}: "
+                                f"{values[:10].tolist()}"
+                                + ("..." if len(values) > 10 else ""))
+        return problems
+
+    @property
+    def valid(self):
+        """True if no problems were found."""
+        return not self.problems
+
+
+def _looping_indices(parents):
+    # Dense indices of taxa whose chain of first ancestors never reaches a
+    # root, by pointer jumping (at most log2(n) + 1 rounds)
+    jump = np.where(parents < 0, np.arange(len(parents)), parents)
+    for _ in range(len(parents).bit_length() + 1):
+        next_jump = jump[jump]
+        if np.array_equal(next_jump, jump):
+            break
+        jump = next_jump
+    return np.flatnonzero(parents[jump] >= 0)
+
+
+def _unordered_indices(phylogeny):
+    # Dense indices of taxa that cannot be ordered after all of their
+    # ancestors (i.e., in or below a cycle), by peeling off taxa whose
+    # ancestors have all been peeled, one generation at a time
+    remaining = phylogeny.num_ancestors.copy()
+    visited = np.zeros(len(phylogeny), dtype=bool)
+    frontier = np.flatnonzero(remaining == 0)
+    while len(frontier):
+        visited[frontier] = True
+        starts = phylogeny.child_offsets[frontier]
+        counts = phylogeny.child_offsets[frontier + 1] - starts
+        positions = np.repeat(starts - (np.cumsum(counts) - counts), counts) \
+            + np.arange(counts.sum())
+        children, num_edges = np.unique(phylogeny.child_indices[positions],
+                                        return_counts=True)
+        remaining[children] -= num_edges
+        frontier = children[remaining[children] == 0]
+    return np.flatnonzero(~visited)
+
+
+def _validate_topology(taxon_ids, parsed, malformed_rows):
+    # malformed_rows marks rows the parser could not make sense of (see
+    # parse_ancestor_lists(..., strict=False))
+    num_taxa = len(taxon_ids)
+    counts = np.diff(parsed.offsets)
+
+    unique_ids, id_counts = np.unique(taxon_ids, return_counts=True)
+    duplicate_ids = unique_ids[id_counts > 1]
+
+    edge_child = np.repeat(np.arange(num_taxa), counts)
+    dangling = ~np.isin(parsed.values, unique_ids)
+    dangling_ancestor_ids = np.unique(parsed.values[dangling])
+    dangling_taxa_ids = np.unique(taxon_ids[edge_child[dangling]])
+
+    special = pd.notna(parsed.origin)
+    malformed = malformed_rows | (special & (counts > 0))
+    special_rows = np.flatnonzero(special)
+    malformed[special_rows] |= np.array(
+        [str(parsed.origin[row]).lower() != "none" for row in special_rows],
+        dtype=bool)
+    malformed_ids = taxon_ids[malformed]
+
+    # Dangling ancestors are left out when looking for cycles
+    sorter = np.argsort(taxon_ids, kind="stable")
+    edge_child = edge_child[~dangling]
+    edge_parent = sorter[np.searchsorted(taxon_ids, parsed.values[~dangling],
+                                         sorter=sorter)]
+    offsets = np.zeros(num_taxa + 1, dtype=np.int64)
+    np.cumsum(np.bincount(edge_child, minlength=num_taxa), out=offsets[1:])
+    phylogeny = CompactPhylogeny(taxon_ids, offsets, edge_parent)
+    asexual = bool(num_taxa == 0 or counts.max() <= 1)
+    if asexual:
+        looping = _looping_indices(phylogeny.parents)
+    else:
+        looping = _unordered_indices(phylogeny)
+
+    return ValidationReport(
+        num_taxa=num_taxa,
+        duplicate_ids=duplicate_ids,
+        dangling_ancestor_ids=dangling_ancestor_ids,
+        dangling_taxa_ids=dangling_taxa_ids,
+        malformed_ids=malformed_ids,
+        cycle_ids=np.sort(taxon_ids[looping]),
+        root_ids=taxon_ids[counts == 0],
+        asexual=asexual)
+
+
+def validate_phylogeny_pandas_df(data):
+    """Checks a phylogeny dataframe for duplicate ids, ancestors that are not
+    in the phylogeny, malformed ancestor lists and cycles, in a single
+    vectorized pass over its ids and ancestor lists.
+
+    Args:
+        data (pandas.DataFrame): phylogeny in standard format (e.g., loaded via
+            load_phylogeny_to_pandas_df). Taxon ids are taken from the "id"
+            column if there is one, and from the index otherwise.
+
+    Returns:
+        ValidationReport
+    """
+    if "id" in data.columns:
+        taxon_ids = data["id"].to_numpy()
+    else:
+        taxon_ids = data.index.to_numpy()
+    return _validate_topology(taxon_ids.astype(np.int64),
+                              *parse_ancestor_lists(data["ancestor_list"],
+                                                    strict=False))
+
+
+def validate_phylogeny_file(filename, chunksize=100000):
+    """Checks a phylogeny file in standards format (csv) like
+    validate_phylogeny_pandas_df, reading only its id and ancestor_list
+    columns, chunksize rows at a time, so files too large to load can be
+    checked before analysis.
+
+    Args:
+        filename (str): path to phylogeny file
+        chunksize (int): number of rows to read at a time
+
+    Returns:
+        ValidationReport
+    """
+    return _validate_topology(*_stream_topology(filename, chunksize,
+                                                strict=False))
@@ -31,7 +31,7 @@ setup(name='ALifeStdDev',
       keywords='artificial life',
       test_suite='tests',
       packages=find_packages(include=['ALifeStdDev', 'ALifeStdDev.*']),
-      install_requires=['networkx', 'pandas'],
+      install_requires=['networkx', 'numpy', 'pandas'],
       tests_require=['pytest'],
       zip_safe=False,
 )
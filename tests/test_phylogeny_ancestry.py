@@ -0,0 +1,69 @@
+import ALifeStdDev.phylogeny as phylodev
+import networkx as nx
+import numpy as np
+
+sex_fname = "example_data/example-standard-toy-sexual-phylogeny.csv"
+single_root_fname = "example_data/example-standard-toy-asexual-phylogeny.csv"
+
+
+def random_dag(rng, num_taxa):
+    # Taxa with up to three ancestors among earlier taxa, in shuffled order
+    order = rng.permutation(num_taxa)
+    g = nx.DiGraph()
+    g.add_nodes_from(range(num_taxa))
+    for i in range(3, num_taxa):
+        for j in set(rng.integers(0, i, rng.integers(1, 4)).tolist()):
+            g.add_edge(int(order[j]), int(order[i]))
+    return g
+
+
+def test_ancestry_index_random():
+    rng = np.random.default_rng(3)
+    g = random_dag(rng, 600)
+    structure = phylodev.CompactPhylogeny.from_networkx(g)
+    index = structure.ancestry_index()
+    assert index is structure.ancestry_index()
+    ancestors = {taxon: nx.ancestors(g, taxon) for taxon in g.nodes}
+    dense = {int(taxon): i for i, taxon in enumerate(structure.ids)}
+
+    queries = rng.choice(600, 300, replace=False)
+    counts = index.num_ancestors([dense[q] for q in queries.tolist()])
+    assert counts.tolist() == [len(ancestors[q]) for q in queries.tolist()]
+    for _ in range(30):
+        group = rng.choice(600, rng.integers(1, 6), replace=False).tolist()
+        common = set.intersection(*[ancestors[q] | {q} for q in group])
+        lowest = {c for c in common
+                  if not any(d in common for d in g.successors(c))}
+        found = index.lowest_common_ancestors([dense[q] for q in group])
+        assert set(structure.ids[found].tolist()) == lowest
+    mask = index.ancestor_mask([dense[int(queries[0])]])
+    assert set(structure.ids[mask].tolist()) == \
+        ancestors[int(queries[0])] | {int(queries[0])}
+
+
+def test_sexual_ancestry_queries():
+    sexphylo = phylodev.load_phylogeny_to_networkx(sex_fname)
+    compact = phylodev.load_phylogeny_to_compact(sex_fname)
+    for phylogeny in [sexphylo, compact]:
+        assert list(phylodev.get_ancestor_ids(phylogeny, 5)) == \
+            [0, 1, 2, 3, 4, 100]
+        assert list(phylodev.get_ancestor_ids(phylogeny, 0)) == []
+        assert list(phylodev.get_lowest_common_ancestor_ids(
+            phylogeny, [3, 4])) == [1, 2]
+        assert list(phylodev.get_lowest_common_ancestor_ids(
+            phylogeny, [5, 3])) == [3]
+        assert list(phylodev.get_lowest_common_ancestor_ids(
+            phylogeny, [0, 100])) == []
+        assert list(phylodev.get_lowest_common_ancestor_ids(phylogeny)) == [5]
+        assert phylodev.is_ancestor(phylogeny, 5, 100)
+        assert not phylodev.is_ancestor(phylogeny, 3, 4)
+        assert not phylodev.is_ancestor(phylogeny, 3, 3)
+    assert phylodev.get_ancestor_counts(sexphylo, [5, 3, 1, 0]) == \
+        {5: 6, 3: 4, 1: 2, 0: 0}
+    assert phylodev.get_ancestor_counts(compact, [5, 3]).tolist() == [6, 4]
+
+    # Same answers as the asexual utilities on asexual phylogenies
+    sroot = phylodev.load_phylogeny_to_networkx(single_root_fname)
+    assert phylodev.get_lowest_common_ancestor_ids(sroot, [3, 4, 5]) == \
+        [phylodev.get_mrca_id_asexual(sroot, [3, 4, 5])]
+    assert phylodev.get_ancestor_counts(sroot, [3]) == {3: 2}
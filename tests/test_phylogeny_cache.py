@@ -0,0 +1,83 @@
+import ALifeStdDev.phylogeny as phylodev
+import ALifeStdDev.phylogeny.cache as phylocache
+import pytest
+import json
+import os
+import shutil
+import numpy as np
+
+
+@pytest.fixture
+def phylogeny_file(tmp_path):
+    fname = str(tmp_path / "phylogeny.csv")
+    shutil.copy("example_data/asexual_phylogeny_test.csv", fname)
+    return fname
+
+
+def test_cache_round_trip(phylogeny_file):
+    uncached = phylodev.load_phylogeny_to_pandas_df(phylogeny_file)
+    assert not os.path.exists(phylodev.phylogeny_cache_path(phylogeny_file))
+
+    cold = phylodev.load_phylogeny_to_pandas_df(phylogeny_file, cache=True)
+    assert os.path.exists(phylodev.phylogeny_cache_path(phylogeny_file))
+    warm = phylodev.load_phylogeny_to_pandas_df(phylogeny_file, cache=True)
+    assert cold.equals(uncached)
+    assert warm.equals(uncached)
+
+    projected = phylodev.load_phylogeny_to_pandas_df(
+        phylogeny_file, columns=["fitness"], compact_dtypes=True, cache=True)
+    assert list(projected.columns) == ["ancestor_list", "fitness",
+                                       "ancestor_id"]
+    assert projected["fitness"].dtype == np.float32
+
+    phylo = phylodev.load_phylogeny_to_compact(phylogeny_file, columns=[],
+                                               cache=True)
+    assert not phylo.attributes.is_loaded("sequence")
+    assert phylo.origin[phylo.index_of(1)] == "none"
+    assert np.array_equal(phylo.attributes["sequence"],
+                          uncached["sequence"].to_numpy())
+
+    g = phylodev.load_phylogeny_to_networkx(phylogeny_file, columns=[],
+                                            cache=True)
+    assert g.nodes[1]["src"] == "div:ext"
+    assert g.nodes[1]["origin"] == "none"
+
+
+def test_cache_invalidation(phylogeny_file):
+    cache_path = phylodev.phylogeny_cache_path(phylogeny_file)
+    phylodev.load_phylogeny_to_pandas_df(phylogeny_file, cache=True)
+
+    # Touching the file without changing it keeps the cache valid, and the
+    # new mtime is recorded so the file is not hashed again
+    os.utime(phylogeny_file, (0, 12345))
+    phylodev.load_phylogeny_to_pandas_df(phylogeny_file, cache=True)
+    with np.load(cache_path) as npz:
+        assert json.loads(str(npz["meta"]))["mtime_ns"] == \
+            os.stat(phylogeny_file).st_mtime_ns
+
+    with open(phylogeny_file, "a") as phylogeny:
+        phylogeny.write("5,['none'],-1,div:ext,(none),1,1,100,0,0,0,0,-1,-1,"
+                        "0,0,heads_default,a,['0'],['0'],['0']\n")
+    df = phylodev.load_phylogeny_to_pandas_df(phylogeny_file, cache=True)
+    assert 5 in df.index
+
+    assert phylodev.clear_phylogeny_cache(phylogeny_file)
+    assert not os.path.exists(cache_path)
+    assert not phylodev.clear_phylogeny_cache(phylogeny_file)
+    assert phylodev.rebuild_phylogeny_cache(phylogeny_file) == cache_path
+    assert os.path.exists(cache_path)
+
+
+def test_cache_not_writable(phylogeny_file, monkeypatch):
+    def fail(*args, **kwargs):
+        raise PermissionError("read-only")
+
+    # Loading still works when the cache cannot be written
+    monkeypatch.setattr(phylocache.tempfile, "mkstemp", fail)
+    df = phylodev.load_phylogeny_to_pandas_df(phylogeny_file, cache=True)
+    assert df.equals(phylodev.load_phylogeny_to_pandas_df(phylogeny_file))
+    phylo = phylodev.load_phylogeny_to_compact(phylogeny_file, columns=[],
+                                               cache=True)
+    assert phylo.attributes["src"][phylo.index_of(1)] == "div:ext"
+    assert not os.path.exists(phylodev.phylogeny_cache_path(phylogeny_file))
+    assert os.listdir(os.path.dirname(phylogeny_file)) == ["phylogeny.csv"]
@@ -0,0 +1,59 @@
+import ALifeStdDev.phylogeny as phylodev
+import pytest
+import numpy as np
+import pandas as pd
+
+
+def test_column_store_append(tmp_path):
+    store = phylodev.ColumnStore(str(tmp_path / "store"))
+    store.append(pd.DataFrame({"a": [1, 2], "b": ["x", "yy"], "c": [1, 2]}))
+    store.append(pd.DataFrame({"a": [3, 4], "b": ["", "z"],
+                               "c": ["none", "5"]}))
+    store.append(pd.DataFrame({"a": [0.5, 1.5], "b": ["w", "v"],
+                               "c": [6, 7]}))
+
+    assert len(store) == 6
+    assert store.columns == ["a", "b", "c"]
+    assert isinstance(store["a"], np.memmap)
+    assert list(store["a"]) == [1, 2, 3, 4, 0.5, 1.5]
+    assert list(store["b"]) == ["x", "yy", "", "z", "w", "v"]
+    assert list(store["c"]) == ["1", "2", "none", "5", "6", "7"]
+    assert list(store.take("b", [5, 1])) == ["v", "yy"]
+
+    with pytest.raises(Exception):
+        store.append(pd.DataFrame({"a": [1]}))
+
+    # reopening an existing store
+    reopened = phylodev.ColumnStore(str(tmp_path / "store"))
+    assert len(reopened) == 6
+    assert list(reopened.take("a", [4])) == [0.5]
+
+    # missing numeric values stay missing when a column becomes text
+    store = phylodev.ColumnStore(str(tmp_path / "missing"))
+    store.append(pd.DataFrame({"d": [1.5, np.nan]}))
+    store.append(pd.DataFrame({"d": [np.nan, 2.5]}))
+    store.append(pd.DataFrame({"d": ["x", None]}))
+    assert list(store["d"]) == ["1.5", "", "", "2.5", "x", ""]
+
+
+def test_lazy_columns(tmp_path):
+    store = phylodev.ColumnStore(str(tmp_path / "store"))
+    store.append(pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]}))
+    columns = phylodev.LazyColumns(store)
+
+    assert "a" in columns and "missing" not in columns
+    assert not columns.is_loaded("b")
+    assert columns.value("b", 2) == "z"
+    assert not columns.is_loaded("b")
+    assert list(columns["b"]) == ["x", "y", "z"]
+    assert columns.is_loaded("b")
+
+    subset = columns.take([2, 0])
+    assert list(subset["a"]) == [3, 1]
+    assert list(subset["b"]) == ["z", "x"]
+
+    columns["c"] = np.zeros(3)
+    del columns["a"]
+    assert list(columns) == ["b", "c"]
+    with pytest.raises(KeyError):
+        columns["a"]
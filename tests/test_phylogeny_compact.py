@@ -0,0 +1,272 @@
+import ALifeStdDev.phylogeny as phylodev
+import pytest
+import networkx as nx
+import numpy as np
+import os
+import shutil
+
+single_root_fname = "example_data/example-standard-toy-asexual-phylogeny.csv"
+multi_root_fname = "example_data/example-standard-toy-asexual-phylogeny-multi-roots.csv"
+unpruned_fname = "example_data/example-standard-toy-asexual-phylogeny-not-pruned.csv"
+sex_fname = "example_data/example-standard-toy-sexual-phylogeny.csv"
+toy_lineage_fname = "example_data/example-standard-toy-asexual-lineage.csv"
+
+
+def test_load_phylogeny_to_compact():
+    phylo = phylodev.load_phylogeny_to_compact(
+        "example_data/asexual_phylogeny_test.csv")
+    assert 36210211 in phylo
+    assert -5 not in phylo
+    i, j = phylo.index_of([36210211, 36205850])
+    assert phylo.parents[i] == j
+    assert i in phylo.children(j)
+    assert phylo.origin[phylo.index_of(1)] == "none"
+    assert phylo.taxon_attributes(phylo.index_of(1))["src"] == "div:ext"
+    assert "ancestor_list" not in phylo.attributes
+
+    with pytest.raises(Exception):
+        phylo.index_of(-5)
+    with pytest.raises(Exception):
+        phylodev.load_phylogeny_to_compact("example_data/should_fail.csv")
+
+    # Float ids only find taxa they are equal to, as in networkx
+    assert phylo.index_of(1.0) == phylo.index_of(1)
+    assert 2.5 not in phylo
+    with pytest.raises(Exception, match=r"Failed to find given taxa \(2.5\)"):
+        phylo.index_of([1, 2.5])
+    g = phylodev.load_phylogeny_to_networkx(single_root_fname)
+    compact = phylodev.load_phylogeny_to_compact(single_root_fname)
+    for phylogeny in [g, compact]:
+        with pytest.raises(Exception):
+            phylodev.extract_asexual_lineage_ids(phylogeny, 2.7)
+        with pytest.raises(Exception):
+            phylodev.get_mrca_id_asexual(phylogeny, [3, 4.5])
+
+
+def test_load_phylogeny_to_compact_lazy_columns():
+    fname = "example_data/asexual_phylogeny_test.csv"
+    full = phylodev.load_phylogeny_to_compact(fname)
+    phylo = phylodev.load_phylogeny_to_compact(fname, columns=["src"],
+                                               compact_dtypes=True)
+    assert phylo.attributes.is_loaded("src")
+    assert not phylo.attributes.is_loaded("sequence")
+    assert phylo.taxon_attributes(phylo.index_of(1))["origin_time"] == -1
+    assert phylo.attributes["origin_time"].dtype == np.int32
+    assert np.array_equal(phylo.attributes["sequence"],
+                          full.attributes["sequence"])
+    assert list(phylo.attributes["src"]) == list(full.attributes["src"])
+    assert phylodev.get_roots(phylo)[1]["src"] == "div:ext"
+
+
+def test_stream_phylogeny_to_compact(tmp_path):
+    fname = "example_data/asexual_phylogeny_test.csv"
+    full = phylodev.load_phylogeny_to_compact(fname)
+
+    topology = phylodev.stream_phylogeny_to_compact(fname, chunksize=1000)
+    assert np.array_equal(topology.ids, full.ids)
+    assert np.array_equal(topology.parents, full.parents)
+    assert len(topology.attributes) == 0
+    assert topology.origin[topology.index_of(1)] == "none"
+    assert phylodev.get_mrca_id_asexual(topology) == \
+        phylodev.get_mrca_id_asexual(full)
+
+    spilled = phylodev.stream_phylogeny_to_compact(
+        fname, chunksize=1000, spill_dir=str(tmp_path / "columns"))
+    assert not spilled.attributes.is_loaded("sequence")
+    assert phylodev.get_roots(spilled)[1]["src"] == "div:ext"
+    assert not spilled.attributes.is_loaded("sequence")
+    assert np.array_equal(spilled.attributes["sequence"],
+                          full.attributes["sequence"])
+    assert np.array_equal(spilled.attributes["fitness"],
+                          full.attributes["fitness"])
+    lineage = phylodev.extract_asexual_lineage(spilled, 36205979)
+    assert lineage.attributes["origin_time"][-1] == 199977
+
+    projected = phylodev.stream_phylogeny_to_compact(
+        fname, chunksize=1000, spill_dir=str(tmp_path / "projected"),
+        columns=["fitness"])
+    assert list(projected.attributes) == ["fitness"]
+
+    with pytest.raises(Exception):
+        phylodev.stream_phylogeny_to_compact(
+            fname, spill_dir=str(tmp_path / "columns"))
+    with pytest.raises(Exception):
+        phylodev.stream_phylogeny_to_compact("example_data/should_fail.csv",
+                                             chunksize=1000)
+
+
+def test_load_phylogenies_to_compact():
+    fnames = [single_root_fname, multi_root_fname, sex_fname]
+    loaded = phylodev.load_phylogenies_to_compact(fnames, processes=2)
+    assert list(loaded) == fnames
+    for fname in fnames:
+        phylo = phylodev.load_phylogeny_to_compact(fname)
+        assert np.array_equal(loaded[fname].ids, phylo.ids)
+        assert np.array_equal(loaded[fname].ancestor_indices,
+                              phylo.ancestor_indices)
+        assert np.array_equal(loaded[fname].attributes["trait_a"],
+                              phylo.attributes["trait_a"])
+
+    pattern = "example_data/example-standard-toy-asexual-phylogeny*.csv"
+    loaded = dict(phylodev.iter_load_phylogenies_to_compact(
+        pattern, processes=1, columns=["trait_a"]))
+    assert sorted(loaded) == sorted([single_root_fname, multi_root_fname,
+                                     unpruned_fname])
+    assert loaded[single_root_fname].attributes.is_loaded("trait_a")
+
+    for processes in [1, 2]:
+        with pytest.raises(Exception) as excinfo:
+            phylodev.load_phylogenies_to_compact(
+                [single_root_fname, "example_data/should_fail.csv"],
+                processes=processes)
+        assert str(excinfo.value).startswith(
+            "failed to load example_data/should_fail.csv: ")
+
+
+def test_load_phylogenies_to_compact_lazy(tmp_path):
+    # Lazy columns (read from the files or their caches) work after being
+    # sent back from worker processes
+    fnames = []
+    for fname in [single_root_fname, multi_root_fname, sex_fname]:
+        fnames.append(str(tmp_path / os.path.basename(fname)))
+        shutil.copy(fname, fnames[-1])
+    for cache in [False, True, True]:
+        loaded = phylodev.load_phylogenies_to_compact(
+            fnames, processes=2, columns=["trait_a"], cache=cache)
+        for fname in fnames:
+            phylo = phylodev.load_phylogeny_to_compact(fname)
+            assert loaded[fname].attributes.is_loaded("trait_a")
+            assert not loaded[fname].attributes.is_loaded("trait_b")
+            assert np.array_equal(loaded[fname].attributes["trait_b"],
+                                  phylo.attributes["trait_b"])
+        assert all(os.path.exists(phylodev.phylogeny_cache_path(fname))
+                   for fname in fnames) == cache
+
+
+def test_compact_networkx_round_trip():
+    for fname in [single_root_fname, multi_root_fname, sex_fname]:
+        g = phylodev.load_phylogeny_to_networkx(fname)
+        compact = phylodev.CompactPhylogeny.from_networkx(g)
+        g2 = compact.to_networkx()
+        assert set(g.nodes) == set(g2.nodes)
+        assert set(g.edges) == set(g2.edges)
+        assert g.nodes[0]["origin"] == g2.nodes[0]["origin"]
+        assert g.nodes[1]["trait_a"] == g2.nodes[1]["trait_a"]
+
+    compact = phylodev.load_phylogeny_to_compact(sex_fname)
+    df = compact.to_pandas_df()
+    assert list(df.loc[df["id"] == 5, "ancestor_list"])[0] == [3, 4]
+    again = phylodev.CompactPhylogeny.from_pandas_df(df)
+    assert np.array_equal(again.ancestor_indices, compact.ancestor_indices)
+
+
+def test_compact_structure():
+    mroot = phylodev.load_phylogeny_to_compact(multi_root_fname)
+    depths = dict(zip(mroot.ids, mroot.depths))
+    assert depths == {0: 0, 1: 1, 2: 1, 3: 2, 4: 2, 5: 2, 6: 0, 7: 1, 8: 2}
+    roots = dict(zip(mroot.ids, mroot.ids[mroot.root_labels]))
+    assert roots[5] == 0 and roots[8] == 6
+    assert list(mroot.ids[mroot.lineage_indices(mroot.index_of(5))]) == [5, 2, 0]
+
+    parents = np.array([-1, 0, 0, 1])
+    compact = phylodev.CompactPhylogeny.from_parents([10, 11, 12, 13], parents)
+    assert list(compact.ids[compact.leaf_indices()]) == [12, 13]
+    assert compact.mrca_index([2, 3]) == 0
+
+    with pytest.raises(Exception):
+        phylodev.CompactPhylogeny.from_parents([1, 2], [1, 0]).depths
+
+
+def test_compact_utils():
+    sroot = phylodev.load_phylogeny_to_compact(single_root_fname)
+    mroot = phylodev.load_phylogeny_to_compact(multi_root_fname)
+    sexphylo = phylodev.load_phylogeny_to_compact(sex_fname)
+
+    assert phylodev.all_taxa_have_attribute(sroot, "trait_a")
+    assert not phylodev.all_taxa_have_attribute(sroot, "garbage")
+    assert phylodev.is_asexual(sroot)
+    assert not phylodev.is_asexual(sexphylo)
+    assert phylodev.has_single_root(sroot)
+    assert not phylodev.has_single_root(mroot)
+    assert set(phylodev.get_root_ids(mroot)) == {0, 6}
+    assert phylodev.get_roots(mroot)[6]["id"] == 6
+    assert phylodev.get_num_roots(sexphylo) == 2
+    assert phylodev.get_num_independent_phylogenies(mroot) == 2
+    assert phylodev.get_num_independent_phylogenies(sexphylo) == 1
+    indies = phylodev.get_independent_phylogenies(mroot)
+    assert [set(p.ids) for p in indies] == [{0, 1, 2, 3, 4, 5}, {6, 7, 8}]
+    assert set(phylodev.get_leaf_taxa_ids(mroot)) == {3, 4, 5, 8}
+    assert set(phylodev.get_leaf_taxa(sexphylo)) == {5}
+    assert set(phylodev.get_extant_taxa_ids(sroot)) == {3, 4, 5}
+    assert set(phylodev.get_extant_taxa(sroot)) == {3, 4, 5}
+    extant = phylodev.get_extant_taxa_ids(sroot, time=1,
+                                          origin_attribute="trait_a")
+    assert set(extant) == {1, 2, 3, 4, 5}
+    with pytest.raises(Exception):
+        phylodev.get_extant_taxa_ids(sroot, time=1)
+
+
+def test_compact_lineages_and_mrca():
+    sroot = phylodev.load_phylogeny_to_compact(single_root_fname)
+    mroot = phylodev.load_phylogeny_to_compact(multi_root_fname)
+    sexphylo = phylodev.load_phylogeny_to_compact(sex_fname)
+
+    lineage_5 = phylodev.extract_asexual_lineage(mroot, 5)
+    assert set(lineage_5.ids) == {0, 2, 5}
+    assert phylodev.is_asexual_lineage(lineage_5)
+    assert not phylodev.is_asexual_lineage(mroot)
+    assert list(phylodev.extract_asexual_lineage_ids(mroot, 8)) == [8, 7, 6]
+    with pytest.raises(Exception):
+        phylodev.extract_asexual_lineage(sexphylo, 5)
+    assert set(phylodev.extract_asexual_lod(mroot).ids) == {6, 7, 8}
+
+    assert phylodev.is_ancestor_asexual(mroot, 8, 6)
+    assert not phylodev.is_ancestor_asexual(mroot, 6, 8)
+    assert not phylodev.is_ancestor_asexual(mroot, 0, 6)
+    assert phylodev.has_common_ancestor_asexual(sroot)
+    assert not phylodev.has_common_ancestor_asexual(mroot)
+    assert phylodev.get_mrca_id_asexual(sroot, [3, 4]) == 1
+    assert phylodev.get_mrca_id_asexual(sroot) == 0
+    assert phylodev.get_mrca_id_asexual(mroot) == -1
+    assert phylodev.get_mrca_id_asexual(mroot, [8, 8]) == 8
+    assert phylodev.get_mrca_asexual(sroot, [3, 4])["id"] == 1
+    assert phylodev.get_mrca_asexual(mroot) is None
+
+    assert sorted(phylodev.get_pairwise_distances(sroot, [3, 4, 5])) == [2, 4, 4]
+    with pytest.raises(nx.NetworkXNoPath):
+        phylodev.get_pairwise_distances(mroot, [3, 4, 8])
+
+
+def test_compact_abstraction():
+    phylogeny = phylodev.load_phylogeny_to_compact(single_root_fname)
+    g = phylodev.load_phylogeny_to_networkx(single_root_fname)
+    for attrs in [["trait_a"], ["trait_a", "trait_b"], ["trait_b"],
+                  ["trait_a", "trait_b", "trait_c"]]:
+        abstract = phylodev.abstract_asexual_phylogeny(phylogeny, attrs)
+        assert len(abstract) == len(phylodev.abstract_asexual_phylogeny(g, attrs))
+    members = phylodev.abstract_asexual_phylogeny(
+        phylogeny, ["trait_a"]).attributes["members"]
+    assert sorted(np.concatenate(members)) == [0, 1, 2, 3, 4, 5]
+
+    lineage = phylodev.load_phylogeny_to_compact(toy_lineage_fname)
+    assert len(phylodev.abstract_asexual_lineage(lineage, ["genotype"])) == 4
+    assert len(phylodev.abstract_asexual_lineage(lineage, ["trait_b"])) == 2
+
+
+def test_compact_metrics():
+    lineage = phylodev.load_phylogeny_to_compact(toy_lineage_fname)
+    assert phylodev.get_asexual_lineage_length(lineage) == 8
+    assert phylodev.get_asexual_lineage_num_discrete_state_changes(
+        lineage, ["trait_a"]) == 3
+    assert phylodev.get_asexual_lineage_num_discrete_unique_states(
+        lineage, ["genotype"]) == 4
+    mut_dist = phylodev.get_asexual_lineage_mutation_accumulation(
+        lineage, ["sub_mut_cnt", "reverse_mut_cnt"])
+    assert mut_dist == {"sub_mut_cnt": 2, "reverse_mut_cnt": 1}
+
+    sroot = phylodev.load_phylogeny_to_compact(single_root_fname)
+    assert phylodev.get_mrca_tree_depth_asexual(sroot, [3, 4]) == 1
+    assert phylodev.get_mrca_tree_depth_asexual(sroot, [5]) == 2
+    unpruned = phylodev.load_phylogeny_to_compact(unpruned_fname)
+    assert phylodev.calc_phylogenetic_diversity_asexual(unpruned, [3, 4, 5]) == 6
+    assert phylodev.calc_phylogenetic_diversity_asexual(unpruned, [3, 4, 5, 8]) == 7
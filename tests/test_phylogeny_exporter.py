@@ -0,0 +1,82 @@
+import ALifeStdDev.phylogeny as phylodev
+import pytest
+import numpy as np
+
+asexual_fname = "example_data/asexual_phylogeny_test.csv"
+sex_fname = "example_data/example-standard-toy-sexual-phylogeny.csv"
+
+
+def test_save_phylogeny(tmp_path):
+    phylo = phylodev.load_phylogeny_to_networkx(asexual_fname)
+    sources = [phylo,
+               phylodev.load_phylogeny_to_compact(asexual_fname),
+               phylodev.load_phylogeny_to_compact(asexual_fname, columns=[]),
+               phylodev.load_phylogeny_to_pandas_df(asexual_fname)]
+    names = ["phylogeny.csv", "phylogeny.json.gz", "phylogeny.csv",
+             "phylogeny.csv.bz2"]
+    for source, name in zip(sources, names):
+        out = str(tmp_path / name)
+        phylodev.save_phylogeny(source, out, chunksize=5000)
+        g = phylodev.load_phylogeny_to_networkx(out)
+        assert set(g.edges) == set(phylo.edges)
+        assert g.nodes[1]["origin"] == "none"
+        for node in [1, 36209383]:
+            for attribute, value in phylo.nodes[node].items():
+                if attribute not in ("ancestor_list", "ancestor_id"):
+                    assert g.nodes[node][attribute] == value
+
+
+def test_save_phylogeny_attributes(tmp_path):
+    phylo = phylodev.load_phylogeny_to_networkx(sex_fname)
+    out = str(tmp_path / "phylogeny.csv")
+    phylodev.save_phylogeny(phylo, out, attributes=["trait_a", "origin"])
+    with open(out) as saved:
+        lines = saved.read().splitlines()
+    assert lines[0] == "id,ancestor_list,trait_a"
+    assert lines[1] == "0,[none],0"
+    assert '3,"[1,2]",1' in lines
+
+    compact = phylodev.load_phylogeny_to_compact(sex_fname)
+    out = str(tmp_path / "phylogeny.json")
+    phylodev.save_phylogeny(compact, out, attributes=["trait_b"])
+    g = phylodev.load_phylogeny_to_networkx(out)
+    assert set(g.edges) == set(phylo.edges)
+    assert g.nodes[3] == {"ancestor_list": [1, 2], "trait_b": 1}
+
+    empty = phylodev.CompactPhylogeny([], [0], [])
+    phylodev.save_phylogeny(empty, str(tmp_path / "empty.csv"))
+    with open(str(tmp_path / "empty.csv")) as saved:
+        assert saved.read() == "id,ancestor_list\n"
+
+    with pytest.raises(Exception):
+        phylodev.save_phylogeny(phylo, str(tmp_path / "phylogeny.txt"))
+
+
+def test_save_phylogeny_lazy_columns(tmp_path, monkeypatch):
+    # Columns of stores without random access are read once, not per chunk
+    reads = []
+    read_column = phylodev.CsvColumnStore.__getitem__
+
+    def counted(store, name):
+        reads.append(name)
+        return read_column(store, name)
+
+    monkeypatch.setattr(phylodev.CsvColumnStore, "__getitem__", counted)
+    compact = phylodev.load_phylogeny_to_compact(asexual_fname, columns=[])
+    out = str(tmp_path / "phylogeny.csv")
+    phylodev.save_phylogeny(compact, out, attributes=["fitness", "src"],
+                            chunksize=1000)
+    assert sorted(reads) == ["fitness", "src"]
+    saved = phylodev.load_phylogeny_to_compact(out)
+    assert np.array_equal(saved.attributes["fitness"],
+                          compact.attributes["fitness"])
+
+    # Stores with random access are read chunk by chunk
+    phylodev.write_phylogeny_store(compact, str(tmp_path / "store"))
+    stored = phylodev.open_phylogeny_store(str(tmp_path / "store"))
+    phylodev.save_phylogeny(stored, out, chunksize=1000)
+    assert not stored.attributes.is_loaded("fitness")
+    saved = phylodev.load_phylogeny_to_compact(out)
+    assert np.array_equal(saved.ids, stored.ids)
+    assert np.array_equal(saved.attributes["fitness"],
+                          stored.attributes["fitness"])
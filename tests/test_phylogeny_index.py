@@ -0,0 +1,97 @@
+import ALifeStdDev.phylogeny as phylodev
+import networkx as nx
+import pickle
+
+single_root_fname = "example_data/example-standard-toy-asexual-phylogeny.csv"
+multi_root_fname = "example_data/example-standard-toy-asexual-phylogeny-multi-roots.csv"
+sex_fname = "example_data/example-standard-toy-sexual-phylogeny.csv"
+unpruned_fname = "example_data/example-standard-toy-asexual-phylogeny-not-pruned.csv"
+
+
+def structural_queries(g):
+    leaves = phylodev.get_leaf_taxa_ids(g)
+    return (phylodev.is_asexual(g),
+            phylodev.get_root_ids(g),
+            leaves,
+            list(phylodev.get_roots(g)),
+            list(phylodev.get_leaf_taxa(g)),
+            phylodev.has_single_root(g),
+            phylodev.get_num_independent_phylogenies(g),
+            phylodev.extract_asexual_lineage_ids(g, leaves[-1]),
+            phylodev.has_common_ancestor_asexual(g),
+            phylodev.get_mrca_id_asexual(g, leaves[:3]),
+            phylodev.get_mrca_tree_depth_asexual(g, leaves[:3]),
+            phylodev.calc_phylogenetic_diversity_asexual(g, leaves[:3]),
+            phylodev.get_pairwise_distances(g, leaves[:3]),
+            phylodev.is_ancestor_asexual(g, leaves[0], leaves[1]))
+
+
+def test_index_matches_graph():
+    for fname in [single_root_fname, unpruned_fname]:
+        g = phylodev.load_phylogeny_to_networkx(fname)
+        expected = structural_queries(g)
+        index = phylodev.index_phylogeny(g)
+        assert phylodev.get_phylogeny_index(g) is index
+        assert structural_queries(g) == expected
+
+    g = phylodev.load_phylogeny_to_networkx(multi_root_fname)
+    expected = (phylodev.get_root_ids(g), phylodev.has_single_root(g),
+                phylodev.get_mrca_id_asexual(g))
+    phylodev.index_phylogeny(g)
+    assert (phylodev.get_root_ids(g), phylodev.has_single_root(g),
+            phylodev.get_mrca_id_asexual(g)) == expected
+    assert phylodev.get_mrca_id_asexual(g) == -1
+
+    g = phylodev.load_phylogeny_to_networkx(sex_fname)
+    phylodev.index_phylogeny(g)
+    assert not phylodev.is_asexual(g)
+
+
+def test_index_invalidation():
+    g = phylodev.load_phylogeny_to_networkx(single_root_fname)
+    assert phylodev.get_phylogeny_index(g) is None
+    index = phylodev.index_phylogeny(g)
+    assert phylodev.get_leaf_taxa_ids(g) == [3, 4, 5]
+
+    # Changing attributes keeps the index
+    g.nodes[3]["trait_a"] = 7
+    assert phylodev.get_phylogeny_index(g) is index
+
+    g.add_edge(5, 6)
+    assert phylodev.get_leaf_taxa_ids(g) == [3, 4, 6]
+    assert phylodev.get_phylogeny_index(g) is not index
+    assert phylodev.extract_asexual_lineage_ids(g, 6)[:2] == [6, 5]
+    g.add_edge(6, 7)
+    g.add_edge(4, 7)
+    assert not phylodev.is_asexual(g)
+    g.remove_edge(4, 7)
+    assert phylodev.is_asexual(g)
+    g.remove_node(7)
+    g.remove_node(6)
+    g.add_node(8)
+    assert phylodev.get_root_ids(g) == [0, 8]
+    g.clear_edges()
+    assert phylodev.get_leaf_taxa_ids(g) == list(g.nodes)
+
+    # Copies are not indexed, and indexed graphs can be pickled
+    assert phylodev.get_phylogeny_index(g.copy()) is None
+    h = pickle.loads(pickle.dumps(g))
+    assert phylodev.get_root_ids(h) == phylodev.get_root_ids(g)
+    h.add_edge(0, 8)
+    assert 8 not in phylodev.get_root_ids(h)
+
+    phylodev.drop_phylogeny_index(g)
+    assert phylodev.get_phylogeny_index(g) is None
+    g.add_edge(0, 8)
+    assert 8 not in phylodev.get_root_ids(g)
+
+
+def test_index_keeps_phylogenetic_diversity():
+    # Ids that are ancestors of other ids, with and without an index
+    g = nx.DiGraph([(0, 1), (0, 2), (0, 6), (2, 3), (2, 7), (3, 4), (4, 5)])
+    id_sets = [[2, 7, 5], [3, 5], [7, 5], [1, 5], [0, 5]]
+    expected = [phylodev.calc_phylogenetic_diversity_asexual(g, ids)
+                for ids in id_sets]
+    phylodev.index_phylogeny(g)
+    assert [phylodev.calc_phylogenetic_diversity_asexual(g, ids)
+            for ids in id_sets] == expected
@@ -0,0 +1,65 @@
+import ALifeStdDev.phylogeny as phylodev
+import numpy as np
+
+single_root_fname = "example_data/example-standard-toy-asexual-phylogeny.csv"
+multi_root_fname = "example_data/example-standard-toy-asexual-phylogeny-multi-roots.csv"
+
+
+def climb(parents, index):
+    lineage = [index]
+    while parents[lineage[-1]] >= 0:
+        lineage.append(parents[lineage[-1]])
+    return lineage
+
+
+def test_lca_index_random_forest():
+    rng = np.random.default_rng(1)
+    num_taxa = 500
+    # Two trees: taxa 0-199 and 200-499
+    parents = np.array([-1 if i in (0, 200) else rng.integers(
+        max(i - 20, 0 if i < 200 else 200), i) for i in range(num_taxa)])
+    phylo = phylodev.CompactPhylogeny.from_parents(np.arange(num_taxa) * 3,
+                                                   parents)
+    lca = phylo.lca_index()
+    assert lca is phylo.lca_index()
+
+    first = rng.integers(0, num_taxa, 300)
+    second = rng.integers(0, num_taxa, 300)
+    expected = []
+    for a, b in zip(first, second):
+        common = [i for i in climb(parents, a) if i in climb(parents, b)]
+        expected.append(common[0] if common else -1)
+    assert lca.mrca_pairs(first, second).tolist() == expected
+
+    assert lca.is_ancestor(second, first).tolist() == [
+        b in climb(parents, a)[1:] for a, b in zip(first, second)]
+    assert lca.lift([150], 1000)[0] == 0
+
+    indices = rng.integers(0, 200, 7)
+    common = set.intersection(*[set(climb(parents, i)) for i in indices])
+    assert lca.mrca(indices) == max(common)
+    assert lca.mrca([5, 250]) == -1
+    assert lca.mrca([]) == -1
+
+    groups = [rng.integers(0, 200, size) for size in [1, 2, 3, 5, 8, 13]]
+    groups += [[], [5, 250], [210, 300, 450]]
+    offsets = np.cumsum([0] + [len(group) for group in groups])
+    assert lca.mrca_groups(np.concatenate(groups), offsets).tolist() == \
+        [lca.mrca(group) for group in groups]
+
+
+def test_lca_backed_queries():
+    for fname in [single_root_fname, multi_root_fname]:
+        g = phylodev.load_phylogeny_to_networkx(fname)
+        phylo = phylodev.CompactPhylogeny.from_networkx(g)
+        for ids in [[3, 4], [3, 4, 5], [2, 3], [4]]:
+            if not all(i in g for i in ids):
+                continue
+            assert phylodev.get_mrca_id_asexual(phylo, ids) == \
+                phylodev.get_mrca_id_asexual(g, ids)
+            assert phylodev.has_common_ancestor_asexual(phylo, ids) == \
+                phylodev.has_common_ancestor_asexual(g, ids)
+        for a in g.nodes:
+            for b in g.nodes:
+                assert phylodev.is_ancestor_asexual(phylo, a, b) == \
+                    phylodev.is_ancestor_asexual(g, a, b)
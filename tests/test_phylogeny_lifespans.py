@@ -0,0 +1,87 @@
+import ALifeStdDev.phylogeny as phylodev
+import pytest
+import numpy as np
+
+asexual_fname = "example_data/asexual_phylogeny_test.csv"
+toy_fname = "example_data/example-standard-toy-asexual-phylogeny.csv"
+
+
+def test_lifespan_index_random():
+    rng = np.random.default_rng(2)
+    num_taxa = 2000
+    origin = rng.integers(0, 1000, num_taxa).astype(float)
+    destruction = origin + rng.integers(0, 100, num_taxa)
+    destruction[rng.random(num_taxa) < 0.1] = np.inf
+    destruction[:5] = origin[:5] - 1
+    index = phylodev.LifespanIndex(np.arange(num_taxa) + 10, origin,
+                                   destruction)
+
+    times = np.concatenate((rng.uniform(-10, 1200, 50), origin[:20],
+                            destruction[20:40]))
+    for t in times:
+        alive = (origin <= t) & (t < destruction)
+        assert sorted(index.alive_ids(t)) == list(np.flatnonzero(alive) + 10)
+        assert index.count_alive(t) == alive.sum()
+    counts = index.count_alive(times)
+    assert list(counts) == [((origin <= t) & (t < destruction)).sum()
+                            for t in times]
+    assert sorted(index.alive_ids()) == \
+        list(np.flatnonzero(np.isinf(destruction)) + 10)
+
+    empty = phylodev.LifespanIndex([], [], [])
+    assert len(empty.alive_ids(3)) == 0
+    assert empty.count_alive(3) == 0
+
+
+def test_build_lifespan_index():
+    g = phylodev.load_phylogeny_to_networkx(toy_fname)
+    for phylogeny in [g, phylodev.CompactPhylogeny.from_networkx(g)]:
+        index = phylodev.build_lifespan_index(phylogeny,
+                                              origin_attribute="trait_a")
+        for t in [-1, 0, 0.5, 1, 2, 3]:
+            expected = phylodev.get_extant_taxa_ids(
+                phylogeny, time=t, origin_attribute="trait_a")
+            assert sorted(index.alive_ids(t)) == sorted(expected)
+            assert index.count_alive(t) == len(expected)
+        assert sorted(index.alive_ids()) == [3, 4, 5]
+
+    compact = phylodev.load_phylogeny_to_compact(asexual_fname)
+    options = dict(not_destroyed_value=-1,
+                   destruction_attribute="update_deactivated")
+    index = phylodev.build_lifespan_index(compact, **options)
+    for t in [0, 199000, 199977, 200000]:
+        expected = phylodev.get_extant_taxa_ids(compact, time=t, **options)
+        assert sorted(index.alive_ids(t)) == sorted(expected)
+
+    with pytest.raises(Exception):
+        phylodev.build_lifespan_index(g)
+
+
+def test_alive_mask():
+    g = phylodev.load_phylogeny_to_networkx(toy_fname)
+    origin, destruction = phylodev.get_lifespan_times(
+        g, origin_attribute="trait_a")
+    assert origin.dtype == destruction.dtype == np.float64
+    assert list(destruction) == [1, 2, 2, np.inf, np.inf, np.inf]
+    assert list(phylodev.get_alive_mask(origin, destruction)) == \
+        [False, False, False, True, True, True]
+
+    masks = phylodev.get_alive_mask(origin, destruction, [0, 1, 2])
+    assert masks.shape == (3, 6)
+    for t, mask in zip([0, 1, 2], masks):
+        assert list(np.array(g.nodes)[mask]) == sorted(
+            phylodev.get_extant_taxa_ids(g, time=t,
+                                         origin_attribute="trait_a"))
+
+    _, destruction = phylodev.get_lifespan_times(g, origin_attribute=None)
+    assert np.isinf(destruction).sum() == 3
+
+
+def test_extant_taxa_other_attributes():
+    g = phylodev.load_phylogeny_to_networkx(asexual_fname)
+    compact = phylodev.load_phylogeny_to_compact(asexual_fname)
+    options = dict(not_destroyed_value=-1,
+                   destruction_attribute="update_deactivated")
+    for t in ["present", 199990]:
+        assert sorted(phylodev.get_extant_taxa_ids(g, time=t, **options)) == \
+            sorted(phylodev.get_extant_taxa_ids(compact, time=t, **options))
@@ -0,0 +1,61 @@
+import ALifeStdDev.phylogeny as phylodev
+import pytest
+
+toy_lineage_fname = "example_data/example-standard-toy-asexual-lineage.csv"
+toy_fname = "example_data/example-standard-toy-asexual-phylogeny.csv"
+sex_fname = "example_data/example-standard-toy-sexual-phylogeny.csv"
+
+
+def test_lineage_view():
+    lineage = phylodev.load_phylogeny_to_networkx(toy_lineage_fname)
+    compact = phylodev.load_phylogeny_to_compact(toy_lineage_fname)
+    for phylogeny in [lineage, compact]:
+        view = phylodev.extract_asexual_lineage(phylogeny, 4, view=True)
+        assert list(view) == [1, 2, 3, 4]
+        assert 3 in view and 5 not in view
+        assert view.attribute("genotype").tolist() == ["aa", "aa", "ba", "ab"]
+        assert view.has_attribute("trait_a")
+        assert not view.has_attribute("garbage")
+        copy = view.to_networkx()
+        assert sorted(copy.nodes) == [1, 2, 3, 4]
+        assert sorted(copy.edges) == [(1, 2), (2, 3), (3, 4)]
+
+    # Lineage metrics accept views
+    view = phylodev.extract_asexual_lineage(
+        lineage, max(lineage.nodes), view=True)
+    assert phylodev.get_asexual_lineage_length(view) == 8
+    for attrs in [["genotype"], ["trait_a"], ["trait_b"]]:
+        assert phylodev.get_asexual_lineage_num_discrete_state_changes(
+            view, attrs) == \
+            phylodev.get_asexual_lineage_num_discrete_state_changes(
+                lineage, attrs)
+        assert phylodev.get_asexual_lineage_num_discrete_unique_states(
+            view, attrs) == \
+            phylodev.get_asexual_lineage_num_discrete_unique_states(
+                lineage, attrs)
+    assert phylodev.get_asexual_lineage_mutation_accumulation(
+        view, ["sub_mut_cnt", "reverse_mut_cnt"]) == \
+        phylodev.get_asexual_lineage_mutation_accumulation(
+            lineage, ["sub_mut_cnt", "reverse_mut_cnt"])
+    with pytest.raises(Exception):
+        phylodev.get_asexual_lineage_num_discrete_state_changes(
+            view, ["garbage"])
+
+
+def test_extract_asexual_lineages():
+    g = phylodev.load_phylogeny_to_networkx(toy_fname)
+    for phylogeny in [g, phylodev.load_phylogeny_to_compact(toy_fname)]:
+        trie = phylodev.extract_asexual_lineages(phylogeny, [5, 3, 4, 0])
+        assert len(trie) == 4
+        # Shared ancestry is stored once
+        assert sorted(trie.ids.tolist()) == [0, 1, 2, 3, 4, 5]
+        assert trie.tip_ids().tolist() == [5, 3, 4, 0]
+        assert [list(view) for view in trie] == \
+            [[0, 2, 5], [0, 1, 3], [0, 1, 4], [0]]
+        for taxon_id, view in zip(trie.tip_ids(), trie):
+            assert list(view)[::-1] == list(
+                phylodev.extract_asexual_lineage_ids(phylogeny, taxon_id))
+
+    with pytest.raises(Exception):
+        phylodev.extract_asexual_lineages(
+            phylodev.load_phylogeny_to_networkx(sex_fname), [1])
@@ -1,6 +1,81 @@
 import ALifeStdDev.phylogeny as phylodev
 import pytest
+import numpy as np
 import pandas as pd
+import bz2
+import gzip
+import lzma
+import shutil
+
+
+def test_parse_ancestor_lists():
+    parsed = phylodev.parse_ancestor_lists(
+        ["['none']", "[None]", "['0','100']", "['44', '264']", "[]", "['7']"])
+    assert list(parsed.ancestor_id) == [-1, -1, 0, 44, -1, 7]
+    assert list(parsed.offsets) == [0, 0, 0, 2, 4, 4, 5]
+    assert list(parsed.values) == [0, 100, 44, 264, 7]
+    assert list(parsed.origin) == ["none", "None", None, None, None, None]
+    assert parsed.values.dtype == np.int64
+
+    # already-parsed lists (e.g., from json)
+    parsed = phylodev.parse_ancestor_lists([[None], ["1"], [2, 3]])
+    assert list(parsed.offsets) == [0, 0, 1, 3]
+    assert list(parsed.values) == [1, 2, 3]
+
+    parsed = phylodev.parse_ancestor_lists([])
+    assert list(parsed.offsets) == [0]
+
+    parsed = phylodev.parse_ancestor_lists(
+        ["['9223372036854775807']", "['000000000000000000000012']"])
+    assert list(parsed.values) == [9223372036854775807, 12]
+    for invalid in ["['1.5']", "[-2]", "['9223372036854775808']", "['1",
+                    "[1]]", "['1', '2]"]:
+        with pytest.raises(Exception):
+            phylodev.parse_ancestor_lists([invalid])
+
+    parsed, malformed = phylodev.parse_ancestor_lists(
+        ["['0']", "['1.5', '0']", "[-2]", "[92233720368547758080, 3]", "['1",
+         "[4]"], strict=False)
+    assert list(malformed) == [False, True, True, True, True, False]
+    assert list(parsed.ancestor_id[[0, 5]]) == [0, 4]
+
+
+def test_load_phylogeny_to_pandas_df():
+    fname = "example_data/example-standard-toy-sexual-phylogeny.csv"
+    df = phylodev.load_phylogeny_to_pandas_df(fname)
+    assert df.loc[0, "ancestor_id"] == -1
+    assert df.loc[3, "ancestor_id"] == 1
+    assert df.loc[3, "ancestor_list"] == "['1','2']"
+    assert df["ancestor_id"].dtype == np.int64
+
+    df = phylodev.load_phylogeny_to_pandas_df(fname, ancestor_lists=True)
+    assert df.loc[3, "ancestor_list"] == ["1", "2"]
+    assert df.loc[0, "ancestor_list"] == ["none"]
+
+
+def test_load_phylogeny_to_pandas_df_columns():
+    fname = "example_data/asexual_phylogeny_test.csv"
+    df = phylodev.load_phylogeny_to_pandas_df(fname, columns=["fitness"])
+    assert list(df.columns) == ["ancestor_list", "fitness", "ancestor_id"]
+    assert df.loc[36209383, "fitness"] == 0.937799
+
+    df = phylodev.load_phylogeny_to_pandas_df(fname, compact_dtypes=True)
+    assert df["origin_time"].dtype == np.int32
+    assert df["fitness"].dtype == np.float32
+    assert df["src"].dtype == "category"
+    assert df["sequence"].dtype == object
+    assert df["ancestor_id"].dtype == np.int64
+
+    with pytest.raises(Exception):
+        phylodev.load_phylogeny_to_pandas_df(fname, columns=["not_a_column"])
+
+
+def test_iter_phylogeny_chunks():
+    fname = "example_data/asexual_phylogeny_test.csv"
+    chunks = list(phylodev.iter_phylogeny_chunks(fname, chunksize=5000))
+    assert [len(chunk) for chunk in chunks] == [5000, 5000, 2059]
+    df = pd.concat(chunks)
+    assert df.equals(phylodev.load_phylogeny_to_pandas_df(fname))
 
 
 def test_load_phylogeny_to_networkx():
@@ -14,6 +89,34 @@ def test_load_phylogeny_to_networkx():
     assert phylo.nodes[1]["origin_time"] == -1
     assert phylo.nodes[1]["src"] == "div:ext"
 
+    # Nodes hold the file's attributes, with ancestor lists as lists
+    phylo = phylodev.load_phylogeny_to_networkx(
+        "example_data/example-standard-toy-sexual-phylogeny.csv")
+    assert phylo.nodes[0] == {"ancestor_list": ["none"], "trait_a": 0,
+                              "trait_b": 0, "trait_c": 0,
+                              "destruction_time": "1", "origin": "none"}
+    assert phylo.nodes[1] == {"ancestor_list": ["0", "100"], "trait_a": 1,
+                              "trait_b": 0, "trait_c": 0,
+                              "destruction_time": "2"}
+
+
+def test_load_phylogeny_to_networkx_lazy_columns():
+    fname = "example_data/asexual_phylogeny_test.csv"
+    full = phylodev.load_phylogeny_to_networkx(fname)
+    phylo = phylodev.load_phylogeny_to_networkx(fname, columns=["src"])
+
+    assert dict.__contains__(phylo.nodes[1], "src")
+    assert not dict.__contains__(phylo.nodes[1], "origin_time")
+    assert "origin_time" in phylo.nodes[1]
+    assert phylo.nodes[1]["origin_time"] == -1
+    assert phylo.nodes[1].get("not_a_column") is None
+    assert phylo.nodes[36209383] == full.nodes[36209383]
+    assert phylodev.all_taxa_have_attribute(phylo, "sequence")
+
+    # Copies get every attribute
+    lineage = phylodev.extract_asexual_lineage(phylo, 36205979)
+    assert lineage.nodes[1] == full.nodes[1]
+
 
 def test_load_phylogeny_to_networkx_json_and_csv():
     phylo_json = phylodev.load_phylogeny_to_networkx(
@@ -28,6 +131,47 @@ def test_load_phylogeny_to_networkx_json_and_csv():
 def test_failure():
     with pytest.raises(Exception):
         phylodev.load_phylogeny_to_networkx("example_data/should_fail.csv")
+    with pytest.raises(Exception):
+        phylodev.load_phylogeny_to_networkx("example_data/README.txt")
+
+
+def test_load_compressed(tmp_path):
+    fname = "example_data/example-standard-toy-asexual-phylogeny.csv"
+    phylo = phylodev.load_phylogeny_to_networkx(fname)
+    for extension, opener in [("gz", gzip.open), ("bz2", bz2.open),
+                              ("xz", lzma.open)]:
+        compressed = str(tmp_path / f"phylogeny.csv.{extension}")
+        with open(fname, "rb") as src, opener(compressed, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        g = phylodev.load_phylogeny_to_networkx(compressed)
+        assert set(g.edges) == set(phylo.edges)
+        assert g.nodes[1] == phylo.nodes[1]
+        chunks = list(phylodev.iter_phylogeny_chunks(compressed, 4))
+        assert [len(chunk) for chunk in chunks] == [4, 2]
+        compact = phylodev.load_phylogeny_to_compact(compressed, columns=[])
+        assert compact.attributes["trait_a"][compact.index_of(3)] == 1
+
+
+def test_save_phylogeny_pandas_df(tmp_path):
+    fname = "example_data/example-standard-toy-asexual-phylogeny.csv"
+    phylo = phylodev.load_phylogeny_to_networkx(fname)
+    df = phylodev.load_phylogeny_to_pandas_df(fname)
+    for name in ["phylogeny.csv", "phylogeny.csv.gz", "phylogeny.json.xz"]:
+        out = str(tmp_path / name)
+        phylodev.save_phylogeny_pandas_df(df, out, chunksize=4)
+        g = phylodev.load_phylogeny_to_networkx(out)
+        assert set(g.edges) == set(phylo.edges)
+        assert g.nodes[0]["origin"] == "none"
+        assert g.nodes[3]["destruction_time"] == "none"
+        assert g.nodes[3]["trait_a"] == 1
+
+    out = str(tmp_path / "phylogeny.csv.bz2")
+    phylodev.save_phylogeny_pandas_df(phylodev.networkx_to_pandas_df(phylo),
+                                      out)
+    with phylodev.open_phylogeny_file(out) as saved:
+        assert saved.readline().strip() == "id,ancestor_list"
+    assert set(phylodev.load_phylogeny_to_networkx(out).edges) == \
+        set(phylo.edges)
 
 
 def test_networkx_to_pandas():
@@ -43,6 +187,13 @@ def test_networkx_to_pandas():
     df = phylodev.networkx_to_pandas_df(phylo)
     df.set_index("id", inplace=True)
     assert df.loc[36205979, "ancestor_list"] == [36204695]
+    assert list(df.columns) == ["ancestor_list"]
+
+    df = phylodev.networkx_to_pandas_df(phylo, all_attributes=True)
+    df.set_index("id", inplace=True)
+    assert df.loc[36205979, "sequence"] == phylo.nodes[36205979]["sequence"]
+    assert df.loc[1, "ancestor_list"] == [None]
+    assert "origin" not in df.columns
 
 
 def test_pandas_to_networkx():
@@ -55,6 +206,17 @@ def test_pandas_to_networkx():
     assert 5 in g[2]
     assert 2 not in g[5]
     assert 3 not in g[0]
+    assert g.nodes[0]["origin"] == "none"
+    assert g.nodes[3]["trait_a"] == 1
+
+
+def test_pandas_to_networkx_missing_ancestors():
+    df = pd.DataFrame({"id": [1, 2, 3, 4],
+                       "ancestor_list": ["['none']", "['1']", "['7']",
+                                         "['8', '7']"]})
+    with pytest.raises(Exception) as excinfo:
+        phylodev.pandas_df_to_networkx(df)
+    assert "[7, 8]" in str(excinfo.value)
 
 
 if __name__ == "__main__":
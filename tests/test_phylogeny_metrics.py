@@ -1,5 +1,6 @@
 import ALifeStdDev.phylogeny as phylodev
 import pytest
+import networkx as nx
 
 def test_get_asexual_lineage_length():
     toy_lineage_fname = "example_data/example-standard-toy-asexual-lineage.csv"
@@ -66,6 +67,28 @@ def test_get_mrca_tree_depth():
     depth = phylodev.get_mrca_tree_depth_asexual(sroot, [5])
     assert depth == 2
 
+def test_get_taxa_depths():
+    single_root_fname = "example_data/example-standard-toy-asexual-phylogeny.csv"
+    multi_root_fname = "example_data/example-standard-toy-asexual-phylogeny-multi-roots.csv"
+    sroot = phylodev.load_phylogeny_to_networkx(single_root_fname)
+    mroot = phylodev.load_phylogeny_to_networkx(multi_root_fname)
+
+    depths = phylodev.get_taxa_depths(sroot, attribute="depth")
+    assert depths == {0: 0, 1: 1, 2: 1, 3: 2, 4: 2, 5: 2}
+    assert sroot.nodes[5]["depth"] == 2
+    assert phylodev.get_tree_height(sroot) == 2
+    assert list(phylodev.get_depth_histogram(sroot)) == [1, 2, 3]
+    assert list(phylodev.get_depth_histogram(sroot, [3, 4, 1])) == [0, 1, 2]
+
+    compact = phylodev.CompactPhylogeny.from_networkx(mroot)
+    compact_depths = phylodev.get_taxa_depths(compact, attribute="depth")
+    assert dict(zip(compact.ids.tolist(), compact_depths.tolist())) == \
+        phylodev.get_taxa_depths(mroot)
+    assert list(compact.attributes["depth"]) == list(compact_depths)
+    assert phylodev.get_tree_height(compact) == \
+        phylodev.get_tree_height(mroot)
+    assert sum(phylodev.get_depth_histogram(compact)) == len(compact)
+
 def test_calc_phylogenetic_diversity_asexual():
     single_root_fname = "example_data/example-standard-toy-asexual-phylogeny-not-pruned.csv"
     sroot = phylodev.load_phylogeny_to_networkx(single_root_fname)
@@ -74,6 +97,17 @@ def test_calc_phylogenetic_diversity_asexual():
     diversity = phylodev.calc_phylogenetic_diversity_asexual(sroot, [3,4,5,8])
     assert diversity == 7
 
+    # Ids that are ancestors of other ids (2 is also their MRCA, so its path
+    # to the root is counted too)
+    g = nx.DiGraph([(0, 1), (0, 2), (0, 6), (2, 3), (2, 7), (3, 4), (4, 5)])
+    compact = phylodev.CompactPhylogeny.from_networkx(g)
+    for ids, expected in [([2, 7, 5], 6), ([3, 5], 5), ([7, 5], 5),
+                          ([4, 5, 3], 5), ([1, 5], 6), ([0, 5], 5)]:
+        assert phylodev.calc_phylogenetic_diversity_asexual(g, ids) == \
+            expected
+        assert phylodev.calc_phylogenetic_diversity_asexual(compact, ids) \
+            == expected
+
 if __name__ == "__main__":
     test_get_asexual_lineage_length()
     test_get_asexual_lineage_num_discrete_state_changes()
@@ -0,0 +1,49 @@
+import ALifeStdDev.phylogeny as phylodev
+import pytest
+import numpy as np
+
+asexual_fname = "example_data/asexual_phylogeny_test.csv"
+toy_fname = "example_data/example-standard-toy-asexual-phylogeny.csv"
+
+
+def test_phylogeny_store(tmp_path):
+    full = phylodev.load_phylogeny_to_compact(asexual_fname)
+    phylodev.write_phylogeny_store(
+        phylodev.load_phylogeny_to_pandas_df(asexual_fname), str(tmp_path))
+    phylo = phylodev.open_phylogeny_store(str(tmp_path))
+
+    assert isinstance(phylo.ids, np.memmap)
+    assert len(phylo) == len(full)
+    assert np.all(phylo.ids[1:] > phylo.ids[:-1])
+    assert not phylo.attributes.is_loaded("sequence")
+    assert phylo.origin[phylo.index_of(1)] == "none"
+    assert phylo.origin[phylo.index_of(36205979)] is None
+
+    assert list(phylodev.extract_asexual_lineage_ids(phylo, 36205979)) == \
+        list(phylodev.extract_asexual_lineage_ids(full, 36205979))
+    lineage = phylodev.extract_asexual_lineage(phylo, 36205979)
+    assert lineage.origin[0] == "none"
+    assert lineage.taxon_attributes(0)["src"] == "div:ext"
+    assert not phylo.attributes.is_loaded("sequence")
+
+    ids = [36205979, 36209383]
+    assert phylodev.get_mrca_id_asexual(phylo, ids) == \
+        phylodev.get_mrca_id_asexual(full, ids)
+    assert phylodev.get_mrca_asexual(phylo, ids) == \
+        phylodev.get_mrca_asexual(full, ids)
+    assert np.array_equal(phylo.attributes["fitness"],
+                          full.attributes["fitness"][full.index_of(phylo.ids)])
+
+    with pytest.raises(Exception):
+        phylodev.write_phylogeny_store(full, str(tmp_path))
+
+
+def test_phylogeny_store_extant(tmp_path):
+    g = phylodev.load_phylogeny_to_networkx(toy_fname)
+    phylodev.write_phylogeny_store(g, str(tmp_path))
+    phylo = phylodev.open_phylogeny_store(str(tmp_path))
+    assert list(phylodev.get_extant_taxa_ids(phylo)) == [3, 4, 5]
+    assert phylodev.get_extant_taxa(phylo)[3]["trait_a"] == 1
+
+    with pytest.raises(Exception):
+        phylodev.open_phylogeny_store(str(tmp_path / "missing"))
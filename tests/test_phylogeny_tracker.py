@@ -0,0 +1,110 @@
+import ALifeStdDev.phylogeny as phylodev
+import networkx as nx
+import pytest
+import numpy as np
+
+toy_fname = "example_data/example-standard-toy-asexual-phylogeny.csv"
+
+
+def build_toy_tracker():
+    # Same phylogeny as the toy file, as a simulation would track it
+    tracker = phylodev.PhylogenyTracker(capacity=2)
+    tracker.add_taxon(0, None, 0, trait_a=0, trait_b=0, trait_c=0)
+    tracker.add_taxon(1, 0, 1, trait_a=1, trait_b=0, trait_c=0)
+    tracker.add_taxon(2, 0, 1, trait_a=0, trait_b=0, trait_c=1)
+    tracker.destroy_taxon(0, 1)
+    tracker.add_taxon(3, 1, 2, trait_a=1, trait_b=1, trait_c=0)
+    tracker.add_taxon(4, 1, 2, trait_a=1, trait_b=0, trait_c=0)
+    tracker.add_taxon(5, 2, 2, trait_a=0, trait_b=0, trait_c=1)
+    tracker.destroy_taxon(1, 2)
+    tracker.destroy_taxon(2, 2)
+    return tracker
+
+
+def test_tracker_queries():
+    tracker = build_toy_tracker()
+    phylogeny = phylodev.load_phylogeny_to_networkx(toy_fname)
+    assert len(tracker) == 6 and 5 in tracker and 6 not in tracker
+    assert tracker.num_extant() == 3
+    assert tracker.extant_ids().tolist() == sorted(
+        phylodev.get_extant_taxa_ids(phylogeny))
+    assert tracker.extant_ids(1).tolist() == [1, 2]
+    assert tracker.lifespan_index().count_alive(1) == 2
+    assert tracker.depth(5) == 2 and tracker.parent_id(5) == 2
+    assert tracker.parent_id(0) is None and tracker.root_id(4) == 0
+    assert tracker.mrca_id() == phylodev.get_mrca_id_asexual(
+        phylogeny, phylodev.get_extant_taxa_ids(phylogeny))
+    assert tracker.mrca_id([3, 4]) == 1
+    assert tracker.mrca_id([3]) == 3
+    assert tracker.phylogenetic_diversity() == \
+        phylodev.calc_phylogenetic_diversity_asexual(phylogeny, [3, 4, 5])
+    assert tracker.phylogenetic_diversity([3, 4]) == 3
+
+    with pytest.raises(Exception):
+        tracker.add_taxon(3, 1, 3)
+    with pytest.raises(Exception):
+        tracker.add_taxon(6, 10, 3)
+    with pytest.raises(Exception):
+        tracker.destroy_taxon(0, 3)
+
+
+def test_tracker_phylogenetic_diversity():
+    # Same tree in a tracker and in networkx, with ids that are ancestors of
+    # other ids
+    edges = [(0, 1), (0, 2), (0, 6), (2, 3), (2, 7), (3, 4), (4, 5)]
+    tracker = phylodev.PhylogenyTracker()
+    tracker.add_taxon(0, None, 0)
+    for parent, child in edges:
+        tracker.add_taxon(child, parent, 0)
+    g = nx.DiGraph(edges)
+    for ids in [[2, 7, 5], [3, 5], [7, 5], [1, 5], [0, 5], [5], [6, 7]]:
+        assert tracker.phylogenetic_diversity(ids) == \
+            phylodev.calc_phylogenetic_diversity_asexual(g, ids)
+
+
+def test_tracker_export(tmp_path):
+    tracker = build_toy_tracker()
+    tracker.add_taxon(6, None, 3, trait_a=5)
+    g = tracker.to_networkx()
+    assert sorted(g.edges) == [(0, 1), (0, 2), (1, 3), (1, 4), (2, 5)]
+    assert g.nodes[0]["destruction_time"] == 1
+    assert g.nodes[5]["destruction_time"] == "none"
+    assert g.nodes[6]["trait_b"] is None
+    assert phylodev.get_num_independent_phylogenies(g) == 2
+    assert tracker.mrca_id() == -1
+
+    filename = str(tmp_path / "tracked.csv")
+    tracker.save(filename)
+    loaded = phylodev.load_phylogeny_to_pandas_df(filename)
+    assert phylodev.load_phylogeny_to_compact(filename).parents.tolist() == \
+        phylodev.load_phylogeny_to_compact(toy_fname).parents.tolist() + [-1]
+    assert loaded["destruction_time"].astype(str).tolist() == \
+        ["1", "2", "2", "none", "none", "none", "none"]
+    assert sorted(phylodev.get_extant_taxa_ids(
+        phylodev.load_phylogeny_to_networkx(filename))) == [3, 4, 5, 6]
+
+
+def test_tracker_random():
+    rng = np.random.default_rng(5)
+    tracker = phylodev.PhylogenyTracker()
+    tracker.add_taxon(0, None, 0)
+    alive = [0]
+    for taxon_id in range(1, 3000):
+        parent = alive[rng.integers(len(alive))]
+        tracker.add_taxon(taxon_id, parent, taxon_id)
+        alive.append(taxon_id)
+        if len(alive) > 20:
+            tracker.destroy_taxon(alive.pop(rng.integers(len(alive))),
+                                  taxon_id)
+    compact = tracker.to_compact()
+    extant = phylodev.get_extant_taxa_ids(compact)
+    assert tracker.extant_ids().tolist() == sorted(extant.tolist())
+    assert tracker.mrca_id() == phylodev.get_mrca_id_asexual(compact, extant)
+    assert tracker.phylogenetic_diversity() == \
+        phylodev.calc_phylogenetic_diversity_asexual(compact, extant)
+    for _ in range(50):
+        pair = rng.choice(3000, 2, replace=False).tolist()
+        assert tracker.mrca_id(pair) == \
+            phylodev.get_mrca_id_asexual(compact, pair)
+    assert [tracker.depth(i) for i in range(3000)] == \
+        compact.depths.tolist()
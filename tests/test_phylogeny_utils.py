@@ -1,6 +1,7 @@
 import ALifeStdDev.phylogeny as phylodev
 import pytest
 import networkx as nx
+import numpy as np
 
 def test_all_taxa_have_attribute():
     fname = "example_data/example-standard-toy-asexual-phylogeny.csv"
@@ -133,6 +134,28 @@ def test_get_independent_phylogenies():
     assert len(sexphylo_indies) == 1
     assert sexphylo_indies[0].nodes == sexphylo.nodes
 
+    # Views share the given phylogeny's data
+    mroot_views = phylodev.get_independent_phylogenies(mroot, copy=False)
+    assert [sorted(view.nodes) for view in mroot_views] == \
+        [[0, 1, 2, 3, 4, 5], [6, 7, 8]]
+    assert mroot_views[1].nodes[8] is mroot.nodes[8]
+    assert [len(view) for view in
+            phylodev.iter_independent_phylogenies(mroot)] == [6, 3]
+
+
+def test_get_component_labels():
+    multi_root_fname = "example_data/example-standard-toy-asexual-phylogeny-multi-roots.csv"
+    sex_fname = "example_data/example-standard-toy-sexual-phylogeny.csv"
+    mroot = phylodev.load_phylogeny_to_networkx(multi_root_fname)
+    sexphylo = phylodev.load_phylogeny_to_networkx(sex_fname)
+
+    assert phylodev.get_component_labels(mroot) == \
+        {0: 0, 1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 6, 7: 6, 8: 6}
+    assert len(set(phylodev.get_component_labels(sexphylo).values())) == 1
+    compact = phylodev.load_phylogeny_to_compact(multi_root_fname)
+    assert phylodev.get_component_labels(compact).tolist() == \
+        [0, 0, 0, 0, 0, 0, 6, 6, 6]
+
 
 def test_get_leaf_taxa():
     single_root_fname = "example_data/example-standard-toy-asexual-phylogeny.csv"
@@ -311,6 +334,21 @@ def test_abstract_asexual_phylogeny():
 
     abstract_phylogeny_all = phylodev.abstract_asexual_phylogeny(phylogeny, ["trait_a", "trait_b", "trait_c"])
     assert len(abstract_phylogeny_all) == 4
+    assert [state["members"].tolist() for _, state in
+            abstract_phylogeny_all.nodes(data=True)] == [[0], [1, 4], [2, 5], [3]]
+    assert list(abstract_phylogeny_all.edges) == [(0, 1), (0, 2), (1, 3)]
+    assert abstract_phylogeny_all.nodes[1]["destruction_time"] == 2
+    assert abstract_phylogeny_all.nodes[3]["node_state"] == [1, 1, 0]
+
+    # Abstract each tree of a forest
+    multi_root_fname = "example_data/example-standard-toy-asexual-phylogeny-multi-roots.csv"
+    forest = phylodev.load_phylogeny_to_networkx(multi_root_fname)
+    abstract_forest = phylodev.abstract_asexual_phylogeny(forest, ["trait_a"])
+    assert len(abstract_forest) == 4
+    assert phylodev.get_num_independent_phylogenies(abstract_forest) == 2
+    assert sorted(sorted(state["members"].tolist()) for _, state in
+                  abstract_forest.nodes(data=True)) == \
+        [[0, 2, 5], [1, 3, 4], [6], [7, 8]]
 
 
 def test_extract_asexual_lod():
@@ -343,6 +381,82 @@ def test_extract_asexual_lod():
         phylodev.extract_asexual_lod(sexphylo)
 
 
+def test_extract_asexual_lods():
+    multi_root_fname = "example_data/example-standard-toy-asexual-phylogeny-multi-roots.csv"
+    sex_fname = "example_data/example-standard-toy-sexual-phylogeny.csv"
+    mroot = phylodev.load_phylogeny_to_networkx(multi_root_fname)
+
+    for phylogeny in [mroot, phylodev.load_phylogeny_to_compact(multi_root_fname)]:
+        ids, parents, tips = phylodev.extract_asexual_lods(phylogeny)
+        # Extant taxa 3, 4, 5 and 8 share their ancestry
+        assert sorted(ids.tolist()) == [0, 1, 2, 3, 4, 5, 6, 7, 8]
+        assert ids[tips].tolist() == [3, 4, 5, 8]
+        assert np.all(parents < np.arange(len(ids)))
+        lods = []
+        for tip in tips:
+            lod = []
+            while tip >= 0:
+                lod.append(int(ids[tip]))
+                tip = parents[tip]
+            lods.append(lod)
+        assert lods == [[3, 1, 0], [4, 1, 0], [5, 2, 0], [8, 7, 6]]
+
+    with pytest.raises(Exception):
+        phylodev.extract_asexual_lods(phylodev.load_phylogeny_to_networkx(sex_fname))
+
+
+def test_prune_phylogeny():
+    not_pruned_fname = "example_data/example-standard-toy-asexual-phylogeny-not-pruned.csv"
+    lineage_fname = "example_data/example-standard-toy-asexual-lineage.csv"
+    sex_fname = "example_data/example-standard-toy-sexual-phylogeny.csv"
+    g = phylodev.load_phylogeny_to_networkx(not_pruned_fname)
+    compact = phylodev.load_phylogeny_to_compact(not_pruned_fname)
+
+    # Dead ends 6, 7 and 8 are dropped
+    pruned = phylodev.prune_phylogeny(g)
+    assert sorted(pruned.nodes) == [0, 1, 2, 3, 4, 5]
+    assert sorted(pruned.edges) == [(0, 1), (0, 2), (1, 3), (1, 4), (2, 5)]
+    assert pruned.nodes[3] == g.nodes[3] and pruned.nodes[3] is not g.nodes[3]
+    pruned = phylodev.prune_phylogeny(compact)
+    assert pruned.ids.tolist() == [0, 1, 2, 3, 4, 5]
+    assert pruned.parents.tolist() == [-1, 0, 0, 1, 1, 2]
+    assert pruned.attributes["trait_a"].tolist() == [0, 1, 0, 1, 1, 0]
+
+    # 2 only has one child left (5), so 5 attaches to 0
+    for phylogeny in [g, compact]:
+        collapsed = phylodev.prune_phylogeny(phylogeny,
+                                             collapse_unifurcations=True)
+        if isinstance(collapsed, phylodev.CompactPhylogeny):
+            collapsed = collapsed.to_networkx()
+        assert sorted(collapsed.edges) == [(0, 1), (0, 5), (1, 3), (1, 4)]
+        assert collapsed.nodes[5]["branch_length"] == 2
+        assert collapsed.nodes[3]["branch_length"] == 1
+        assert collapsed.nodes[0]["branch_length"] == 0
+        # Ancestor lists agree with the new edges
+        for taxon_id in collapsed.nodes:
+            assert "ancestor_id" not in collapsed.nodes[taxon_id]
+            if phylogeny is g and collapsed.in_degree(taxon_id):
+                assert collapsed.nodes[taxon_id]["ancestor_list"] == \
+                    [str(parent) for parent in collapsed.pred[taxon_id]]
+    g.nodes[5]["ancestor_id"] = 2
+    collapsed = phylodev.prune_phylogeny(g, collapse_unifurcations=True)
+    assert collapsed.nodes[5]["ancestor_id"] == 0
+    assert g.nodes[5]["ancestor_list"] == ["2"]
+    del g.nodes[5]["ancestor_id"]
+
+    pruned = phylodev.prune_phylogeny(g, ids=[4, 5])
+    assert sorted(pruned.nodes) == [0, 1, 2, 4, 5]
+    lineage = phylodev.load_phylogeny_to_networkx(lineage_fname)
+    collapsed = phylodev.prune_phylogeny(lineage, ids=[3, 8],
+                                         collapse_unifurcations=True,
+                                         branch_length="origin_time")
+    assert sorted(collapsed.edges) == [(1, 3), (3, 8)]
+    assert collapsed.nodes[8]["branch_length"] == 5
+
+    with pytest.raises(Exception):
+        phylodev.prune_phylogeny(phylodev.load_phylogeny_to_networkx(sex_fname))
+
+
 def test_get_mrca_id_asexual():
     single_root_fname = "example_data/example-standard-toy-asexual-phylogeny.csv"
     multi_root_fname = "example_data/example-standard-toy-asexual-phylogeny-multi-roots.csv"
@@ -381,6 +495,39 @@ def test_get_mrca_id_asexual():
     assert mrca_id == 6
 
 
+def test_get_mrca_ids_asexual():
+    single_root_fname = "example_data/example-standard-toy-asexual-phylogeny.csv"
+    multi_root_fname = "example_data/example-standard-toy-asexual-phylogeny-multi-roots.csv"
+    sex_fname = "example_data/example-standard-toy-sexual-phylogeny.csv"
+
+    sroot = phylodev.load_phylogeny_to_networkx(single_root_fname)
+    mroot = phylodev.load_phylogeny_to_networkx(multi_root_fname)
+
+    mrca_ids, depths = phylodev.get_mrca_ids_asexual(
+        sroot, np.array([[3, 4], [5, 0], [2, 2], [4, 5]]))
+    assert list(mrca_ids) == [1, 0, 2, 0]
+    assert list(depths) == [1, 0, 1, 0]
+
+    groups = [[3, 4, 5], [7, 8], [6, 8], [8, 8], [0, 8], [], [2]]
+    mrca_ids, depths = phylodev.get_mrca_ids_asexual(mroot, groups)
+    assert list(mrca_ids) == [-1 if not group else
+                              phylodev.get_mrca_id_asexual(mroot, group)
+                              for group in groups]
+    assert list(depths[mrca_ids >= 0]) == \
+        [phylodev.get_mrca_tree_depth_asexual(mroot, group)
+         for group, mrca in zip(groups, mrca_ids) if mrca >= 0]
+    compact_ids, compact_depths = phylodev.get_mrca_ids_asexual(
+        phylodev.CompactPhylogeny.from_networkx(mroot), groups)
+    assert np.array_equal(compact_ids, mrca_ids)
+    assert np.array_equal(compact_depths, depths)
+
+    with pytest.raises(Exception):
+        phylodev.get_mrca_ids_asexual(sroot, [[3, 99]])
+    with pytest.raises(Exception):
+        phylodev.get_mrca_ids_asexual(
+            phylodev.load_phylogeny_to_networkx(sex_fname), [[1, 2]])
+
+
 def test_is_ancestor_asexual():
     multi_root_fname = "example_data/example-standard-toy-asexual-phylogeny-multi-roots.csv"
 
@@ -411,6 +558,48 @@ def test_get_pairwise_distances():
     with pytest.raises(nx.NetworkXNoPath):
         phylodev.get_pairwise_distances(mroot, [3, 4, 8])
 
+    condensed = phylodev.get_pairwise_distances(sroot, [3, 4, 5, 0],
+                                                form="condensed")
+    assert list(condensed) == [2, 4, 2, 4, 2, 2]
+    square = phylodev.get_pairwise_distances(sroot, [3, 4, 5, 0],
+                                             form="square")
+    assert square.shape == (4, 4)
+    assert list(square[1]) == [2, 0, 4, 2]
+    assert np.array_equal(square, square.T)
+
+    # Branch lengths as differences in origin_time
+    phylogeny = phylodev.load_phylogeny_to_networkx(
+        "example_data/asexual_phylogeny_test.csv")
+    ids = [36210211, 36205979]
+    mrca = phylodev.get_mrca_id_asexual(phylogeny, ids)
+    times = {i: phylogeny.nodes[i]["origin_time"] for i in ids + [mrca]}
+    timed = phylodev.get_pairwise_distances(phylogeny, ids,
+                                            branch_length="origin_time")
+    assert timed == [times[ids[0]] + times[ids[1]] - 2 * times[mrca]]
+    assert timed == phylodev.get_pairwise_distances(
+        phylodev.CompactPhylogeny.from_networkx(phylogeny), ids,
+        branch_length="origin_time")
+
+    sex_phylogeny = phylodev.load_phylogeny_to_networkx(
+        "example_data/example-standard-toy-sexual-phylogeny.csv")
+    assert phylodev.get_pairwise_distances(sex_phylogeny, [1, 2]) == [2]
+    with pytest.raises(Exception):
+        phylodev.get_pairwise_distances(sex_phylogeny, [1, 2],
+                                        branch_length="origin_time")
+
+
+def test_get_pairwise_distances_chunks(monkeypatch):
+    phylogeny = phylodev.load_phylogeny_to_compact(
+        "example_data/asexual_phylogeny_test.csv")
+    ids = phylodev.get_leaf_taxa_ids(phylogeny)[:40]
+    expected = phylodev.get_pairwise_distances(phylogeny, ids,
+                                               form="condensed")
+    monkeypatch.setattr(phylodev.utils, "_DISTANCE_CHUNK_PAIRS", 50)
+    assert np.array_equal(phylodev.get_pairwise_distances(
+        phylogeny, ids, form="condensed"), expected)
+    assert np.array_equal(phylodev.get_pairwise_distances(
+        phylogeny, ids, form="condensed", processes=2), expected)
+
 
 if __name__ == "__main__":
     test_all_taxa_have_attribute()
@@ -420,6 +609,7 @@ if __name__ == "__main__":
     test_get_num_roots()
     test_get_num_independent_phylogenies()
     test_get_independent_phylogenies()
+    test_get_component_labels()
     test_get_leaf_taxa()
     test_get_leaf_taxa_ids()
     test_get_extant_taxa_ids()
@@ -429,6 +619,8 @@ if __name__ == "__main__":
     test_is_asexual_lineage()
     test_abstract_asexual_lineage()
     test_extract_asexual_lod()
+    test_extract_asexual_lods()
+    test_prune_phylogeny()
     test_get_mrca_id_asexual()
     test_has_common_ancestor_asexual()
     test_get_pairwise_distances()
\ No newline at end of file
@@ -0,0 +1,67 @@
+import ALifeStdDev.phylogeny as phylodev
+import pandas as pd
+
+asexual_fname = "example_data/asexual_phylogeny_test.csv"
+sexual_fname = "example_data/example-standard-toy-sexual-phylogeny.csv"
+
+
+def phylogeny_df(ancestor_lists, ids=None):
+    if ids is None:
+        ids = range(len(ancestor_lists))
+    return pd.DataFrame({"id": list(ids), "ancestor_list": ancestor_lists})
+
+
+def test_validate_valid_files():
+    report = phylodev.validate_phylogeny_file(asexual_fname, chunksize=100)
+    assert report.valid
+    assert report.asexual
+    assert report.problems == []
+    assert list(report.root_ids) == [1]
+    df = phylodev.load_phylogeny_to_pandas_df(asexual_fname)
+    assert phylodev.validate_phylogeny_pandas_df(df).num_taxa == \
+        report.num_taxa == len(df)
+
+    report = phylodev.validate_phylogeny_file(sexual_fname)
+    assert report.valid
+    assert not report.asexual
+
+
+def test_validate_problems():
+    report = phylodev.validate_phylogeny_pandas_df(phylogeny_df(
+        ["[none]", "[0]", "[1]", "[7]", "[5]", "[4]", "[bogus]", "[none, 2]"],
+        ids=[0, 1, 2, 3, 4, 5, 6, 1]))
+    assert not report.valid
+    assert len(report.problems) == 4
+    assert list(report.duplicate_ids) == [1]
+    assert list(report.dangling_ancestor_ids) == [7]
+    assert list(report.dangling_taxa_ids) == [3]
+    assert list(report.malformed_ids) == [6, 1]
+    assert list(report.cycle_ids) == [4, 5]
+    assert list(report.root_ids) == [0, 6]
+
+
+def test_validate_malformed_ids(tmp_path):
+    ancestor_lists = ["[none]", "['1.5']", "[-2]", "[92233720368547758080]",
+                      "['1", "[0]"]
+    report = phylodev.validate_phylogeny_pandas_df(
+        phylogeny_df(ancestor_lists))
+    assert list(report.malformed_ids) == [1, 2, 3, 4]
+    assert not report.valid
+
+    fname = tmp_path / "phylogeny.csv"
+    phylogeny_df(ancestor_lists).to_csv(fname, index=False)
+    report = phylodev.validate_phylogeny_file(str(fname), chunksize=2)
+    assert list(report.malformed_ids) == [1, 2, 3, 4]
+    assert report.num_taxa == 6
+
+
+def test_validate_sexual_cycles():
+    report = phylodev.validate_phylogeny_pandas_df(phylogeny_df(
+        ["[none]", "[0]", "[0, 3]", "[2]", "[1, 2]", "[4]", "[0, 1]"]))
+    assert not report.asexual
+    assert list(report.cycle_ids) == [2, 3, 4, 5]
+    assert list(report.root_ids) == [0]
+
+    report = phylodev.validate_phylogeny_pandas_df(phylogeny_df(
+        ["[none]", "[0]", "[0, 1]", "[1, 2]"]))
+    assert report.valid